@@ -37,6 +37,9 @@ COUNTRY_NAME = 'BR'
 # Configurações para otimização de hiperparâmetros
 N_TRIALS = 1
 N_JOBS = 1
+# Poda de trials do Optuna: 'median' ou 'hyperband' (multi-fidelidade: os primeiros grupos de cutoffs,
+# em ordem cronológica, têm históricos de treino mais curtos)
+OPTUNA_PRUNER = 'median'
 INTRADAY_INTERVALS = ["1m", "5m", "30m", "1h"]
 
 MAX_DAYS_PER_REQUEST = {
@@ -46,6 +49,82 @@ MAX_DAYS_PER_REQUEST = {
     "1h": 730,
     # "1d": 3650,
 }
+# Histórico máximo (dias até hoje) servido pelo Yahoo para cada intervalo intradiário
+INTRADAY_HISTORY_DAYS = {
+    "1m": 30,
+    "2m": 60,
+    "5m": 60,
+    "15m": 60,
+    "30m": 60,
+    "90m": 60,
+    "1h": 730,
+}
+
+# Cache local de barras OHLCV (um arquivo Parquet por ticker/intervalo)
+USE_DATA_CACHE = True
+CACHE_DIR = os.getenv("INVESTMENT_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+OHLCV_CACHE_DIR = os.path.join(CACHE_DIR, "ohlcv")
+INTRADAY_CHUNK_CACHE_DIR = os.path.join(CACHE_DIR, "intraday_chunks")
+# Dias de barras em cache rebaixados a cada atualização para detectar reajustes do histórico (proventos, desdobramentos)
+CACHE_REVALIDATION_DAYS = 5
+
+# Representação compacta (float32, mapeada em memória) dos dados repassados às análises (opcional)
+USE_COMPACT_DATASETS = False
+COMPACT_DATASET_DIR = os.path.join(CACHE_DIR, "compact")
+
+# Requisições paralelas e novas tentativas (com backoff exponencial) nos downloads de dados
+FETCH_MAX_WORKERS = 5
+FETCH_MAX_RETRIES = 3
+FETCH_RETRY_BACKOFF = 1.0  # segundos antes da primeira nova tentativa
+
+# Indicadores técnicos calculados de forma incremental, retomando o estado salvo da execução anterior
+USE_INCREMENTAL_INDICATORS = True
+INDICATOR_STATE_DIR = os.path.join(CACHE_DIR, "indicators")
+
+# Modo streaming para criptomoedas: consulta novas barras fechadas a cada STREAMING_POLL_INTERVAL segundos
+STREAMING_MODE = False
+STREAMING_POLL_INTERVAL = 60
+
+# Opções: intervalo mínimo entre requisições ao Yahoo e taxa livre de risco anual (contínua) para Black-Scholes
+OPTIONS_REQUEST_INTERVAL_MS = 500
+RISK_FREE_RATE = 0.1075
+
+# Parâmetros dos modelos de volatilidade salvos por ticker/intervalo/modelo e usados como ponto de partida do
+# próximo ajuste; com até VOLATILITY_MAX_BARS_WITHOUT_REFIT barras novas, reaproveita-os sem reajustar (0 desativa)
+VOLATILITY_STATE_DIR = os.path.join(CACHE_DIR, "volatility")
+VOLATILITY_MAX_BARS_WITHOUT_REFIT = 0
+
+# Cache de modelos Prophet ajustados (e dos melhores hiperparâmetros por conjunto de dados), com remoção LRU por tamanho
+USE_MODEL_CACHE = True
+MODEL_CACHE_DIR = os.path.join(CACHE_DIR, "prophet_models")
+MODEL_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Estudos do Optuna persistidos por ticker/intervalo e retomados a cada execução (trials acumulados)
+OPTUNA_STORAGE_DIR = os.path.join(CACHE_DIR, "optuna")
+# Validações cruzadas dos trials, para reaproveitar a do melhor trial na análise final
+CV_RESULTS_DIR = os.path.join(CACHE_DIR, "cross_validation")
+
+# Ajuste do Prophet iniciado a partir dos parâmetros (k, m, delta, beta, sigma_obs) do último ajuste do ticker
+USE_PROPHET_WARM_START = True
+PROPHET_STATE_DIR = os.path.join(CACHE_DIR, "prophet_init")
+
+# Cache em memória das features do Prophet (Fourier e feriados) compartilhado entre trials e cutoffs, limitado em bytes
+USE_PROPHET_FEATURE_CACHE = True
+PROPHET_FEATURE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Backtest walk-forward do HiLo Activator (tamanhos das janelas em barras; custos por unidade de giro)
+WALK_FORWARD_TRAIN_BARS = 252
+WALK_FORWARD_TEST_BARS = 21
+TRANSACTION_COST = 0.0005
+SLIPPAGE = 0.0005
+
+# Correlação entre os ativos do universo: janela móvel e meia-vida da média exponencial, em barras
+CORRELATION_WINDOW = 60
+CORRELATION_HALFLIFE = 30
+
+# Motor de previsão dos relatórios: 'prophet', ou os leves 'linear' (em lote para todo o universo), 'ets' e 'arima' (statsmodels)
+FORECAST_ENGINE = os.getenv('FORECAST_ENGINE', 'prophet')
+
 # URI para conexão com o banco de dados MongoDB (se aplicável)
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/investimentos_db')
 
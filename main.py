@@ -1,15 +1,26 @@
 import logging
+import os
 import signal
-import time
 import warnings
 
 import config
 from dask.distributed import Client
+from src.analysis.linear_forecast import LinearForecastAnalysis
+from src.analysis.options_analysis import OptionsAnalysis
+from src.analysis.walk_forward import WalkForwardBacktester
+from src.data.fetcher.cached_data_fetcher import CachedDataFetcher
 from src.data.fetcher.crypto_data_fetcher import CryptoDataFetcher
 from src.data.fetcher.data_fetcher import YahooFinanceFetcher
 from src.data.fetcher.options_fetcher import OptionsFetcher
+from src.data.models.compact_ohlcv import CompactOHLCV
+from src.plotting.plotter import Plotter
+from src.reporting.analysis_utils import generate_correlation_analysis
 from src.reporting.generate_report import ReportGenerator
 from src.reporting.pdf_report import PDFReportBuilder
+from src.streaming.bar_stream import (BarStreamer, CryptoBarFeed,
+                                      StreamingSignalEngine)
+from src.utils.file_manager import FileManager
+from src.utils.rate_limiter import TokenBucket
 
 
 def signal_handler(signal, frame):
@@ -22,51 +33,131 @@ warnings.filterwarnings("ignore", category=FutureWarning, module="prophet.plot")
 def is_crypto(ticker):
     return "/" in ticker
 
-def process_ticker(ticker, client):
+def create_data_fetcher(ticker):
     if is_crypto(ticker):
         data_fetcher = CryptoDataFetcher()
     else:
         data_fetcher = YahooFinanceFetcher()
 
-    data = data_fetcher.fetch_data(ticker=ticker)
+    if config.USE_DATA_CACHE:
+        data_fetcher = CachedDataFetcher(data_fetcher)
+    return data_fetcher
+
+def process_ticker(ticker, client, data=None, backtest=None, forecast=None):
+    if data is None:
+        data = create_data_fetcher(ticker).fetch_data(ticker=ticker)
 
     if data is not None and not data.empty:
         print(f"Dados para {ticker}: ", data.columns)
-        report_generator = ReportGenerator(data, ticker=ticker, client=client)
+        report_generator = ReportGenerator(data, ticker=ticker, client=client, backtest=backtest, forecast=forecast)
         report_generator.generate_report()
         report_generator.clean_up_files()
     else:
         print(f"Não foi possível buscar os dados para {ticker}.")
 
+def process_stock_tickers(tickers, client):
+    # Um único download em lote para todos os tickers da B3
+    datasets = create_data_fetcher(tickers[0]).fetch_many(tickers)
+    generate_universe_report(datasets)
+    backtests = backtest_tickers(compact_datasets(datasets) if config.USE_COMPACT_DATASETS else datasets, client)
+    forecasts = forecast_tickers(datasets, client)
+    for ticker in tickers:
+        process_ticker(ticker, client, datasets.get(ticker), backtests.get(ticker), forecasts.get(ticker))
+
+def generate_universe_report(datasets):
+    # Relatório com a correlação entre todos os tickers baixados
+    datasets = {ticker: data for ticker, data in datasets.items() if data is not None and not data.empty}
+    if len(datasets) < 2:
+        return
+    titles, descriptions, filenames = generate_correlation_analysis(
+        Plotter('universo'), datasets, window=config.CORRELATION_WINDOW, halflife=config.CORRELATION_HALFLIFE
+    )
+    if not filenames:
+        return
+    PDFReportBuilder(os.path.join(config.REPORT_PATH, "universo_report.pdf")).build(
+        'Universo', titles, descriptions, [[filename] for filename in filenames]
+    )
+    for filename in filenames:
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+def compact_datasets(datasets):
+    # Grava os datasets como memmaps: enviados ao Dask, cada um é serializado apenas pelo caminho
+    compact = {}
+    for ticker, data in datasets.items():
+        if data is not None and not data.empty:
+            path = os.path.join(config.COMPACT_DATASET_DIR, f"{FileManager.normalize_ticker_name(ticker)}_{config.DEFAULT_INTERVAL}")
+            compact[ticker] = CompactOHLCV.from_frame(data).save(path)
+    return compact
+
+def backtest_tickers(datasets, client):
+    # Walk-forward de todos os tickers distribuído no cluster Dask; o resumo comparativo vai para o log
+    datasets = {ticker: data for ticker, data in datasets.items() if data is not None and len(data)}
+    if not datasets:
+        return {}
+    backtests = WalkForwardBacktester.run_many(
+        datasets, client=client, train_size=config.WALK_FORWARD_TRAIN_BARS, test_size=config.WALK_FORWARD_TEST_BARS,
+        cost=config.TRANSACTION_COST, slippage=config.SLIPPAGE
+    )
+    logging.info(f"Resumo do walk-forward:\n{WalkForwardBacktester.summary_table(backtests)}")
+    return backtests
+
+def forecast_tickers(datasets, client):
+    # Com um motor leve, as previsões de todos os tickers são feitas em lote antes dos relatórios
+    if config.FORECAST_ENGINE == 'prophet':
+        return {}
+    return LinearForecastAnalysis(
+        datasets, config.DEFAULT_FUTURE_PERIODS, engine=config.FORECAST_ENGINE, client=client
+    ).analyze()
+
+def stream_crypto_tickers(tickers):
+    streams = {}
+    for ticker in tickers:
+        feed = CryptoBarFeed(CryptoDataFetcher(), ticker, config.DEFAULT_INTERVAL)
+        engine = StreamingSignalEngine()
+        history = create_data_fetcher(ticker).fetch_data(ticker=ticker)
+        if history is not None and not history.empty:
+            engine.warm_up(feed.closed_bars(history))
+        streams[ticker] = (feed, engine)
+    BarStreamer(streams, poll_interval=config.STREAMING_POLL_INTERVAL).run()
+
 def fetch_and_process_options(tickers):
+    # Um único limitador para todos os tickers substitui a pausa fixa entre eles
+    rate_limiter = TokenBucket.from_interval_ms(config.OPTIONS_REQUEST_INTERVAL_MS)
     for ticker in tickers:
-        options_fetcher = OptionsFetcher(ticker)
+        options_fetcher = OptionsFetcher(ticker, rate_limiter=rate_limiter)
         tk = options_fetcher.fetch_options_data()
         if tk:
             expiry_dates = options_fetcher.get_expiry_dates(tk)
             if expiry_dates:
-                for exp_date in expiry_dates:
-                    all_options = options_fetcher.parse_options_data(tk, exp_date)
-                    if all_options is not None:
-                        print(f"Opções para {ticker} na data de expiração {exp_date}:")
-                        print(all_options)
-                    else:
-                        print(f"Failed to parse options data for {ticker} at expiration date {exp_date}.")
+                all_options = options_fetcher.fetch_all_options(tk, expiry_dates)
+                spot_price = options_fetcher.get_spot_price(tk)
+                if all_options is not None and spot_price is not None:
+                    analyzed = OptionsAnalysis(all_options, spot_price).analyze()
+                    print(f"Opções para {ticker} (spot {spot_price:.2f}):")
+                    print(analyzed)
+                    print(OptionsAnalysis.volatility_surface(analyzed))
+                else:
+                    print(f"Failed to parse options data for {ticker}.")
             else:
                 print(f"Failed to fetch expiry dates for {ticker}.")
         else:
             print(f"Failed to fetch options data for {ticker}.")
-        time.sleep(5)
 
 if __name__ == "__main__":
     signal.signal(signal.SIGINT, signal_handler)
 
     # fetch_and_process_options(config.tickers)
 
+    if config.STREAMING_MODE:
+        stream_crypto_tickers([ticker for ticker in config.tickers if is_crypto(ticker)])
+        exit(0)
+
     with Client() as client:
         for ticker in config.tickers:
             if is_crypto(ticker):
                 process_ticker(ticker, client)
-            else:
-                for ticker in config.set_next_ticker():
-                    process_ticker(ticker, client)
+
+        stock_tickers = [ticker for ticker in config.set_next_ticker() if not is_crypto(ticker)]
+        if stock_tickers:
+            process_stock_tickers(stock_tickers, client)
@@ -0,0 +1,199 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from src.analysis.i_analysis import IAnalysis
+
+
+class PairwiseMoments:
+    """
+    Somas pareadas (N x N) de peso, retorno, retorno ao quadrado e produto cruzado, acumulando cada par
+    apenas nas barras em que os dois ativos têm retorno (como o `corr`/`cov` do pandas, par a par).
+    Cada atualização custa O(N²), independentemente do tamanho da janela.
+    """
+
+    def __init__(self, n_assets):
+        shape = (n_assets, n_assets)
+        self.weights = np.zeros(shape)
+        self.squared_weights = np.zeros(shape)  # soma dos pesos ao quadrado, para a correção de viés ponderada
+        self.sums = np.zeros(shape)  # sums[i, j]: soma dos retornos de i nas barras em que i e j existem
+        self.squares = np.zeros(shape)
+        self.products = np.zeros(shape)
+
+    def add(self, x, weight=1.0):
+        observed = ~np.isnan(x)
+        values = np.where(observed, x, 0.0)
+        mask = observed.astype(float)
+        self.weights += weight * np.outer(mask, mask)
+        self.squared_weights += weight * abs(weight) * np.outer(mask, mask)
+        self.sums += weight * np.outer(values, mask)
+        self.squares += weight * np.outer(values * values, mask)
+        self.products += weight * np.outer(values, values)
+
+    def scale(self, factor):
+        self.weights *= factor
+        self.squared_weights *= factor * factor
+        self.sums *= factor
+        self.squares *= factor
+        self.products *= factor
+
+    def moments(self, min_weight, ddof=0, bias=True):
+        """
+        Covariância e variâncias de cada par (i nas linhas, j nas colunas); NaN para pares com peso insuficiente.
+        Com `bias=False`, aplica a correção de viés para pesos (W² / (W² - ΣW²)), como o ewm().cov() do pandas.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = np.where(self.weights >= max(min_weight, ddof + 1e-12), self.weights, np.nan)
+            mean_row, mean_column = self.sums / weights, self.sums.T / weights
+            if bias:
+                correction = weights / (weights - ddof)
+            else:
+                denominator = weights ** 2 - self.squared_weights
+                correction = np.where(denominator > 0, weights ** 2 / denominator, np.nan)
+            covariance = (self.products / weights - mean_row * mean_column) * correction
+            variance_row = np.maximum(self.squares / weights - mean_row ** 2, 0) * correction
+            variance_column = np.maximum(self.squares.T / weights - mean_column ** 2, 0) * correction
+        return covariance, variance_row, variance_column
+
+    def correlation(self, min_weight, ddof=0):
+        # A correção de viés é a mesma para covariância e variâncias do par e se cancela na correlação
+        covariance, variance_row, variance_column = self.moments(min_weight, ddof)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.clip(covariance / np.sqrt(variance_row * variance_column), -1, 1)
+
+
+class RollingCovariance:
+    """
+    Covariância e correlação móveis de `window` barras, atualizadas incrementalmente: a barra que entra
+    é somada e a que sai da janela é subtraída (ddof=1, como rolling(window).cov()/corr() do pandas).
+    """
+
+    def __init__(self, n_assets, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.buffer = np.full((window, n_assets), np.nan)
+        self.count = 0
+        self.moments = PairwiseMoments(n_assets)
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        slot = self.count % self.window
+        if self.count >= self.window:
+            self.moments.add(self.buffer[slot], weight=-1.0)
+        self.buffer[slot] = x
+        self.moments.add(x)
+        self.count += 1
+
+    def covariance(self):
+        return self.moments.moments(self.min_periods, ddof=1)[0]
+
+    def correlation(self):
+        return self.moments.correlation(self.min_periods, ddof=1)
+
+
+class EWMACovariance:
+    """
+    Covariância e correlação com ponderação exponencial (meia-vida em barras), O(N²) por barra. A
+    covariância tem correção de viés, como ewm(halflife=...).cov() do pandas (bias=False).
+    """
+
+    def __init__(self, n_assets, halflife, min_periods=1):
+        self.decay = 0.5 ** (1.0 / halflife)
+        self.min_periods = min_periods
+        self.count = 0
+        self.moments = PairwiseMoments(n_assets)
+
+    def update(self, x):
+        self.moments.scale(self.decay)
+        self.moments.add(np.asarray(x, dtype=float), weight=1 - self.decay)
+        self.count += 1
+
+    def _min_weight(self):
+        # Pesos normalizados: basta exigir algum peso depois de `min_periods` barras
+        return 1e-12 if self.count >= self.min_periods else np.inf
+
+    def covariance(self):
+        return self.moments.moments(self._min_weight(), bias=False)[0]
+
+    def correlation(self):
+        return self.moments.correlation(self._min_weight())
+
+
+class CorrelationAnalysis(IAnalysis):
+    """
+    Correlações e covariâncias entre ativos, móveis e com ponderação exponencial, sobre um painel de
+    retornos (tempo x ticker). As matrizes são atualizadas barra a barra e guardadas em float32 apenas a
+    cada `snapshot_every` barras (e sempre na última), sem criar um DataFrame por janela.
+    """
+
+    def __init__(self, returns, window=60, halflife=30, snapshot_every=None, min_periods=None):
+        self.logger = logging.getLogger(__name__)
+        self.returns = returns
+        self.window = window
+        self.halflife = halflife
+        self.snapshot_every = snapshot_every
+        self.min_periods = min_periods
+
+    @staticmethod
+    def build_returns_panel(datasets, column='Close'):
+        """
+        Painel de retornos simples (tempo x ticker) a partir de {ticker: DataFrame com 'ds'}. O retorno de
+        cada ticker é calculado sobre as suas próprias barras e depois alinhado pela união das datas.
+        """
+        returns = {ticker: data.set_index('ds')[column].pct_change() for ticker, data in datasets.items()}
+        return pd.DataFrame(returns).sort_index().dropna(how='all')
+
+    @staticmethod
+    def _average_correlation(correlation):
+        off_diagonal = ~np.eye(len(correlation), dtype=bool)
+        values = correlation[off_diagonal]
+        values = values[~np.isnan(values)]
+        return values.mean() if len(values) else np.nan
+
+    def analyze(self):
+        """
+        Retorna um dict com os tickers, as datas dos snapshots, as matrizes (snapshots x N x N, float32) de
+        correlação e covariância móveis e exponenciais, a correlação média entre pares a cada barra e as
+        matrizes da última barra como DataFrames.
+        """
+        values = self.returns.to_numpy(dtype=float)
+        n_bars, n_assets = values.shape
+        if n_bars == 0 or n_assets < 2:
+            self.logger.error("São necessários ao menos dois ativos com retornos para a análise de correlação.")
+            return None
+
+        rolling = RollingCovariance(n_assets, self.window, self.min_periods)
+        ewma = EWMACovariance(n_assets, self.halflife, self.min_periods or 1)
+
+        every = self.snapshot_every or n_bars
+        snapshots = sorted(set(range(every - 1, n_bars, every)) | {n_bars - 1})
+        results = {name: np.empty((len(snapshots), n_assets, n_assets), dtype=np.float32)
+                   for name in ('rolling_correlation', 'rolling_covariance', 'ewma_correlation', 'ewma_covariance')}
+        average = np.empty((n_bars, 2), dtype=np.float32)
+
+        snapshot = 0
+        for t in range(n_bars):
+            rolling.update(values[t])
+            ewma.update(values[t])
+            rolling_correlation, ewma_correlation = rolling.correlation(), ewma.correlation()
+            average[t] = self._average_correlation(rolling_correlation), self._average_correlation(ewma_correlation)
+
+            if snapshot < len(snapshots) and t == snapshots[snapshot]:
+                results['rolling_correlation'][snapshot] = rolling_correlation
+                results['rolling_covariance'][snapshot] = rolling.covariance()
+                results['ewma_correlation'][snapshot] = ewma_correlation
+                results['ewma_covariance'][snapshot] = ewma.covariance()
+                snapshot += 1
+
+        tickers = list(self.returns.columns)
+        self.logger.info(f"Correlações calculadas para {n_assets} ativos em {n_bars} barras.")
+        return {
+            'tickers': tickers,
+            'timestamps': self.returns.index[snapshots],
+            **results,
+            'average_correlation': pd.DataFrame(average, index=self.returns.index, columns=['rolling', 'ewma']),
+            'latest': {
+                'rolling': pd.DataFrame(results['rolling_correlation'][-1], index=tickers, columns=tickers),
+                'ewma': pd.DataFrame(results['ewma_correlation'][-1], index=tickers, columns=tickers),
+            },
+        }
@@ -1,4 +1,23 @@
+import logging
+import os
+
+import config
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+from src.analysis.online_indicators import IncrementalIndicators
+from src.data.models.dataset_metadata import DatasetMetadata
+from src.utils.state_store import StateStore
+
+
 class IndicatorCalculator:
+    # Barras já processadas (as últimas até o estado salvo) conferidas por hash antes de retomar o cálculo
+    RESUME_CHECK_BARS = 256
+    RESUME_CHECK_COLUMNS = ('Open', 'High', 'Low', 'Close')
+    # Peso relativo a partir do qual a barra inicial deixa de influenciar a EMA (fim do aquecimento)
+    EMA_WARMUP_TOLERANCE = 1e-12
+
     @staticmethod
     def calculate_RSI(data, column='Close', period=14):
         delta = data[column].diff()
@@ -23,3 +42,184 @@ class IndicatorCalculator:
         data['HiLo_High'] = data[high_column].rolling(window=period).max()
         data['HiLo_Low'] = data[low_column].rolling(window=period).min()
         return data
+
+    @staticmethod
+    def build_panel(datasets, fields=('Close', 'High', 'Low')):
+        """
+        Monta painéis largos (tempo x ticker) a partir de {ticker: DataFrame com 'ds'}, alinhados pela união
+        das datas. Onde um ticker não negociou, o painel fica com NaN.
+        """
+        return {
+            field: pd.DataFrame({ticker: data.set_index('ds')[field] for ticker, data in datasets.items()}).sort_index()
+            for field in fields
+        }
+
+    @staticmethod
+    def calculate_panel(close, high, low, rsi_period=14, ema_period=21, hilo_period=14):
+        """
+        Calcula RSI, EMA e HiLo para todos os tickers de uma vez sobre painéis (tempo x ticker), em arrays
+        NumPy ou DataFrames largos (ver build_panel). Linhas com Close NaN são tratadas como ausentes para
+        aquele ticker: as janelas contam apenas as barras do próprio ticker, como nos métodos por ticker,
+        cujos resultados são reproduzidos a menos de arredondamento de ponto flutuante.
+        """
+        index = columns = None
+        if isinstance(close, pd.DataFrame):
+            index, columns = close.index, close.columns
+            high, low = high.reindex(index=index, columns=columns), low.reindex(index=index, columns=columns)
+        close, high, low = (np.asarray(panel, dtype=float) for panel in (close, high, low))
+
+        # Move as barras de cada ticker para o topo da coluna, preservando a ordem, para que as janelas
+        # móveis percorram apenas o calendário do próprio ticker; o resultado é devolvido às linhas originais.
+        valid = ~np.isnan(close)
+        order = np.argsort(~valid, axis=0, kind='stable')
+
+        def compact(panel):
+            return np.take_along_axis(panel, order, axis=0)
+
+        def restore(panel):
+            result = np.full(panel.shape, np.nan)
+            np.put_along_axis(result, order, panel, axis=0)
+            result[~valid] = np.nan
+            return result
+
+        compact_close = compact(close)
+        results = {
+            'RSI': restore(IndicatorCalculator._panel_rsi(compact_close, rsi_period)),
+            f'EMA_{ema_period}': restore(IndicatorCalculator._panel_ema(compact_close, ema_period)),
+            'HiLo_High': restore(IndicatorCalculator._panel_rolling(compact(high), hilo_period, np.max)),
+            'HiLo_Low': restore(IndicatorCalculator._panel_rolling(compact(low), hilo_period, np.min)),
+        }
+
+        if index is not None:
+            return {name: pd.DataFrame(values, index=index, columns=columns) for name, values in results.items()}
+        return results
+
+    @staticmethod
+    def _panel_rsi(close, period):
+        delta = np.diff(close, axis=0, prepend=np.nan)
+        gains = np.clip(delta, 0, None)
+        losses = -np.clip(delta, None, 0)
+
+        def rolling_mean(values):
+            # Média móvel com min_periods=1 ignorando NaN, via somas acumuladas
+            observed = ~np.isnan(values)
+            sums = np.concatenate([np.zeros((1, values.shape[1])), np.cumsum(np.where(observed, values, 0), axis=0)])
+            counts = np.concatenate([np.zeros((1, values.shape[1])), np.cumsum(observed, axis=0)])
+            start = np.maximum(np.arange(1, len(values) + 1) - period, 0)
+            window_sums = np.maximum(sums[1:] - sums[start], 0)
+            window_counts = counts[1:] - counts[start]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = rolling_mean(gains) / rolling_mean(losses)
+            return 100 - (100 / (1 + rs))
+
+    @staticmethod
+    def _panel_ema(close, period):
+        # ewm(span=period, adjust=False): y[t] = alpha * x[t] + (1 - alpha) * y[t-1], com y[0] = x[0]
+        alpha = 2.0 / (period + 1)
+        if len(close) == 0:
+            return close.copy()
+        initial_state = ((1 - alpha) * close[0])[np.newaxis, :]
+        ema, _ = lfilter([alpha], [1, -(1 - alpha)], close, axis=0, zi=initial_state)
+        return ema
+
+    @staticmethod
+    def _panel_rolling(values, period, reducer):
+        # rolling(window=period) com min_periods=period: as primeiras period-1 linhas ficam NaN
+        padded = np.concatenate([np.full((period - 1, values.shape[1]), np.nan), values])
+        return reducer(sliding_window_view(padded, period, axis=0), axis=-1)
+
+    @staticmethod
+    def calculate_incremental(data, key, rsi_period=14, ema_period=21, hilo_period=14, store=None):
+        """
+        Calcula RSI, EMA e HiLo processando apenas as barras posteriores às da última execução para `key`
+        (ex: ticker + intervalo), a partir do estado e dos valores salvos. Retorna uma cópia de `data`
+        com as colunas dos indicadores; `data` não é alterado.
+
+        Se a janela de `data` começa depois da salva (ex: período móvel de '2y'), as barras iniciais de
+        aquecimento são recalculadas sobre a nova janela, reproduzindo os métodos por ticker no mesmo DataFrame.
+        """
+        store = store or StateStore(config.INDICATOR_STATE_DIR)
+        columns_path = store.path(key, '.parquet')
+        state = store.load(key)
+        previous = pd.read_parquet(columns_path) if state and os.path.isfile(columns_path) else None
+
+        if previous is not None and IndicatorCalculator._can_resume(data, state, previous, rsi_period, ema_period, hilo_period):
+            indicators = IncrementalIndicators.from_state(state)
+        else:
+            logging.info(f"Sem estado reaproveitável de indicadores para {key}; calculando o histórico completo.")
+            indicators = IncrementalIndicators(rsi_period, ema_period, hilo_period)
+            previous = None
+
+        fresh = indicators.update(data)
+        fresh.insert(0, 'ds', data.loc[fresh.index, 'ds'].to_numpy())
+        logging.info(f"Indicadores de {key} atualizados com {len(fresh)} novas barras.")
+
+        values = fresh if previous is None else pd.concat([previous, fresh], ignore_index=True)
+        window_moved = previous is not None and previous['ds'].min() < data['ds'].min()
+        values = values[values['ds'] >= data['ds'].min()].reset_index(drop=True)
+        if window_moved:
+            values = IndicatorCalculator._recompute_warmup(data, values, rsi_period, ema_period, hilo_period)
+        values.to_parquet(columns_path, index=False)
+        state = indicators.get_state()
+        state['processed_hash'] = IndicatorCalculator._processed_hash(data, indicators.last_timestamp)
+        store.save(key, state)
+
+        result = data.drop(columns=indicators.output_columns, errors='ignore')
+        return result.merge(values, on='ds', how='left')
+
+    @staticmethod
+    def _warmup_rows(data, rsi_period, ema_period, hilo_period, column='Close'):
+        """
+        Barras iniciais cujos indicadores dependem do início da janela. RSI e HiLo usam janelas de até `period`
+        barras; na EMA, a influência da primeira barra cai (1 - alpha) a cada valor observado, até ficar abaixo
+        de EMA_WARMUP_TOLERANCE.
+        """
+        alpha = 2.0 / (ema_period + 1)
+        ema_values = int(np.ceil(np.log(IndicatorCalculator.EMA_WARMUP_TOLERANCE) / np.log(1 - alpha)))
+        observed = np.flatnonzero(data[column].notna().to_numpy())
+        ema_rows = observed[ema_values] + 1 if len(observed) > ema_values else len(data) + 1
+        return max(rsi_period, hilo_period, ema_rows)
+
+    @staticmethod
+    def _recompute_warmup(data, values, rsi_period, ema_period, hilo_period):
+        """Recalcula os indicadores das barras de aquecimento da janela atual com os métodos por ticker."""
+        head = data.head(IndicatorCalculator._warmup_rows(data, rsi_period, ema_period, hilo_period)).copy()
+        head = IndicatorCalculator.calculate_RSI(head, period=rsi_period)
+        head = IndicatorCalculator.calculate_EMA(head, period=ema_period)
+        head = IndicatorCalculator.calculate_HiLo(head, period=hilo_period)
+        columns = [column for column in values.columns if column != 'ds']
+        rows = values['ds'].isin(head['ds'])
+        values.loc[rows, columns] = head.loc[head['ds'].isin(values['ds']), columns].to_numpy()
+        return values
+
+    @staticmethod
+    def _processed_hash(data, last_timestamp):
+        """Hash dos valores OHLC das últimas RESUME_CHECK_BARS barras até `last_timestamp`."""
+        if last_timestamp is None:
+            return None
+        processed = data[data['ds'] <= last_timestamp].tail(IndicatorCalculator.RESUME_CHECK_BARS)
+        return DatasetMetadata.content_hash_of(processed, ('ds',) + IndicatorCalculator.RESUME_CHECK_COLUMNS)
+
+    @staticmethod
+    def _can_resume(data, state, previous, rsi_period, ema_period, hilo_period):
+        """
+        O estado só é reaproveitável se os períodos batem e as barras já processadas continuam em `data` com
+        os mesmos valores (preços reajustados por proventos ou desdobramentos exigem recalcular o histórico).
+        """
+        if (state['rsi']['period'], state['ema']['period'], state['hilo']['high']['period']) != (rsi_period, ema_period, hilo_period):
+            return False
+        if state['last_timestamp'] is None:
+            return False
+        last_timestamp = pd.Timestamp(state['last_timestamp'])
+        processed = data.loc[data['ds'] <= last_timestamp, 'ds']
+        if processed.empty or processed.iloc[-1] != last_timestamp:
+            return False
+        if not np.isin(processed.to_numpy(), previous['ds'].to_numpy()).all():
+            return False
+        if previous['ds'].min() < data['ds'].min() and len(data) < IndicatorCalculator._warmup_rows(data, rsi_period, ema_period, hilo_period):
+            # Janela deslocada e curta demais: o estado final ainda carrega a influência das barras descartadas
+            return False
+        return state.get('processed_hash') == IndicatorCalculator._processed_hash(data, last_timestamp)
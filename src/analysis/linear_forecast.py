@@ -0,0 +1,315 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import config
+import numpy as np
+import pandas as pd
+from prophet.make_holidays import make_holidays_df
+from scipy.stats import norm
+from src.analysis.i_analysis import IAnalysis
+from src.data.models.dataset_metadata import DatasetMetadata
+from src.optimization.data_preparation import DataPreparation
+
+NANOSECONDS_PER_DAY = 86400 * 10 ** 9
+
+
+def _fit_statsmodels(y, engine, steps, interval_width, arima_order):
+    # Função de módulo para poder ser serializada pelo pool de processos e pelo Dask
+    try:
+        alpha = 1 - interval_width
+        # Índice posicional: os resultados de previsão do statsmodels precisam de um índice para montar o summary_frame
+        endog = pd.Series(y)
+        if engine == 'ets':
+            from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+            result = ETSModel(endog, error='add', trend='add', damped_trend=True).fit(disp=False)
+            frame = result.get_prediction(start=len(y), end=len(y) + steps - 1).summary_frame(alpha=alpha)
+            lower, upper = frame['pi_lower'], frame['pi_upper']
+        else:
+            from statsmodels.tsa.arima.model import ARIMA
+            result = ARIMA(endog, order=arima_order).fit()
+            frame = result.get_forecast(steps).summary_frame(alpha=alpha)
+            lower, upper = frame['mean_ci_lower'], frame['mean_ci_upper']
+        fitted = np.array(result.fittedvalues, dtype=float)
+        # Os primeiros valores ajustados de um modelo diferenciado não têm histórico; usa o próprio dado
+        differences = arima_order[1] if engine == 'arima' else 0
+        fitted[:differences] = y[:differences]
+        return fitted, frame['mean'].to_numpy(), lower.to_numpy(), upper.to_numpy()
+    except ImportError:
+        logging.getLogger(__name__).error("Os motores 'ets' e 'arima' requerem o pacote statsmodels.")
+        return None
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Erro no ajuste {engine.upper()}: {e}")
+        return None
+
+
+class LinearForecastAnalysis(IAnalysis):
+    """
+    Previsão leve para muitas séries de uma vez, alternativa ao Prophet para triagem do universo.
+
+    O motor 'linear' ajusta tendência linear + termos de Fourier das sazonalidades + dummies de feriados
+    por mínimos quadrados (com uma pequena penalidade ridge nas sazonalidades e feriados, que zera os
+    feriados nunca observados) para todas as séries em lote: as séries são alinhadas em uma grade de datas
+    comum e cada uma usa apenas as suas barras (máscara), de modo que as equações normais de todas saem de
+    um único produto matricial. As sazonalidades de cada série vêm do seu próprio DatasetMetadata
+    (frequência e duração) e só séries com a mesma configuração são ajustadas no mesmo lote; intercepto e
+    tendência não são penalizados, então a escala da tendência na grade do lote não altera o ajuste. Assim, a
+    previsão de uma série não depende das demais. Os cutoffs da validação cruzada são apenas outras máscaras
+    (barras até o cutoff) e entram no mesmo lote.
+
+    Os motores 'ets' (suavização exponencial com tendência amortecida) e 'arima' usam o statsmodels (opcional)
+    e ajustam uma série por vez, no `client` Dask ou em um pool de processos; não fazem validação cruzada.
+
+    O intervalo é yhat ± z * desvio padrão dos resíduos (sem a incerteza da tendência, ao contrário do Prophet).
+    """
+
+    ENGINES = ('linear', 'ets', 'arima')
+
+    def __init__(self, datasets, future_periods, engine='linear', interval_width=0.8, ridge=1e-3, cross_validate=True,
+                 country_name=config.COUNTRY_NAME, arima_order=(1, 1, 1), chunk_size=256, client=None, max_workers=None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Motor de previsão desconhecido: {engine}. Opções: {', '.join(self.ENGINES)}")
+        self.logger = logging.getLogger(__name__)
+        self.datasets = {ticker: data for ticker, data in datasets.items() if data is not None and not data.empty}
+        self.future_periods = future_periods
+        self.engine = engine
+        self.interval_width = interval_width
+        self.z = norm.ppf(0.5 + interval_width / 2)
+        self.ridge = ridge
+        self.cross_validate = cross_validate
+        self.country_name = country_name
+        self.arima_order = arima_order
+        self.chunk_size = chunk_size
+        self.client = client
+        self.max_workers = max_workers
+        self.metadata = {ticker: DatasetMetadata.of(data) for ticker, data in self.datasets.items()}
+
+    def analyze(self):
+        """Retorna {ticker: {'forecast': DataFrame (ds, yhat, yhat_lower, yhat_upper), 'df_cv': DataFrame ou None}} (None para falhas)."""
+        if not self.datasets:
+            return {}
+        if self.engine == 'linear':
+            return self._analyze_linear()
+        return self._analyze_statsmodels()
+
+    def _future_dates(self, ticker):
+        metadata = self.metadata[ticker]
+        frequency = metadata.frequency or pd.Timedelta(days=1)
+        return pd.DatetimeIndex([metadata.end + frequency * step for step in range(1, self.future_periods + 1)])
+
+    # Motor linear em lote
+
+    def _build_panel(self, tickers):
+        """Grade de datas comum às séries e matriz (datas x séries) dos valores, com NaN onde não há barra."""
+        series_dates = {ticker: pd.to_datetime(self.datasets[ticker]['ds']).to_numpy(dtype='datetime64[ns]') for ticker in tickers}
+        dates = np.unique(np.concatenate(list(series_dates.values())))
+        values = np.full((len(dates), len(tickers)), np.nan)
+        rows = {}
+        for column, ticker in enumerate(tickers):
+            rows[ticker] = np.searchsorted(dates, series_dates[ticker])
+            values[rows[ticker], column] = self.datasets[ticker]['y'].to_numpy(dtype=float)
+        return pd.DatetimeIndex(dates), values, rows
+
+    def _seasonalities(self, ticker):
+        """Sazonalidades da série, pela frequência e duração do seu próprio histórico: {nome: (período em dias, ordem de Fourier)}."""
+        metadata = self.metadata[ticker]
+        frequency = metadata.frequency or pd.Timedelta(days=1)
+        span = metadata.span
+
+        # A mensal é a mesma usada na configuração do Prophet
+        seasonalities = {}
+        if frequency < pd.Timedelta(days=1):
+            seasonalities['daily'] = (1.0, 4)
+        if frequency < pd.Timedelta(days=7) and span >= pd.Timedelta(days=14):
+            seasonalities['weekly'] = (7.0, 3)
+        if span >= pd.Timedelta(days=61):
+            seasonalities['monthly'] = (30.5, 7)
+        if span >= pd.Timedelta(days=730):
+            seasonalities['yearly'] = (365.25, 10)
+        return seasonalities
+
+    def _configure_features(self, tickers, dates, seasonalities):
+        """
+        Configura os regressores de um lote de séries com as mesmas sazonalidades. Os feriados cobrem os anos
+        das séries do lote e das suas previsões; feriados fora das datas de uma série são colunas nulas para ela
+        e têm coeficiente zero (ridge), sem efeito sobre os demais.
+        """
+        self.seasonalities = seasonalities
+        self.start = dates[0].value
+        self.scale = max(dates[-1].value - self.start, 1)
+        last_date = max(self._future_dates(ticker)[-1] for ticker in tickers) if self.future_periods else dates[-1]
+        self.holidays = {}
+        if self.country_name:
+            holidays = make_holidays_df(year_list=list(range(dates[0].year, last_date.year + 1)), country=self.country_name)
+            self.holidays = {name: pd.DatetimeIndex(group['ds']) for name, group in holidays.groupby('holiday')}
+
+    def _design(self, dates):
+        """Matriz de regressores para as datas: intercepto, tendência, pares seno/cosseno e dummies de feriados."""
+        timestamps = dates.asi8
+        columns = [np.ones(len(dates)), (timestamps - self.start) / self.scale]
+        epoch_days = timestamps / NANOSECONDS_PER_DAY
+        for period, order in self.seasonalities.values():
+            for i in range(1, order + 1):
+                angle = 2 * np.pi * i * epoch_days / period
+                columns.extend([np.sin(angle), np.cos(angle)])
+        normalized = dates.normalize()
+        for holiday_dates in self.holidays.values():
+            columns.append(normalized.isin(holiday_dates).astype(float))
+        return np.column_stack(columns)
+
+    def _solve(self, X, timestamps, values, valid, series, limits):
+        """
+        Mínimos quadrados com máscara para várias colunas de uma vez. A coluna j usa a série `series[j]` até
+        a data `limits[j]` (ns). As equações normais X'MX de cada coluna saem de um único produto entre as
+        máscaras e os produtos externos das linhas de X. Retorna os coeficientes (colunas x regressores) e o
+        desvio padrão dos resíduos (NaN para colunas com barras insuficientes). Os graus de liberdade contam
+        apenas os regressores não nulos nas barras de cada coluna (ex: feriados observados).
+        """
+        n_features = X.shape[1]
+        outer = (X[:, :, None] * X[:, None, :]).reshape(len(X), n_features * n_features)
+        nonzero = (X != 0).astype(float)
+        # Intercepto e tendência sem penalidade: o ajuste não depende da origem nem da escala da tendência
+        penalty = self.ridge * np.eye(n_features)
+        penalty[0, 0] = penalty[1, 1] = 0.0
+
+        betas = np.empty((len(series), n_features))
+        sigmas = np.empty(len(series))
+        for start in range(0, len(series), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            mask = (valid[:, series[chunk]] & (timestamps[:, None] <= limits[None, chunk])).astype(float)
+            y = np.where(mask > 0, values[:, series[chunk]], 0.0)
+
+            normal = (mask.T @ outer).reshape(-1, n_features, n_features) + penalty
+            beta = np.linalg.solve(normal, (X.T @ y).T[..., None])[..., 0]
+            residuals = (y - X @ beta.T) * mask
+            observations = mask.sum(axis=0)
+            used_features = ((mask.T @ nonzero) > 0).sum(axis=1)
+            sigma = np.sqrt((residuals ** 2).sum(axis=0) / np.maximum(observations - used_features, 1))
+
+            insufficient = observations < used_features + 2
+            beta[insufficient] = np.nan
+            sigma[insufficient] = np.nan
+            betas[chunk], sigmas[chunk] = beta, sigma
+        return betas, sigmas
+
+    def _cutoff_columns(self, tickers):
+        """Colunas (série, cutoff, horizonte) da validação cruzada, com os mesmos cutoffs do Prophet."""
+        columns = []
+        for column, ticker in enumerate(tickers):
+            data = self.datasets[ticker]
+            _, _, horizon, cutoffs = DataPreparation.calculate_cutoffs(data, self.future_periods, self.metadata[ticker].is_intraday)
+            columns.extend((column, pd.Timestamp(cutoff), horizon) for cutoff in cutoffs)
+        return columns
+
+    def _cross_validation(self, tickers, dates, X, values, valid):
+        columns = self._cutoff_columns(tickers)
+        if not columns:
+            return {}
+        series = np.array([column for column, _, _ in columns])
+        cutoffs = np.array([cutoff.value for _, cutoff, _ in columns])
+        ends = cutoffs + np.array([horizon.value for _, _, horizon in columns])
+        betas, sigmas = self._solve(X, dates.asi8, values, valid, series, cutoffs)
+
+        frames = {ticker: [] for ticker in tickers}
+        timestamps = dates.asi8
+        for start in range(0, len(series), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            evaluated = valid[:, series[chunk]] & (timestamps[:, None] > cutoffs[None, chunk]) & (timestamps[:, None] <= ends[None, chunk])
+            rows, positions = np.nonzero(evaluated)
+            predictions = (X @ betas[chunk].T)[rows, positions]
+            margin = self.z * sigmas[chunk][positions]
+            columns_in_chunk = positions + start
+            frame = pd.DataFrame({
+                'ds': dates[rows],
+                'yhat': predictions,
+                'yhat_lower': predictions - margin,
+                'yhat_upper': predictions + margin,
+                'y': values[rows, series[columns_in_chunk]],
+                'cutoff': pd.to_datetime(cutoffs[columns_in_chunk]),
+                'series': series[columns_in_chunk],
+            }).dropna(subset=['yhat'])
+            for column, group in frame.groupby('series'):
+                frames[tickers[column]].append(group.drop(columns='series'))
+
+        return {
+            ticker: pd.concat(parts, ignore_index=True).sort_values(['cutoff', 'ds'], ignore_index=True) if parts else None
+            for ticker, parts in frames.items()
+        }
+
+    def _analyze_linear(self):
+        # Um lote por configuração de sazonalidades, para que a previsão de cada série dependa só dos seus dados
+        groups = {}
+        for ticker in self.datasets:
+            seasonalities = self._seasonalities(ticker)
+            groups.setdefault(tuple(seasonalities.items()), []).append(ticker)
+
+        results = {}
+        for configuration, tickers in groups.items():
+            results.update(self._analyze_linear_batch(tickers, dict(configuration)))
+        return results
+
+    def _analyze_linear_batch(self, tickers, seasonalities):
+        dates, values, rows = self._build_panel(tickers)
+        self._configure_features(tickers, dates, seasonalities)
+        X = self._design(dates)
+        valid = ~np.isnan(values)
+        self.logger.info(f"Ajustando {len(tickers)} séries com {X.shape[1]} regressores em {len(dates)} datas "
+                         f"(sazonalidades: {', '.join(seasonalities) or 'nenhuma'})")
+
+        series = np.arange(len(tickers))
+        betas, sigmas = self._solve(X, dates.asi8, values, valid, series, np.full(len(tickers), np.iinfo(np.int64).max))
+        cross_validations = self._cross_validation(tickers, dates, X, values, valid) if self.cross_validate else {}
+
+        results = {}
+        for column, ticker in enumerate(tickers):
+            if np.isnan(sigmas[column]):
+                self.logger.warning(f"{ticker}: dados insuficientes para o ajuste linear.")
+                results[ticker] = None
+                continue
+            future_dates = self._future_dates(ticker)
+            design = np.vstack([X[rows[ticker]], self._design(future_dates)])
+            yhat = design @ betas[column]
+            results[ticker] = {
+                'forecast': self._forecast_frame(dates[rows[ticker]].append(future_dates), yhat, yhat - self.z * sigmas[column],
+                                                 yhat + self.z * sigmas[column], trend=design[:, :2] @ betas[column, :2]),
+                'df_cv': cross_validations.get(ticker),
+            }
+        return results
+
+    @staticmethod
+    def _forecast_frame(dates, yhat, lower, upper, trend=None):
+        # Mesmo esquema do forecast do Prophet (colunas usadas pelo Plotter)
+        forecast = pd.DataFrame({'ds': dates, 'yhat': yhat, 'yhat_lower': lower, 'yhat_upper': upper})
+        if trend is not None:
+            forecast.insert(1, 'trend', trend)
+        return forecast
+
+    # Motores do statsmodels, uma série por vez
+
+    def _analyze_statsmodels(self):
+        tickers = list(self.datasets)
+        series = [self.datasets[ticker]['y'].to_numpy(dtype=float) for ticker in tickers]
+        fit = partial(_fit_statsmodels, engine=self.engine, steps=self.future_periods,
+                      interval_width=self.interval_width, arima_order=self.arima_order)
+        if self.client is not None:
+            futures = self.client.map(fit, series, key=[f"{self.engine}-{ticker}" for ticker in tickers])
+            fits = self.client.gather(futures)
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                fits = list(executor.map(fit, series))
+
+        results = {}
+        for ticker, y, fitted in zip(tickers, series, fits):
+            if fitted is None:
+                results[ticker] = None
+                continue
+            history, mean, lower, upper = fitted
+            margin = self.z * np.std(y - history)
+            yhat = np.concatenate([history, mean])
+            forecast_dates = pd.DatetimeIndex(pd.to_datetime(self.datasets[ticker]['ds'])).append(self._future_dates(ticker))
+            results[ticker] = {
+                'forecast': self._forecast_frame(forecast_dates, yhat, np.concatenate([history - margin, lower]),
+                                                 np.concatenate([history + margin, upper])),
+                'df_cv': None,
+            }
+        return results
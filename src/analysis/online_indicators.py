@@ -0,0 +1,253 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class OnlineRSI:
+    """
+    Contraparte incremental de IndicatorCalculator.calculate_RSI. Assim como a versão em lote, as médias
+    de ganhos e perdas são médias móveis simples de `period` barras (com min_periods=1), e não a
+    suavização de Wilder, para que os dois caminhos produzam os mesmos valores.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous = np.nan
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+        self.value = np.nan
+
+    def get_state(self):
+        return {'period': self.period, 'previous': self.previous, 'gains': list(self.gains), 'losses': list(self.losses)}
+
+    @classmethod
+    def from_state(cls, state):
+        rsi = cls(state['period'])
+        rsi.previous = state['previous']
+        rsi.gains.extend(state['gains'])
+        rsi.losses.extend(state['losses'])
+        return rsi
+
+    @staticmethod
+    def _window_mean(window):
+        observations = [x for x in window if x == x]
+        if not observations:
+            return np.nan
+        return max(math.fsum(observations), 0.0) / len(observations)
+
+    def update(self, close):
+        delta = close - self.previous
+        self.previous = close
+        self.gains.append(max(delta, 0.0) if delta == delta else np.nan)
+        self.losses.append(max(-delta, 0.0) if delta == delta else np.nan)
+
+        avg_gains = np.float64(self._window_mean(self.gains))
+        avg_losses = np.float64(self._window_mean(self.losses))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gains / avg_losses
+            self.value = float(100 - (100 / (1 + rs)))
+        return self.value
+
+
+class OnlineEMA:
+    """
+    Contraparte incremental de IndicatorCalculator.calculate_EMA (ewm(span=period, adjust=False)),
+    reproduzindo a mesma sequência de operações de ponto flutuante do pandas.
+    """
+
+    def __init__(self, period=21):
+        self.period = period
+        com = (period - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_weight_factor = 1.0 - self.alpha
+        self.old_weight = 1.0
+        self.value = np.nan
+
+    def get_state(self):
+        return {'period': self.period, 'old_weight': self.old_weight, 'value': self.value}
+
+    @classmethod
+    def from_state(cls, state):
+        ema = cls(state['period'])
+        ema.old_weight = state['old_weight']
+        ema.value = state['value']
+        return ema
+
+    def update(self, value):
+        if self.value != self.value:
+            self.value = value
+            return self.value
+
+        self.old_weight *= self.old_weight_factor
+        if value == value:
+            if self.value != value:
+                self.value = (self.old_weight * self.value + self.alpha * value) / (self.old_weight + self.alpha)
+            self.old_weight = 1.0
+        return self.value
+
+
+class OnlineRollingExtremum:
+    """
+    Máximo (ou mínimo) móvel de `period` barras com deque monotônico: O(1) amortizado por barra.
+    Equivale a rolling(window=period).max()/min(), inclusive no NaN enquanto a janela não está completa.
+    """
+
+    def __init__(self, period, mode='max'):
+        self.period = period
+        self.is_max = mode == 'max'
+        self.candidates = deque()  # (posição, valor), monotônico
+        self.valid = deque()
+        self.valid_count = 0
+        self.position = -1
+        self.value = np.nan
+
+    def get_state(self):
+        return {
+            'period': self.period,
+            'mode': 'max' if self.is_max else 'min',
+            'candidates': [list(candidate) for candidate in self.candidates],
+            'valid': list(self.valid),
+            'position': self.position,
+            'value': self.value,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        extremum = cls(state['period'], state['mode'])
+        extremum.candidates.extend(tuple(candidate) for candidate in state['candidates'])
+        extremum.valid.extend(state['valid'])
+        extremum.valid_count = sum(extremum.valid)
+        extremum.position = state['position']
+        extremum.value = state['value']
+        return extremum
+
+    def update(self, value):
+        self.position += 1
+        is_valid = value == value
+        self.valid.append(is_valid)
+        self.valid_count += is_valid
+        if len(self.valid) > self.period:
+            self.valid_count -= self.valid.popleft()
+
+        if is_valid:
+            if self.is_max:
+                while self.candidates and self.candidates[-1][1] <= value:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] >= value:
+                    self.candidates.pop()
+            self.candidates.append((self.position, value))
+
+        while self.candidates and self.candidates[0][0] <= self.position - self.period:
+            self.candidates.popleft()
+
+        if self.valid_count >= self.period and self.candidates:
+            self.value = self.candidates[0][1]
+        else:
+            self.value = np.nan
+        return self.value
+
+
+class OnlineHiLo:
+    """Contraparte incremental de IndicatorCalculator.calculate_HiLo / StrategyEvaluator.hilo_activator."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.high = OnlineRollingExtremum(period, 'max')
+        self.low = OnlineRollingExtremum(period, 'min')
+
+    @property
+    def value(self):
+        return self.high.value, self.low.value
+
+    def get_state(self):
+        return {'high': self.high.get_state(), 'low': self.low.get_state()}
+
+    @classmethod
+    def from_state(cls, state):
+        hilo = cls(state['high']['period'])
+        hilo.high = OnlineRollingExtremum.from_state(state['high'])
+        hilo.low = OnlineRollingExtremum.from_state(state['low'])
+        return hilo
+
+    def update(self, high, low):
+        return self.high.update(high), self.low.update(low)
+
+
+class OnlineHiLoSignal:
+    """
+    Sinal do HiLo Activator barra a barra, com a mesma regra de StrategyEvaluator.evaluate_strategy:
+    1 se o fechamento supera a máxima móvel da barra anterior, -1 se fica abaixo da mínima móvel
+    anterior (com precedência) e 0 caso contrário.
+    """
+
+    def __init__(self, period=14):
+        self.hilo = OnlineHiLo(period)
+        self.value = 0
+
+    def update(self, high, low, close):
+        previous_high, previous_low = self.hilo.value
+        self.value = 0
+        if close > previous_high:
+            self.value = 1
+        if close < previous_low:
+            self.value = -1
+        self.hilo.update(high, low)
+        return self.value
+
+
+class IncrementalIndicators:
+    """
+    RSI, EMA e HiLo com estado: processa apenas as linhas posteriores à última já vista e pode ser salvo
+    (`get_state`) e retomado (`from_state`). Os valores coincidem com os de IndicatorCalculator calculados
+    sobre o mesmo histórico (a partir da mesma primeira barra), sem alterar o DataFrame de entrada.
+    """
+
+    def __init__(self, rsi_period=14, ema_period=21, hilo_period=14, column='Close'):
+        self.column = column
+        self.rsi = OnlineRSI(rsi_period)
+        self.ema = OnlineEMA(ema_period)
+        self.hilo = OnlineHiLo(hilo_period)
+        self.last_timestamp = None
+
+    @property
+    def output_columns(self):
+        return ['RSI', f'EMA_{self.ema.period}', 'HiLo_High', 'HiLo_Low']
+
+    def update(self, data):
+        """Retorna um DataFrame com os indicadores das linhas novas de `data` (mesmo índice dessas linhas)."""
+        new_rows = data if self.last_timestamp is None else data[data['ds'] > self.last_timestamp]
+        closes = new_rows[self.column].to_numpy(dtype=float)
+        highs = new_rows['High'].to_numpy(dtype=float)
+        lows = new_rows['Low'].to_numpy(dtype=float)
+
+        values = np.empty((len(new_rows), 4))
+        for i in range(len(new_rows)):
+            values[i, 0] = self.rsi.update(closes[i])
+            values[i, 1] = self.ema.update(closes[i])
+            values[i, 2:] = self.hilo.update(highs[i], lows[i])
+
+        if len(new_rows):
+            self.last_timestamp = pd.Timestamp(new_rows['ds'].iloc[-1])
+        return pd.DataFrame(values, index=new_rows.index, columns=self.output_columns)
+
+    def get_state(self):
+        return {
+            'column': self.column,
+            'last_timestamp': self.last_timestamp,
+            'rsi': self.rsi.get_state(),
+            'ema': self.ema.get_state(),
+            'hilo': self.hilo.get_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        indicators = cls(column=state['column'])
+        indicators.rsi = OnlineRSI.from_state(state['rsi'])
+        indicators.ema = OnlineEMA.from_state(state['ema'])
+        indicators.hilo = OnlineHiLo.from_state(state['hilo'])
+        if state['last_timestamp'] is not None:
+            indicators.last_timestamp = pd.Timestamp(state['last_timestamp'])
+        return indicators
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime
+
+import config
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from src.analysis.i_analysis import IAnalysis
+
+
+class BlackScholes:
+    """
+    Black-Scholes-Merton vetorizado: todos os argumentos podem ser arrays do mesmo formato (ou escalares).
+    `T` em anos, taxas contínuas anuais; `is_call` é um array booleano.
+    """
+
+    @staticmethod
+    def _d1_d2(S, K, T, r, sigma, q):
+        sqrt_T = np.sqrt(T)
+        d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / (sigma * sqrt_T)
+        return d1, d1 - sigma * sqrt_T
+
+    @staticmethod
+    def _pdf(x):
+        return np.exp(-0.5 * x ** 2) / np.sqrt(2 * np.pi)
+
+    @staticmethod
+    def price(S, K, T, r, sigma, is_call, q=0.0):
+        d1, d2 = BlackScholes._d1_d2(S, K, T, r, sigma, q)
+        discounted_spot = S * np.exp(-q * T)
+        discounted_strike = K * np.exp(-r * T)
+        call = discounted_spot * ndtr(d1) - discounted_strike * ndtr(d2)
+        put = discounted_strike * ndtr(-d2) - discounted_spot * ndtr(-d1)
+        return np.where(is_call, call, put)
+
+    @staticmethod
+    def vega(S, K, T, r, sigma, q=0.0):
+        d1, _ = BlackScholes._d1_d2(S, K, T, r, sigma, q)
+        return S * np.exp(-q * T) * BlackScholes._pdf(d1) * np.sqrt(T)
+
+    @staticmethod
+    def greeks(S, K, T, r, sigma, is_call, q=0.0):
+        """Retorna delta, gamma, vega (por 1.0 de volatilidade), theta (por ano) e rho (por 1.0 de taxa)."""
+        d1, d2 = BlackScholes._d1_d2(S, K, T, r, sigma, q)
+        sqrt_T = np.sqrt(T)
+        spot_discount = np.exp(-q * T)
+        strike_discount = np.exp(-r * T)
+        pdf_d1 = BlackScholes._pdf(d1)
+
+        delta = np.where(is_call, spot_discount * ndtr(d1), -spot_discount * ndtr(-d1))
+        gamma = spot_discount * pdf_d1 / (S * sigma * sqrt_T)
+        vega = S * spot_discount * pdf_d1 * sqrt_T
+        theta_common = -S * spot_discount * pdf_d1 * sigma / (2 * sqrt_T)
+        theta_call = theta_common - r * K * strike_discount * ndtr(d2) + q * S * spot_discount * ndtr(d1)
+        theta_put = theta_common + r * K * strike_discount * ndtr(-d2) - q * S * spot_discount * ndtr(-d1)
+        theta = np.where(is_call, theta_call, theta_put)
+        rho = np.where(is_call, K * T * strike_discount * ndtr(d2), -K * T * strike_discount * ndtr(-d2))
+        return {'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta, 'rho': rho}
+
+    @staticmethod
+    def implied_volatility(price, S, K, T, r, is_call, q=0.0, low=1e-4, high=5.0, tol=1e-8, max_iter=100):
+        """
+        Volatilidade implícita de todas as opções de uma vez: Newton-Raphson protegido por um intervalo
+        de bissecção (o preço é crescente na volatilidade). Preços fora dos limites de arbitragem,
+        ou que não convergem, retornam NaN.
+        """
+        price, S, K, T, is_call = np.broadcast_arrays(
+            np.asarray(price, dtype=float), np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+            np.asarray(T, dtype=float), np.asarray(is_call, dtype=bool)
+        )
+        discounted_spot = S * np.exp(-q * T)
+        discounted_strike = K * np.exp(-r * T)
+        intrinsic = np.where(is_call, np.maximum(discounted_spot - discounted_strike, 0), np.maximum(discounted_strike - discounted_spot, 0))
+        upper_bound = np.where(is_call, discounted_spot, discounted_strike)
+        valid = np.isfinite(price) & (T > 0) & (price > intrinsic) & (price < upper_bound)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # Aproximação de Brenner-Subrahmanyam como ponto de partida
+            sigma = np.clip(np.sqrt(2 * np.pi / T) * price / S, low, high)
+            sigma = np.where(valid, sigma, 0.2)
+            lower = np.full(price.shape, low)
+            upper = np.full(price.shape, high)
+            converged = ~valid
+
+            for _ in range(max_iter):
+                diff = BlackScholes.price(S, K, T, r, sigma, is_call, q) - price
+                converged |= np.abs(diff) < tol
+                if converged.all():
+                    break
+                upper = np.where(diff > 0, sigma, upper)
+                lower = np.where(diff <= 0, sigma, lower)
+                vega = BlackScholes.vega(S, K, T, r, sigma, q)
+                newton = sigma - diff / vega
+                use_newton = (vega > 1e-12) & (newton > lower) & (newton < upper)
+                sigma = np.where(converged, sigma, np.where(use_newton, newton, 0.5 * (lower + upper)))
+
+        return np.where(valid & converged, sigma, np.nan)
+
+
+class OptionsAnalysis(IAnalysis):
+    """
+    Calcula volatilidade implícita e gregas de uma cadeia de opções concatenada (calls + puts, todas as
+    expirações) em uma única passada vetorizada.
+
+    As expirações vêm à meia-noite: no dia do vencimento o prazo é limitado a MIN_TIME_TO_EXPIRY (as opções
+    ainda negociam até o fechamento) e os contratos de vencimentos anteriores à data de avaliação são descartados.
+    """
+
+    MIN_TIME_TO_EXPIRY = 1.0 / (365 * 24)  # uma hora, em anos
+
+    def __init__(self, options, spot_price, risk_free_rate=config.RISK_FREE_RATE, dividend_yield=0.0, valuation_date=None):
+        self.options = options
+        self.spot_price = spot_price
+        self.risk_free_rate = risk_free_rate
+        self.dividend_yield = dividend_yield
+        self.valuation_date = pd.Timestamp(valuation_date or datetime.now())
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _market_prices(options):
+        """Usa o meio do book quando há bid e ask, senão o último negócio."""
+        last_price = options['lastPrice'].to_numpy(dtype=float)
+        if 'bid' not in options or 'ask' not in options:
+            return last_price
+        bid = options['bid'].to_numpy(dtype=float)
+        ask = options['ask'].to_numpy(dtype=float)
+        has_book = (bid > 0) & (ask > 0)
+        return np.where(has_book, 0.5 * (bid + ask), last_price)
+
+    def analyze(self):
+        if self.options is None or self.options.empty:
+            self.logger.error("No options data to analyze.")
+            return None
+
+        expiration = pd.to_datetime(self.options['expiration'])
+        expired = (expiration.dt.normalize() < self.valuation_date.normalize()).to_numpy()
+        if expired.any():
+            self.logger.warning(f"Ignoring {expired.sum()} expired contracts.")
+        result = self.options[~expired].copy()
+        if result.empty:
+            self.logger.error("No unexpired options to analyze.")
+            return None
+        expiration = expiration[~expired]
+        T = ((expiration - self.valuation_date).dt.total_seconds() / (365.0 * 24 * 3600)).to_numpy()
+        T = np.maximum(T, self.MIN_TIME_TO_EXPIRY)
+        K = result['strike'].to_numpy(dtype=float)
+        is_call = (result['optionType'] == 'C').to_numpy()
+        price = self._market_prices(result)
+        r, q, S = self.risk_free_rate, self.dividend_yield, self.spot_price
+
+        iv = BlackScholes.implied_volatility(price, S, K, T, r, is_call, q)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            greeks = BlackScholes.greeks(S, K, T, r, iv, is_call, q)
+
+        result['T'] = T
+        result['market_price'] = price
+        result['iv'] = iv
+        for name, values in greeks.items():
+            result[name] = values
+
+        solved = np.isfinite(iv).sum()
+        self.logger.info(f"Implied volatility solved for {solved}/{len(result)} contracts.")
+        return result
+
+    @staticmethod
+    def volatility_surface(analyzed, option_type=None):
+        """Superfície de volatilidade implícita (expiração x strike) a partir do resultado de `analyze`."""
+        data = analyzed if option_type is None else analyzed[analyzed['optionType'] == option_type]
+        return data.pivot_table(index='expiration', columns='strike', values='iv', aggfunc='mean')
@@ -1,28 +1,34 @@
 import logging
 
+import config
 import pandas as pd
-from config import COUNTRY_NAME
 from dask.dataframe import DataFrame as DaskDataFrame
 from dask.distributed import Client
-from prophet import Prophet
 from prophet.diagnostics import cross_validation
 from src.analysis.i_analysis import IAnalysis
+from src.data.accesss.prophet_model_cache import ProphetModelCache
 from src.optimization.data_granularity_checker import DataGranularityChecker
 from src.optimization.data_preparation import DataPreparation
-from src.optimization.hyperparameter_optimization import OptunaOptimization
+from src.optimization.hyperparameter_optimization import (OptunaOptimization,
+                                                         cross_validation_parallel)
+from src.utils.state_store import StateStore
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class ProphetAnalysis(IAnalysis):
-    def __init__(self, ticker, data, future_periods, client=None):
+    def __init__(self, ticker, data, future_periods, client=None, model_cache=None):
         self.ticker = ticker
         self.data = data
         self.future_periods = future_periods
-        self.optuna_optimization = OptunaOptimization()
         self.model = None
         self.forecast = None
         self.client = client or Client()
+        self.optuna_optimization = OptunaOptimization(ticker=ticker, client=self.client)
         self.is_intraday = DataGranularityChecker.is_intraday(data)
+        self.model_cache = model_cache or (ProphetModelCache() if config.USE_MODEL_CACHE else None)
+        self.state_store = StateStore(config.PROPHET_STATE_DIR) if config.USE_PROPHET_WARM_START else None
+        self.state_key = f"{ticker}_{config.DEFAULT_INTERVAL}"
+        self.best_params = None
 
     def optimize_and_fit(self):
         if not isinstance(self.data, pd.DataFrame) or self.data.empty:
@@ -34,20 +40,82 @@ class ProphetAnalysis(IAnalysis):
             return
 
         logging.info("Starting hyperparameter optimization and model fitting")
-        best_params = self.optuna_optimization.optimize(self.data, self.future_periods)
+        self.optuna_optimization.bind_feature_cache(self.data)
+        best_params = self._optimize_params()
         logging.info(f"Best hyperparameters: {best_params}")
-        self.model = Prophet(**best_params)
-        self.model.add_country_holidays(country_name=COUNTRY_NAME)
+        self.best_params = best_params
+        self.model = self._create_model(best_params)
+
+        model_key = ProphetModelCache.model_key(self.data, self.model) if self.model_cache else None
+        cached_model = self.model_cache.load(model_key) if self.model_cache else None
+        if cached_model is not None:
+            self.model = cached_model
+            self.model.start = self.data['ds'].min()
+            logging.info("Fitted model loaded from cache; skipping fit")
+            return
 
         try:
-            self.model.fit(self.data)
+            self.model = self._fit_with_warm_start(best_params)
             # Define manualmente a data de início com a menor data 'ds' no conjunto de dados
             self.model.start = self.data['ds'].min()
             logging.info("Model fitting completed successfully")
+            if self.model_cache:
+                self.model_cache.save(model_key, self.model)
+            if self.state_store:
+                self.state_store.save(self.state_key, self._stan_init(self.model))
         except Exception as e:
             logging.error(f"Error fitting the model: {e}")
             self.model = None
 
+    def _create_model(self, params):
+        # Mesma configuração (sazonalidades e feriados) avaliada pelos trials da otimização
+        return self.optuna_optimization._create_model(params, self.is_intraday)
+
+    @staticmethod
+    def _stan_init(model):
+        """Parâmetros ajustados no formato do `init` do Stan, para iniciar o próximo ajuste a partir deles."""
+        return {
+            'k': float(model.params['k'][0][0]),
+            'm': float(model.params['m'][0][0]),
+            'sigma_obs': float(model.params['sigma_obs'][0][0]),
+            'delta': model.params['delta'][0],
+            'beta': model.params['beta'][0],
+        }
+
+    def _fit_with_warm_start(self, params):
+        """
+        Ajusta o modelo partindo dos parâmetros do último ajuste do ticker. Se não houver estado salvo, se
+        o número de changepoints mudou ou se o ajuste falhar (ex: número de termos sazonais diferente),
+        ajusta um modelo novo a partir dos valores iniciais padrão do Prophet.
+        """
+        model = self._create_model(params)
+        init = self.state_store.load(self.state_key) if self.state_store else None
+        if init is not None and len(init.get('delta', [])) == model.n_changepoints:
+            try:
+                model.fit(self.data, init=init)
+                logging.info("Model fitted from the previous fit's parameters (warm start)")
+                return model
+            except Exception as e:
+                logging.warning(f"Warm start failed, falling back to a cold start: {e}")
+                model = self._create_model(params)
+        model.fit(self.data)
+        return model
+
+    def _optimize_params(self):
+        """Reaproveita os hiperparâmetros já otimizados para os mesmos dados, se houver."""
+        if not self.model_cache:
+            return self.optuna_optimization.optimize(self.data, self.future_periods)
+
+        params_key = f"{ProphetModelCache.data_key(self.data)}_{self.future_periods}_{config.N_TRIALS}"
+        best_params = self.model_cache.load_params(params_key)
+        if best_params is not None:
+            logging.info("Hyperparameters for this dataset loaded from cache; skipping optimization")
+            return best_params
+
+        best_params = self.optuna_optimization.optimize(self.data, self.future_periods)
+        self.model_cache.save_params(params_key, best_params)
+        return best_params
+
     def cross_validate_model(self):
         if not self.model:
             logging.error("Model is not fitted yet.")
@@ -55,12 +123,15 @@ class ProphetAnalysis(IAnalysis):
 
         logging.info("Starting cross-validation")
         try:
-            initial, period, horizon = DataPreparation.calculate_adaptive_parameters(
-                self.data, self.future_periods, self.is_intraday
-            )
-            df_cv = cross_validation(
-                self.model, initial=initial, period=period, horizon=horizon, parallel="processes"
-            )
+            _, _, horizon, cutoffs = DataPreparation.calculate_cutoffs(self.data, self.future_periods, self.is_intraday)
+            best = self.optuna_optimization.best_cross_validation
+            if best is not None and best['params'] == self.best_params \
+                    and best['signature'] == OptunaOptimization.cv_signature(self.data, horizon, cutoffs):
+                # O melhor trial já validou exatamente este modelo (mesmos dados, parâmetros e cutoffs)
+                logging.info("Reusing the best trial's cross-validation")
+                return best['df_cv']
+
+            df_cv = cross_validation(self.model, horizon=horizon, cutoffs=cutoffs, parallel=cross_validation_parallel())
             logging.info("Cross-validation completed successfully")
             return df_cv
         except Exception as e:
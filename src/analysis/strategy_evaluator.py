@@ -1,4 +1,5 @@
-from scipy.optimize import differential_evolution
+import numpy as np
+import pandas as pd
 
 
 class StrategyEvaluator:
@@ -20,7 +21,67 @@ class StrategyEvaluator:
         price_data['Strategy_Returns'] = price_data['Signal'].shift(1) * price_data['Close'].pct_change()
         return -price_data['Strategy_Returns'].cumsum().iloc[-1]
 
+    @staticmethod
+    def rolling_extrema(highs, lows, max_period):
+        """
+        Máximas e mínimas móveis para todos os períodos de 1 a `max_period` de uma vez: matrizes
+        (períodos x tempo) em que a linha p-1 equivale a rolling(window=p).max()/min(). Cada período é
+        obtido do anterior com uma única comparação vetorizada: max_p[t] = max(max_{p-1}[t], high[t-p+1]).
+        """
+        highs = np.asarray(highs, dtype=float)
+        lows = np.asarray(lows, dtype=float)
+        n = len(highs)
+        maxes = np.full((max_period, n), np.nan)
+        mins = np.full((max_period, n), np.nan)
+        maxes[0], mins[0] = highs, lows
+        for p in range(2, max_period + 1):
+            # Antes de p barras a janela está incompleta e o resultado fica NaN, como no pandas
+            maxes[p - 1, p - 1:] = np.maximum(maxes[p - 2, p - 1:], highs[:n - p + 1])
+            mins[p - 1, p - 1:] = np.minimum(mins[p - 2, p - 1:], lows[:n - p + 1])
+        return maxes, mins
+
+    @staticmethod
+    def signal_matrix(closes, maxes, mins):
+        """Sinais do HiLo Activator (períodos x tempo) com a mesma regra de evaluate_strategy."""
+        closes = np.asarray(closes, dtype=float)
+        previous_maxes = np.full(maxes.shape, np.nan)
+        previous_mins = np.full(mins.shape, np.nan)
+        previous_maxes[:, 1:] = maxes[:, :-1]
+        previous_mins[:, 1:] = mins[:, :-1]
+
+        signals = np.zeros(maxes.shape, dtype=np.int8)
+        signals[closes > previous_maxes] = 1
+        signals[closes < previous_mins] = -1
+        return signals
+
+    @staticmethod
+    def strategy_return_matrix(closes, signals):
+        """Retornos da estratégia (períodos x tempo): sinal da barra anterior vezes o retorno simples da barra."""
+        closes = np.asarray(closes, dtype=float)
+        returns = np.full(len(closes), np.nan)
+        returns[1:] = closes[1:] / closes[:-1] - 1
+        strategy_returns = np.full(signals.shape, np.nan)
+        strategy_returns[:, 1:] = signals[:, :-1] * returns[1:]
+        return strategy_returns
+
+    @staticmethod
+    def search_hilo_period(price_data, periods=range(1, 101)):
+        """
+        Avalia todos os períodos inteiros de uma vez e retorna (melhor período, melhor resultado, curva de
+        resultados indexada pelo período). O resultado é o mesmo de evaluate_strategy (retornos somados),
+        com sinal positivo. Em caso de empate vence o menor período. `price_data` não é alterado.
+        """
+        periods = np.asarray(list(periods), dtype=int)
+        maxes, mins = StrategyEvaluator.rolling_extrema(price_data['High'], price_data['Low'], int(periods.max()))
+        maxes, mins = maxes[periods - 1], mins[periods - 1]
+        signals = StrategyEvaluator.signal_matrix(price_data['Close'], maxes, mins)
+        scores = np.nansum(StrategyEvaluator.strategy_return_matrix(price_data['Close'], signals), axis=1)
+
+        best = int(np.argmax(scores))
+        return int(periods[best]), float(scores[best]), pd.Series(scores, index=pd.Index(periods, name='period'), name='score')
+
     @staticmethod
     def optimize_strategy(price_data, bounds):
-        result = differential_evolution(StrategyEvaluator.evaluate_strategy, bounds, args=(price_data,))
-        return result.x, -result.fun
+        low, high = bounds[0]
+        best_period, best_score, _ = StrategyEvaluator.search_hilo_period(price_data, range(int(low), int(high) + 1))
+        return best_period, best_score
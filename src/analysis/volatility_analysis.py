@@ -1,41 +1,158 @@
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
+import config
 import numpy as np
+import pandas as pd
 from arch import arch_model
 from arch.__future__ import reindexing
 from src.analysis.i_analysis import IAnalysis
+from src.utils.state_store import StateStore
+
+# Especificação de cada modelo no arch: GJR-GARCH e TARCH são GARCH com termo assimétrico (o=1),
+# o TARCH modelando o desvio padrão (power=1) em vez da variância
+MODEL_SPECS = {
+    'GARCH': {'vol': 'GARCH', 'o': 0, 'power': 2.0},
+    'GJR-GARCH': {'vol': 'GARCH', 'o': 1, 'power': 2.0},
+    'TARCH': {'vol': 'GARCH', 'o': 1, 'power': 1.0},
+    'EGARCH': {'vol': 'EGARCH', 'o': 0},
+}
+
+
+def requires_simulation(model_name, horizon):
+    """O arch só tem previsão analítica multi-passo para modelos de variância (power=2) que não sejam EGARCH."""
+    spec = MODEL_SPECS.get(model_name, {'vol': model_name})
+    return horizon > 1 and (spec['vol'] == 'EGARCH' or spec.get('power', 2.0) != 2.0)
+
+
+def _new_bars(retornos, state):
+    """Barras posteriores às do último ajuste salvo, ou None se não for possível alinhar os históricos."""
+    if not isinstance(retornos.index, pd.DatetimeIndex) or state.get('last_index') is None:
+        return None
+    last_index = pd.Timestamp(state['last_index'])
+    if last_index not in retornos.index:
+        return None
+    return int((retornos.index > last_index).sum())
+
+
+def _fit_model(model_name, retornos, p, q, horizon, simulations, seed, states=None, max_bars_without_refit=0):
+    # Função de módulo para poder ser serializada pelo pool de processos e pelo Dask
+    spec = MODEL_SPECS.get(model_name, {'vol': model_name})
+    state = (states or {}).get(model_name)
+    try:
+        model = arch_model(retornos, p=p, q=q, dist='Normal', **spec)
+        result, refitted = None, True
+        if state:
+            params = np.asarray(state['params'])
+            new_bars = _new_bars(retornos, state)
+            if new_bars is not None and new_bars <= max_bars_without_refit:
+                # Poucas barras novas: mantém os parâmetros e apenas filtra as observações com eles
+                result, refitted = model.fix(params), False
+            else:
+                try:
+                    result = model.fit(starting_values=params, disp='off')
+                except Exception:
+                    result = None
+        if result is None:
+            result = model.fit(disp='off')
+
+        if requires_simulation(model_name, horizon):
+            # random_state só é usado pelo bootstrap; na simulação os choques (dist='Normal') vêm de `rng`
+            forecast = result.forecast(
+                horizon=horizon, method='simulation', simulations=simulations, rng=np.random.default_rng(seed).standard_normal
+            )
+        else:
+            forecast = result.forecast(horizon=horizon, method='analytic')
+        return model_name, result, forecast.variance.iloc[-1], refitted, None
+    except Exception as e:
+        return model_name, None, None, False, str(e)
 
 
 class VolatilityAnalysis(IAnalysis):
-    def __init__(self, retornos):
+    def __init__(self, retornos, client=None, max_workers=None, key=None, store=None, max_bars_without_refit=None):
+        """
+        Com `key` (ex: ticker + intervalo), os parâmetros ajustados de cada modelo são salvos e usados como
+        valores iniciais do próximo ajuste. Se o histórico cresceu no máximo `max_bars_without_refit` barras
+        desde o último ajuste, os parâmetros salvos são reaproveitados sem otimização.
+        """
         self.retornos = retornos
+        self.client = client
+        self.max_workers = max_workers
+        self.key = key
+        self.store = store or (StateStore(config.VOLATILITY_STATE_DIR) if key else None)
+        self.max_bars_without_refit = config.VOLATILITY_MAX_BARS_WITHOUT_REFIT if max_bars_without_refit is None else max_bars_without_refit
         self.logger = logging.getLogger(__name__)
 
-    def analyze(self, models=['GARCH', 'EGARCH', 'TARCH'], p=1, q=1, horizon=30, simulations=1000):
+    @classmethod
+    def from_frame(cls, data, column='Retornos', **kwargs):
+        """
+        Cria a análise a partir de um DataFrame preparado, indexando os retornos pelas datas de 'ds' (coluna
+        ou índice). O índice de datas é o que permite alinhar o histórico com o do último ajuste salvo.
+        """
+        dates = data['ds'] if 'ds' in data.columns else data.index.get_level_values('ds')
+        retornos = pd.Series(data[column].to_numpy(), index=pd.DatetimeIndex(dates), name=column)
+        return cls(retornos, **kwargs)
+
+    def _state_key(self, model_name, p, q):
+        return f"{self.key}_{model_name}_p{p}_q{q}"
+
+    def _save_state(self, model_name, p, q, result, retornos):
+        last_index = retornos.index[-1] if isinstance(retornos.index, pd.DatetimeIndex) else None
+        self.store.save(self._state_key(model_name, p, q), {
+            'params': result.params.to_numpy(),
+            'last_index': last_index,
+            'nobs': len(retornos),
+        })
+
+    def _fit_all(self, models, fit):
+        if self.client is not None:
+            return self.client.gather(self.client.map(fit, models, pure=False))
+        if len(models) == 1:
+            return [fit(models[0])]
+        with ProcessPoolExecutor(max_workers=self.max_workers or len(models)) as executor:
+            return list(executor.map(fit, models))
+
+    def analyze(self, models=['GARCH', 'EGARCH', 'TARCH'], p=1, q=1, horizon=30, simulations=1000, seed=None):
+        """
+        Ajusta os modelos em paralelo (no `client` Dask ou em um pool de processos) e retorna um dict com:
+          - 'forecasts': {modelo: variância prevista para os próximos `horizon` passos};
+          - 'results': {modelo: resultado do ajuste no arch};
+          - 'criteria': tabela com AIC, BIC e log-verossimilhança de cada modelo, ordenada pelo AIC;
+          - 'best_model': modelo de menor AIC.
+        A previsão é analítica sempre que possível; `simulations` e `seed` só valem para os modelos que
+        exigem simulação (EGARCH e TARCH com horizonte maior que 1).
+        Retorna None se nenhum modelo convergir.
+        """
         retornos = self.retornos.dropna() * 100
-        best_model = None
-        lowest_aic = np.inf
-        all_forecasts = {}
-
-        # Testando diferentes modelos e selecionando o melhor
-        for model_name in models:
-            try:
-                model = arch_model(retornos, vol=model_name, p=p, q=q, dist='Normal')
-                result = model.fit(disp='off')
-
-                if result.aic < lowest_aic:
-                    lowest_aic = result.aic
-                    best_model = model_name
-
-                # Simulações para cada modelo
-                sim_forecast = result.forecast(horizon=horizon, method='simulation', simulations=simulations)
-                all_forecasts[model_name] = sim_forecast.variance.iloc[-1]
-            except Exception as e:
-                self.logger.warning(f"Erro ao ajustar o modelo {model_name}: {e}")
-
-        if best_model:
-            self.logger.info(f"Melhor modelo selecionado: {best_model} (AIC: {lowest_aic:.2f})")
-            return all_forecasts  # Retorna previsões de todos os modelos para análise comparativa
-        else:
+        models = list(models)
+        states = {model_name: self.store.load(self._state_key(model_name, p, q)) for model_name in models} if self.store else {}
+        fit = partial(
+            _fit_model, retornos=retornos, p=p, q=q, horizon=horizon, simulations=simulations, seed=seed,
+            states=states, max_bars_without_refit=self.max_bars_without_refit
+        )
+
+        all_forecasts, results = {}, {}
+        for model_name, result, variance, refitted, error in self._fit_all(models, fit):
+            if result is None:
+                self.logger.warning(f"Erro ao ajustar o modelo {model_name}: {error}")
+                continue
+            results[model_name] = result
+            all_forecasts[model_name] = variance
+            if self.store and refitted:
+                self._save_state(model_name, p, q, result, retornos)
+            elif not refitted:
+                self.logger.info(f"{model_name}: parâmetros salvos reaproveitados sem novo ajuste.")
+
+        if not results:
             self.logger.error("Nenhum modelo convergiu com sucesso.")
             return None
+
+        criteria = pd.DataFrame({
+            model_name: {'aic': result.aic, 'bic': result.bic, 'loglikelihood': result.loglikelihood}
+            for model_name, result in results.items()
+        }).T.sort_values('aic')
+        best_model = criteria.index[0]
+        self.logger.info(f"Melhor modelo selecionado: {best_model} (AIC: {criteria.loc[best_model, 'aic']:.2f})")
+        # Retorna previsões de todos os modelos para análise comparativa
+        return {'forecasts': all_forecasts, 'results': results, 'criteria': criteria, 'best_model': best_model}
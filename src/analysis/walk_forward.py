@@ -0,0 +1,159 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from src.analysis.i_analysis import IAnalysis
+from src.analysis.strategy_evaluator import StrategyEvaluator
+from src.data.models.compact_ohlcv import CompactOHLCV
+
+
+def _run_backtest(price_data, **kwargs):
+    # Função de módulo para poder ser serializada pelo pool de processos e pelo Dask
+    if isinstance(price_data, CompactOHLCV):
+        # Aberto no worker a partir do arquivo mapeado em memória
+        price_data = price_data.to_frame()
+    try:
+        return WalkForwardBacktester(price_data, **kwargs).analyze()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Erro no backtest walk-forward: {e}")
+        return None
+
+
+class WalkForwardBacktester(IAnalysis):
+    """
+    Backtest walk-forward do HiLo Activator: em cada janela de treino de `train_size` barras escolhe o
+    período com maior retorno líquido (custos e slippage por unidade de giro de posição) e o aplica nas
+    `test_size` barras seguintes. As máximas/mínimas móveis, os sinais e os retornos de todos os períodos
+    são calculados uma única vez sobre o histórico completo e compartilhados por todas as janelas.
+    """
+
+    def __init__(self, price_data, train_size=252, test_size=21, periods=range(1, 101), cost=0.0, slippage=0.0, bars_per_year=None):
+        self.logger = logging.getLogger(__name__)
+        self.price_data = price_data
+        self.train_size = train_size
+        self.test_size = test_size
+        self.periods = np.asarray(list(periods), dtype=int)
+        self.cost = cost
+        self.slippage = slippage
+        self.bars_per_year = bars_per_year
+
+    def _price_frame(self):
+        data = self.price_data
+        if 'ds' in data.columns:
+            data = data.set_index('ds')
+        data = data[['High', 'Low', 'Close']].copy()
+        data.index = pd.to_datetime(data.index)
+        return data
+
+    def _returns_and_costs(self, closes, positions):
+        """Retorno bruto (posição da barra anterior vezes o retorno da barra) e custo do giro, por linha."""
+        positions = np.atleast_2d(positions).astype(float)
+        returns = np.zeros(len(closes))
+        returns[1:] = np.nan_to_num(closes[1:] / closes[:-1] - 1)
+        held = np.zeros(positions.shape)
+        held[:, 1:] = positions[:, :-1]
+        turnover = np.abs(np.diff(positions, axis=1, prepend=0))
+        return held * returns, (self.cost + self.slippage) * turnover
+
+    def _windows(self, n):
+        train_starts = np.arange(0, n - self.train_size, self.test_size)
+        train_ends = train_starts + self.train_size
+        test_ends = np.minimum(train_ends + self.test_size, n)
+        return train_starts, train_ends, test_ends
+
+    def _infer_bars_per_year(self, index):
+        years = (index[-1] - index[0]).total_seconds() / (365.25 * 86400)
+        return (len(index) - 1) / years if years > 0 else np.nan
+
+    def analyze(self):
+        """
+        Retorna um dict com:
+          - 'windows': uma linha por janela (datas de treino/teste, período escolhido e retornos de treino e teste);
+          - 'series': série fora da amostra com Close, Period, Position, Returns, Costs, Strategy_Returns, Equity e Drawdown;
+          - 'summary': retorno total, máximo drawdown, Sharpe anualizado, número de operações e buy and hold.
+        """
+        data = self._price_frame()
+        n = len(data)
+        if n <= self.train_size:
+            self.logger.error(f"Dados insuficientes para o walk-forward: {n} barras para uma janela de treino de {self.train_size}.")
+            return None
+
+        closes = data['Close'].to_numpy(dtype=float)
+        maxes, mins = StrategyEvaluator.rolling_extrema(data['High'], data['Low'], int(self.periods.max()))
+        signals = StrategyEvaluator.signal_matrix(closes, maxes[self.periods - 1], mins[self.periods - 1])
+        gross, costs = self._returns_and_costs(closes, signals)
+
+        # Somas acumuladas por período: o retorno de qualquer janela de treino sai de uma subtração
+        cumulative = np.zeros((len(self.periods), n + 1))
+        np.cumsum(gross - costs, axis=1, out=cumulative[:, 1:])
+        train_starts, train_ends, test_ends = self._windows(n)
+        train_scores = cumulative[:, train_ends] - cumulative[:, train_starts]
+        best = np.argmax(train_scores, axis=0)
+
+        # As janelas de teste são contíguas: cada barra fora da amostra usa o sinal do período escolhido na sua janela
+        first_test = train_ends[0]
+        chosen = np.repeat(best, test_ends - train_ends)
+        positions = np.zeros(n, dtype=np.int8)
+        positions[first_test:] = signals[chosen, np.arange(first_test, n)]
+        oos_gross, oos_costs = (values[0] for values in self._returns_and_costs(closes, positions))
+        oos_returns = oos_gross - oos_costs
+
+        series = pd.DataFrame({
+            'Close': closes,
+            'Period': np.concatenate([np.zeros(first_test, dtype=int), self.periods[chosen]]),
+            'Position': positions,
+            'Returns': oos_gross,
+            'Costs': oos_costs,
+            'Strategy_Returns': oos_returns,
+        }, index=data.index).iloc[first_test:]
+        series['Equity'] = (1 + series['Strategy_Returns']).cumprod()
+        series['Drawdown'] = series['Equity'] / series['Equity'].cummax() - 1
+
+        oos_cumulative = np.concatenate([[0.0], np.cumsum(oos_returns)])
+        index = data.index
+        windows = pd.DataFrame({
+            'train_start': index[train_starts],
+            'train_end': index[train_ends - 1],
+            'test_start': index[train_ends],
+            'test_end': index[test_ends - 1],
+            'period': self.periods[best],
+            'train_return': train_scores[best, np.arange(len(best))],
+            'test_return': oos_cumulative[test_ends] - oos_cumulative[train_ends],
+        })
+
+        bars_per_year = self.bars_per_year or self._infer_bars_per_year(series.index)
+        strategy_returns = series['Strategy_Returns']
+        std = strategy_returns.std()
+        summary = {
+            'total_return': float(series['Equity'].iloc[-1] - 1),
+            'max_drawdown': float(series['Drawdown'].min()),
+            'sharpe': float(strategy_returns.mean() / std * np.sqrt(bars_per_year)) if std > 0 else np.nan,
+            'trades': int(np.count_nonzero(np.diff(positions[first_test - 1:]))),
+            'buy_and_hold': float(closes[-1] / closes[first_test - 1] - 1),
+            'windows': len(windows),
+        }
+        self.logger.info(f"Walk-forward concluído: {len(windows)} janelas, retorno fora da amostra {summary['total_return']:.2%}.")
+        return {'windows': windows, 'series': series, 'summary': summary}
+
+    @staticmethod
+    def run_many(datasets, client=None, max_workers=None, **kwargs):
+        """
+        Executa o walk-forward para {ticker: DataFrame ou CompactOHLCV} em paralelo, no `client` Dask quando fornecido ou
+        em um pool de processos local. Retorna {ticker: resultado de analyze()} (None para falhas).
+        """
+        tickers = list(datasets)
+        run = partial(_run_backtest, **kwargs)
+        if client is not None:
+            futures = client.map(run, [datasets[ticker] for ticker in tickers], key=[f"walk-forward-{ticker}" for ticker in tickers])
+            results = client.gather(futures)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(run, [datasets[ticker] for ticker in tickers]))
+        return dict(zip(tickers, results))
+
+    @staticmethod
+    def summary_table(results):
+        """Tabela com o resumo de cada ticker, para comparar o universo inteiro."""
+        return pd.DataFrame({ticker: result['summary'] for ticker, result in results.items() if result}).T
@@ -0,0 +1,74 @@
+import logging
+import os
+
+import config
+import pandas as pd
+from src.utils.file_manager import FileManager
+from src.utils.state_store import StateStore
+
+
+class OHLCVCache:
+    """
+    Cache colunar local de barras OHLCV brutas, um arquivo Parquet por ticker/intervalo
+    (e, opcionalmente, por um sufixo que identifica a janela, como nos chunks intradiários).
+    Informações sobre cada arquivo (ex: o período solicitado no download) ficam em JSON ao lado, em "info".
+    """
+
+    def __init__(self, cache_dir=config.OHLCV_CACHE_DIR):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        FileManager.ensure_directory_exists(self.cache_dir)
+        self.info_store = StateStore(os.path.join(self.cache_dir, "info"))
+
+    @staticmethod
+    def _name(ticker, interval, suffix=None):
+        ticker = FileManager.normalize_ticker_name(ticker)
+        return f"{ticker}_{interval}_{suffix}" if suffix else f"{ticker}_{interval}"
+
+    def _path(self, ticker, interval, suffix=None):
+        return os.path.join(self.cache_dir, f"{self._name(ticker, interval, suffix)}.parquet")
+
+    def load_info(self, ticker, interval, suffix=None):
+        """Informações gravadas com as barras (dict) ou None."""
+        return self.info_store.load(self._name(ticker, interval, suffix))
+
+    def save_info(self, ticker, interval, info, suffix=None):
+        self.info_store.save(self._name(ticker, interval, suffix), info)
+
+    def load(self, ticker, interval, suffix=None):
+        """Retorna as barras em cache (coluna 'ds' + OHLCV) ou None se não houver cache."""
+        path = self._path(ticker, interval, suffix)
+        if not os.path.isfile(path):
+            return None
+        try:
+            data = pd.read_parquet(path)
+            self.logger.info(f"Cache OHLCV carregado para {ticker} ({interval}): {len(data)} registros.")
+            return data
+        except Exception as e:
+            self.logger.warning(f"Cache OHLCV ilegível para {ticker} ({interval}), ignorando: {e}")
+            return None
+
+    def save(self, ticker, interval, data, suffix=None):
+        """Grava as barras de forma atômica, para que uma execução interrompida não corrompa o cache."""
+        path = self._path(ticker, interval, suffix)
+        tmp_path = f"{path}.tmp"
+        try:
+            data.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar cache OHLCV para {ticker} ({interval}): {e}")
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def merge(cached, fresh):
+        """
+        Une as barras em cache com as recém-baixadas. Em timestamps repetidos prevalece a barra nova,
+        pois a última barra em cache pode ter sido gravada ainda em formação.
+        """
+        frames = [frame for frame in (cached, fresh) if frame is not None and not frame.empty]
+        if not frames:
+            return None
+        merged = pd.concat(frames, ignore_index=True)
+        merged = merged.drop_duplicates(subset='ds', keep='last')
+        return merged.sort_values('ds').reset_index(drop=True)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+
+import config
+import prophet
+from prophet.serialize import model_from_json, model_to_json
+from src.data.models.dataset_metadata import DatasetMetadata
+from src.utils.file_manager import FileManager
+from src.utils.state_store import StateStore
+
+
+class ProphetModelCache:
+    """
+    Cache local de modelos Prophet ajustados, endereçado pelo conteúdo: a chave é um hash dos dados de
+    treino, dos hiperparâmetros, da configuração de sazonalidades/feriados e da versão do Prophet. Os
+    modelos são gravados com `model_to_json` e, ao ultrapassar `max_bytes`, os menos usados recentemente
+    (pela data de modificação, atualizada a cada leitura) são removidos.
+    """
+
+    # Atributos do modelo que determinam o resultado do ajuste
+    MODEL_ATTRIBUTES = [
+        'growth', 'n_changepoints', 'changepoint_range', 'yearly_seasonality', 'weekly_seasonality',
+        'daily_seasonality', 'seasonality_mode', 'seasonality_prior_scale', 'changepoint_prior_scale',
+        'holidays_prior_scale', 'mcmc_samples', 'interval_width', 'uncertainty_samples', 'seasonalities',
+        'extra_regressors', 'country_holidays',
+    ]
+
+    def __init__(self, cache_dir=config.MODEL_CACHE_DIR, max_bytes=config.MODEL_CACHE_MAX_BYTES):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        FileManager.ensure_directory_exists(self.cache_dir)
+        self.params_store = StateStore(os.path.join(self.cache_dir, "params"))
+
+    @staticmethod
+    def data_key(data, columns=DatasetMetadata.HASH_COLUMNS):
+        """
+        Hash do conteúdo das colunas usadas no ajuste (independente do índice do DataFrame). Sempre recalculado:
+        o registro em `attrs` é herdado por cópias e recortes e pode estar desatualizado.
+        """
+        return DatasetMetadata.content_hash_of(data, columns)
+
+    @classmethod
+    def model_key(cls, data, model):
+        """Chave de um modelo ainda não ajustado para os dados `data`."""
+        model_config = {attribute: getattr(model, attribute, None) for attribute in cls.MODEL_ATTRIBUTES}
+        if model.holidays is not None:
+            model_config['holidays'] = cls.data_key(model.holidays, columns=model.holidays.columns)
+        model_config['prophet_version'] = prophet.__version__
+        description = json.dumps(model_config, sort_keys=True, default=str)
+        return hashlib.sha256(f"{cls.data_key(data)}|{description}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load(self, key):
+        """Retorna o modelo ajustado em cache ou None."""
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path) as file:
+                model = model_from_json(file.read())
+            os.utime(path)
+            self.logger.info(f"Modelo Prophet carregado do cache ({key[:12]}).")
+            return model
+        except Exception as e:
+            self.logger.warning(f"Modelo em cache ilegível em {path}, ignorando: {e}")
+            return None
+
+    def save(self, key, model):
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w') as file:
+                file.write(model_to_json(model))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar modelo Prophet em cache: {e}")
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.json') and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            self.logger.info(f"Modelo removido do cache (LRU): {os.path.basename(path)}")
+
+    def load_params(self, key):
+        """Melhores hiperparâmetros já encontrados para a chave (ex: hash dos dados), ou None."""
+        return self.params_store.load(key)
+
+    def save_params(self, key, params):
+        self.params_store.save(key, params)
@@ -0,0 +1,110 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from src.data.models.model import TimeSeriesBucket
+
+
+class TimeSeriesRepository:
+    """
+    Armazena e lê barras OHLCV em buckets (TimeSeriesBucket): um documento por ativo/intervalo/período,
+    com as barras em arrays colunares. A conexão é responsabilidade de quem usa o repositório
+    (mongoengine.connect, ou mongomock via `mongo_client_class` nos testes).
+    """
+
+    # Tamanho do bucket por intervalo, escolhido para manter os documentos bem abaixo do limite de 16 MB
+    BUCKET_FREQUENCIES = {
+        '1m': 'D',
+        '5m': 'D',
+        '15m': 'D',
+        '30m': 'M',
+        '1h': 'M',
+        '90m': 'M',
+        '1d': 'Y',
+    }
+    FIELDS = {
+        'Open': 'open_price',
+        'High': 'high',
+        'Low': 'low',
+        'Close': 'close_price',
+        'Volume': 'volume',
+    }
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.collection = TimeSeriesBucket._get_collection()
+
+    @staticmethod
+    def _asset_id(asset):
+        return getattr(asset, 'pk', asset)
+
+    def _bucket_periods(self, ds, interval):
+        return ds.dt.to_period(self.BUCKET_FREQUENCIES.get(interval, 'M'))
+
+    def upsert(self, asset, interval, data):
+        """
+        Grava as barras de `data` (colunas 'ds' + OHLCV) com um único bulk_write. Buckets já existentes
+        são lidos em uma única consulta e mesclados, prevalecendo as barras novas em timestamps repetidos.
+        """
+        if data is None or data.empty:
+            return 0
+
+        asset_id = self._asset_id(asset)
+        fresh = data[['ds', *self.FIELDS]].copy()
+        fresh['ds'] = pd.to_datetime(fresh['ds'])
+
+        # Lê os buckets afetados por inteiro, pois cada um é regravado com o array completo
+        periods = self._bucket_periods(fresh['ds'], interval)
+        existing = self.read_range(asset, interval, periods.min().start_time, periods.max().end_time)
+        merged = pd.concat([existing, fresh], ignore_index=True) if not existing.empty else fresh
+        merged = merged.drop_duplicates(subset='ds', keep='last').sort_values('ds').reset_index(drop=True)
+
+        starts = self._bucket_periods(merged['ds'], interval).dt.start_time
+        timestamps = merged['ds'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        values = {field: merged[column].to_numpy(dtype=float) for column, field in self.FIELDS.items()}
+
+        operations = []
+        boundaries = np.flatnonzero(np.diff(starts.to_numpy().astype(np.int64))) + 1
+        for chunk in np.split(np.arange(len(merged)), boundaries):
+            bucket_start = starts.iloc[chunk[0]].to_pydatetime()
+            document = {
+                'bucket_end': merged['ds'].iloc[chunk[-1]].to_pydatetime(),
+                'count': len(chunk),
+                'timestamps': timestamps[chunk].tolist(),
+                **{field: array[chunk].tolist() for field, array in values.items()},
+            }
+            key = {'asset': asset_id, 'interval': interval, 'bucket_start': bucket_start}
+            operations.append(UpdateOne(key, {'$set': document}, upsert=True))
+
+        result = self.collection.bulk_write(operations, ordered=False)
+        self.logger.info(f"{len(operations)} buckets gravados para o ativo {asset_id} ({interval}).")
+        return result.upserted_count + result.modified_count
+
+    def read_range(self, asset, interval, start=None, end=None):
+        """Lê as barras entre `start` e `end` (inclusive) e retorna um DataFrame com 'ds' + OHLCV."""
+        query = {'asset': self._asset_id(asset), 'interval': interval}
+        if end is not None:
+            query['bucket_start'] = {'$lte': pd.Timestamp(end).to_pydatetime()}
+        if start is not None:
+            query['bucket_end'] = {'$gte': pd.Timestamp(start).to_pydatetime()}
+
+        projection = {'_id': 0, 'timestamps': 1, **{field: 1 for field in self.FIELDS.values()}}
+        buckets = list(self.collection.find(query, projection).sort('bucket_start', 1))
+        if not buckets:
+            return pd.DataFrame(columns=['ds', *self.FIELDS])
+
+        data = pd.DataFrame({
+            'ds': pd.to_datetime(np.concatenate([bucket['timestamps'] for bucket in buckets]).astype(np.int64), unit='ms'),
+            **{
+                column: np.concatenate([bucket[field] for bucket in buckets]).astype(float)
+                for column, field in self.FIELDS.items()
+            },
+        })
+
+        mask = np.ones(len(data), dtype=bool)
+        if start is not None:
+            mask &= (data['ds'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (data['ds'] <= pd.Timestamp(end)).to_numpy()
+        return data[mask].reset_index(drop=True)
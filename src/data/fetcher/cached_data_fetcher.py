@@ -0,0 +1,158 @@
+import logging
+import re
+from datetime import datetime, timedelta
+
+import config
+import numpy as np
+from src.data.accesss.ohlcv_cache import OHLCVCache
+from src.data.fetcher.i_data_fetcher import IDataFetcher
+
+
+class CachedDataFetcher(IDataFetcher):
+    """
+    Envolve um IDataFetcher com o cache OHLCV local: baixa apenas as barras posteriores ao último
+    timestamp em cache e devolve o mesmo DataFrame que o `_prepare_data` do fetcher original produz.
+
+    O período solicitado no download completo é gravado com o cache; um período mais amplo (ex: 'max' sobre
+    um cache de '2y') baixa tudo de novo. O incremento começa `REVALIDATION_WINDOW` antes do último timestamp
+    e, se o preço ajustado dessas barras mudou (desdobramento, dividendos), o histórico é baixado por inteiro.
+    """
+
+    PERIOD_UNITS_IN_DAYS = {'d': 1, 'w': 7, 'wk': 7, 'm': 30, 'mo': 30, 'y': 365}
+    # Folga para fins de semana e feriados no início da janela solicitada
+    COVERAGE_TOLERANCE = timedelta(days=7)
+    # Barras em cache comparadas com as recém-baixadas para detectar reajustes do histórico
+    REVALIDATION_WINDOW = timedelta(days=config.CACHE_REVALIDATION_DAYS)
+    REVALIDATION_RTOL = 1e-6
+
+    def __init__(self, fetcher, cache=None):
+        self.logger = logging.getLogger(__name__)
+        self.fetcher = fetcher
+        self.cache = cache or OHLCVCache()
+
+    def fetch_data(self, ticker, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL):
+        window_start = self._window_start(period)
+        cached = self.cache.load(ticker, interval)
+        cached_period = self._cached_period(ticker, interval)
+
+        if self._covers_window(cached, cached_period, period, window_start):
+            since = cached['ds'].max() - self.REVALIDATION_WINDOW
+            self.logger.info(f"Atualizando cache de {ticker} ({interval}) a partir de {since}.")
+            fresh = self.fetcher.fetch_raw(ticker, period, interval, start=since)
+            if not self._is_stale(ticker, cached, fresh):
+                return self._merge_and_prepare(ticker, interval, window_start, cached, fresh, cached_period)
+
+        self.logger.info(f"Cache de {ticker} ({interval}) ausente, incompleto ou desatualizado. Baixando o período {period}.")
+        fresh = self.fetcher.fetch_raw(ticker, period, interval)
+        return self._merge_and_prepare(ticker, interval, window_start, None, fresh, period)
+
+    def fetch_raw(self, ticker, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL, start=None):
+        # As barras brutas vêm sempre da fonte: o cache guarda apenas o histórico consolidado
+        return self.fetcher.fetch_raw(ticker, period, interval, start=start)
+
+    def fetch_many(self, tickers, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL):
+        """
+        Versão em lote de fetch_data: tickers sem cache são baixados por inteiro e os demais recebem
+        apenas o incremento, cada grupo em uma única requisição quando o fetcher suporta fetch_raw_many.
+        """
+        if not hasattr(self.fetcher, 'fetch_raw_many'):
+            datasets = {ticker: self.fetch_data(ticker, period, interval) for ticker in tickers}
+            return {ticker: data for ticker, data in datasets.items() if data is not None}
+
+        window_start = self._window_start(period)
+        cached = {ticker: self.cache.load(ticker, interval) for ticker in tickers}
+        cached_periods = {ticker: self._cached_period(ticker, interval) for ticker in tickers}
+        incremental = [
+            ticker for ticker in tickers
+            if self._covers_window(cached[ticker], cached_periods[ticker], period, window_start)
+        ]
+
+        fresh = {}
+        if incremental:
+            since = min(cached[ticker]['ds'].max() for ticker in incremental) - self.REVALIDATION_WINDOW
+            self.logger.info(f"Atualizando o cache de {len(incremental)} tickers a partir de {since}.")
+            fresh.update(self.fetcher.fetch_raw_many(incremental, period, interval, start=since))
+            incremental = [ticker for ticker in incremental if not self._is_stale(ticker, cached[ticker], fresh.get(ticker))]
+
+        missing = [ticker for ticker in tickers if ticker not in incremental]
+        if missing:
+            self.logger.info(f"Baixando o período {period} para {len(missing)} tickers sem cache válido.")
+            fresh.update(self.fetcher.fetch_raw_many(missing, period, interval))
+
+        datasets = {}
+        for ticker in tickers:
+            if ticker in incremental:
+                previous, stored_period = cached[ticker], cached_periods[ticker]
+            else:
+                previous, stored_period = None, period
+            data = self._merge_and_prepare(ticker, interval, window_start, previous, fresh.get(ticker), stored_period)
+            if data is not None:
+                datasets[ticker] = data
+        return datasets
+
+    def _merge_and_prepare(self, ticker, interval, window_start, cached, fresh, stored_period):
+        raw = OHLCVCache.merge(cached, fresh)
+        if raw is None:
+            self.logger.warning(f"Não foram encontrados dados para {ticker} com os parâmetros fornecidos.")
+            return None
+
+        if fresh is not None and not fresh.empty:
+            self.cache.save(ticker, interval, raw)
+            self.cache.save_info(ticker, interval, {'period': stored_period})
+
+        if window_start is not None:
+            raw = raw[raw['ds'] >= window_start].reset_index(drop=True)
+
+        return self.fetcher._prepare_data(raw.copy())
+
+    def _cached_period(self, ticker, interval):
+        info = self.cache.load_info(ticker, interval)
+        return info.get('period') if info else None
+
+    def _covers_window(self, cached, cached_period, period, window_start):
+        if cached is None or cached.empty:
+            return False
+        if cached_period is not None and self._period_days(cached_period) >= self._period_days(period):
+            # O download que gerou o cache pediu uma janela pelo menos tão ampla quanto a atual
+            return True
+        if window_start is None:
+            # 'max' só é atendido por um cache baixado com 'max'
+            return False
+        return cached['ds'].min() <= window_start + self.COVERAGE_TOLERANCE
+
+    def _period_days(self, period):
+        """Tamanho do período em dias (infinito para 'max' ou períodos não reconhecidos)."""
+        window_start = self._window_start(period)
+        return float('inf') if window_start is None else (datetime.utcnow() - window_start).days
+
+    def _is_stale(self, ticker, cached, fresh):
+        """
+        Compara o preço ajustado das barras em cache com as recém-baixadas na janela de sobreposição
+        (exceto a última barra em cache, que pode ter sido gravada ainda em formação).
+        """
+        if fresh is None or fresh.empty:
+            return False
+        column = 'Adj Close' if 'Adj Close' in cached.columns and 'Adj Close' in fresh.columns else 'Close'
+        previous = cached[cached['ds'] < cached['ds'].max()][['ds', column]]
+        overlap = previous.merge(fresh[['ds', column]], on='ds', suffixes=('_cached', '_fresh'))
+        if overlap.empty:
+            return False
+        stale = not np.allclose(overlap[f"{column}_cached"], overlap[f"{column}_fresh"], rtol=self.REVALIDATION_RTOL, equal_nan=True)
+        if stale:
+            self.logger.warning(f"{ticker}: {column} em cache difere dos dados atuais (ajuste de proventos ou desdobramento).")
+        return stale
+
+    def _window_start(self, period):
+        """Converte o período (ex: '2y', '6mo', '30d') no timestamp inicial da janela; None para 'max'."""
+        now = datetime.utcnow()
+        if period == 'max':
+            return None
+        if period == 'ytd':
+            return datetime(now.year, 1, 1)
+
+        match = re.fullmatch(r"(\d+)(d|wk|w|mo|m|y)", period)
+        if not match:
+            self.logger.error(f"Período '{period}' não reconhecido. Usando a janela completa do cache.")
+            return None
+        value, unit = int(match.group(1)), match.group(2)
+        return now - timedelta(days=value * self.PERIOD_UNITS_IN_DAYS[unit])
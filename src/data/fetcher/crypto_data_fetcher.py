@@ -1,19 +1,27 @@
 import logging
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 import ccxt
 import config
+import numpy as np
 import pandas as pd
 from src.data.fetcher.i_data_fetcher import IDataFetcher
+from src.data.models.dataset_metadata import DatasetMetadata
+from src.utils.rate_limiter import TokenBucket
 
 
 class CryptoDataFetcher(IDataFetcher):
-    def __init__(self):
+    def __init__(self, exchange=None, max_workers=config.FETCH_MAX_WORKERS, max_retries=config.FETCH_MAX_RETRIES, retry_backoff=config.FETCH_RETRY_BACKOFF):
         self.logger = logging.getLogger(__name__)
-        self.exchange = ccxt.binance()
+        self.exchange = exchange or ccxt.binance()
         self.max_request_limit = 1000
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Um único limitador compartilhado por todas as threads respeita o rateLimit da exchange
+        self.rate_limiter = TokenBucket.from_interval_ms(self.exchange.rateLimit)
 
     def _calculate_since_from_period(self, period):
         period_value = int(period[:-1])
@@ -45,38 +53,91 @@ class CryptoDataFetcher(IDataFetcher):
             self.logger.error("Intervalo não suportado. Usando '1h' como padrão.")
             return 3600 * 1000
 
-    def _fetch_ohlcv(self, ticker, since, limit):
-        try:
-            ohlcv = self.exchange.fetch_ohlcv(ticker, config.DEFAULT_INTERVAL, since=since, limit=limit)
-            time.sleep(self.exchange.rateLimit / 1000)
-            return ohlcv
-        except Exception as e:
-            self.logger.error(f"Erro ao buscar dados OHLCV: {e}")
-            return []
+    def _plan_windows(self, since, end, interval_ms, limit):
+        """
+        Planeja as requisições paginadas: cada janela começa onde a anterior termina (limit * interval_ms).
+        """
+        step = limit * interval_ms
+        return list(range(since, end, step))
+
+    def _fetch_ohlcv(self, ticker, since, limit, interval=config.DEFAULT_INTERVAL):
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return self.exchange.fetch_ohlcv(ticker, interval, since=since, limit=limit)
+            except ccxt.NetworkError as e:
+                # Inclui RateLimitExceeded e timeouts, que costumam ser transitórios
+                if attempt == self.max_retries:
+                    self.logger.error(f"Erro ao buscar dados OHLCV a partir de {since} após {attempt + 1} tentativas: {e}")
+                    return []
+                wait = self.retry_backoff * 2 ** attempt
+                self.logger.warning(f"Falha transitória ao buscar dados OHLCV a partir de {since} ({e}). Nova tentativa em {wait:.1f}s.")
+                time.sleep(wait)
+            except Exception as e:
+                self.logger.error(f"Erro ao buscar dados OHLCV: {e}")
+                return []
+        return []
+
+    def fetch_data(self, ticker, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL):
+        dados = self.fetch_raw(ticker, period, interval)
+        if dados is None:
+            return None
+        return self._prepare_data(dados)
 
-    def fetch_data(self, ticker):
-        since_timestamp = self._calculate_since_from_period(config.DEFAULT_PERIOD)
-        interval_ms = self._interval_to_milliseconds(config.DEFAULT_INTERVAL)
+    def fetch_raw(self, ticker, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL, start=None):
+        """
+        Baixa as barras brutas (coluna 'ds' + OHLCV). Com `start`, baixa apenas as barras a partir dessa data.
+        """
+        if start is not None:
+            since_timestamp = int(start.replace(tzinfo=timezone.utc).timestamp() * 1000)
+        else:
+            since_timestamp = self._calculate_since_from_period(period)
+        interval_ms = self._interval_to_milliseconds(interval)
         end_timestamp = self.exchange.milliseconds()
 
-        hours_diff = int((end_timestamp - since_timestamp) / interval_ms)
-        segments = [(ticker, since_timestamp + i * interval_ms, self.max_request_limit) for i in range(min(hours_diff, self.max_request_limit))]
+        windows = self._plan_windows(since_timestamp, end_timestamp, interval_ms, self.max_request_limit)
+        self.logger.info(f"Buscando {ticker} ({interval}) em {len(windows)} requisições paginadas.")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(lambda since: self._fetch_ohlcv(ticker, since, self.max_request_limit, interval), windows))
 
-        all_data = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(self._fetch_ohlcv, segment[0], segment[1], segment[2]) for segment in segments]
-            for future in as_completed(futures):
-                ohlcv = future.result()
-                if ohlcv:
-                    all_data.extend(ohlcv)
+        batches = [np.asarray(ohlcv, dtype=float) for ohlcv in results if ohlcv]
+        if not batches:
+            self.logger.warning(f"Nenhum dado OHLCV encontrado para {ticker}.")
+            return None
 
-        all_data.sort(key=lambda x: x[0])
+        ohlcv = self._deduplicate(np.concatenate(batches), since_timestamp, end_timestamp)
+        if len(ohlcv) == 0:
+            self.logger.warning(f"Nenhuma barra de {ticker} dentro da janela solicitada.")
+            return None
+        self._log_gaps(ticker, ohlcv[:, 0], interval_ms)
 
-        dados = pd.DataFrame(all_data, columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        dados['Timestamp'] = pd.to_datetime(dados['Timestamp'], unit='ms')
-        dados.rename(columns={"Timestamp": "ds", "Close": "y"}, inplace=True)
+        dados = pd.DataFrame(ohlcv[:, 1:], columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        dados.insert(0, 'ds', pd.to_datetime(ohlcv[:, 0].astype(np.int64), unit='ms'))
+        return dados
+
+    @staticmethod
+    def _deduplicate(ohlcv, since, end):
+        """Ordena por timestamp, remove barras repetidas (fica a última recebida) e fora da janela."""
+        ohlcv = ohlcv[(ohlcv[:, 0] >= since) & (ohlcv[:, 0] <= end)]
+        if len(ohlcv) == 0:
+            return ohlcv
+        order = np.argsort(ohlcv[:, 0], kind='stable')
+        ohlcv = ohlcv[order]
+        is_last = np.append(ohlcv[1:, 0] != ohlcv[:-1, 0], True)
+        return ohlcv[is_last]
+
+    def _log_gaps(self, ticker, timestamps, interval_ms):
+        deltas = np.diff(timestamps)
+        gaps = np.flatnonzero(deltas > interval_ms)
+        if gaps.size:
+            missing = int(((deltas[gaps] // interval_ms) - 1).sum())
+            first_gap = pd.to_datetime(int(timestamps[gaps[0]]), unit='ms')
+            self.logger.warning(f"{ticker}: {gaps.size} lacunas na série ({missing} barras ausentes), a primeira após {first_gap}.")
+
+    def _prepare_data(self, dados):
+        dados = dados.rename(columns={"Close": "y"})
         dados['Close'] = dados['y']
-        dados['ds'] = dados['ds'].dt.tz_localize(None)
-        dados.fillna(method='ffill', inplace=True)
+        dados.ffill(inplace=True)
         dados['Retornos'] = dados['y'].pct_change()
-        return dados
+        return DatasetMetadata.attach_to(dados)
@@ -1,16 +1,22 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import config
 import numpy as np
 import pandas as pd
 import yfinance as yf
+from src.data.accesss.ohlcv_cache import OHLCVCache
 from src.data.fetcher.i_data_fetcher import IDataFetcher
+from src.data.models.dataset_metadata import DatasetMetadata
 
 
 class YahooFinanceFetcher(IDataFetcher):
+    HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self.chunk_cache = OHLCVCache(config.INTRADAY_CHUNK_CACHE_DIR)
 
     def fetch_data(self, ticker, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL):
         """
@@ -30,6 +36,121 @@ class YahooFinanceFetcher(IDataFetcher):
 
         return data
 
+    def fetch_many(self, tickers, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL):
+        """
+        Baixa vários tickers em uma única chamada do yf.download e retorna {ticker: DataFrame preparado}.
+        Tickers sem dados ficam de fora do dicionário.
+        """
+        if interval != '1d' and period in ['max']:
+            # O histórico intradiário completo exige download em chunks, que é feito por ticker
+            datasets = {ticker: self.fetch_data(ticker, period, interval) for ticker in tickers}
+            return {ticker: data for ticker, data in datasets.items() if data is not None}
+
+        self.logger.info(f"Iniciando a busca em lote de {len(tickers)} tickers com período de {period} e intervalo de {interval}.")
+        panel = self._download_panel(tickers, period=period, interval=interval)
+        if panel is None:
+            return {}
+
+        datasets = self._prepare_panel(panel, tickers)
+        self.logger.info(f"Busca em lote concluída: {len(datasets)}/{len(tickers)} tickers com dados.")
+        return datasets
+
+    def fetch_raw_many(self, tickers, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL, start=None):
+        """
+        Versão em lote de fetch_raw: retorna {ticker: barras brutas} a partir de uma única chamada do yf.download.
+        """
+        if start is not None:
+            panel = self._download_panel(tickers, start=(start - timedelta(days=1)).strftime("%Y-%m-%d"), interval=interval)
+        elif interval != '1d' and period in ['max']:
+            raws = {ticker: self.fetch_raw(ticker, period, interval) for ticker in tickers}
+            return {ticker: raw for ticker, raw in raws.items() if raw is not None}
+        else:
+            panel = self._download_panel(tickers, period=period, interval=interval)
+
+        if panel is None:
+            return {}
+
+        panel = self._normalize_panel_index(panel)
+        raws = {}
+        for ticker in self._panel_tickers(panel, tickers):
+            raw = panel[ticker].dropna(how='all')
+            if not raw.empty:
+                raws[ticker] = self._panel_frame_to_columns(raw)
+        return raws
+
+    def _download_panel(self, tickers, **kwargs):
+        """
+        Executa um único yf.download para todos os tickers. As colunas do resultado são (ticker, campo).
+        """
+        data = self._download(" ".join(tickers), group_by='ticker', threads=True, **kwargs)
+        if data is None:
+            return None
+        if not isinstance(data.columns, pd.MultiIndex):
+            # Com um único ticker o yfinance devolve colunas simples
+            data = pd.concat({tickers[0]: data}, axis=1)
+        return data
+
+    def _normalize_panel_index(self, panel):
+        """
+        Equivalente a _normalize_index para o painel (tempo x (ticker, campo)): mantém 'ds' no índice.
+        """
+        ds = pd.to_datetime(panel.index, errors='coerce', utc=True).tz_localize(None)
+        panel = panel.set_axis(ds, axis=0)
+        invalid_dates = panel.index.isnull()
+        if invalid_dates.any():
+            self.logger.warning(f"Removendo {invalid_dates.sum()} linhas com datas inválidas.")
+            panel = panel[~invalid_dates]
+        panel.index.name = 'ds'
+        return panel
+
+    def _panel_tickers(self, panel, tickers):
+        available = set(panel.columns.get_level_values(0))
+        missing = [ticker for ticker in tickers if ticker not in available]
+        if missing:
+            self.logger.warning(f"Tickers ausentes no download em lote: {missing}")
+        return [ticker for ticker in tickers if ticker in available]
+
+    @staticmethod
+    def _panel_frame_to_columns(frame):
+        frame = frame.reset_index()
+        frame.columns.name = None
+        return frame
+
+    def _prepare_panel(self, panel, tickers):
+        """
+        Aplica o preparo de _prepare_data a todos os tickers de uma vez sobre o painel largo.
+        O preenchimento coluna a coluna equivale ao feito por ticker, já que as linhas em que um ticker
+        não tem nenhum dado são descartadas apenas na separação final.
+        """
+        self.logger.info("Preparando os dados do painel...")
+        panel = self._normalize_panel_index(panel)
+        panel = panel.rename(columns={"Adj Close": "y"}, level=1)
+
+        # Linhas em que o ticker tem algum dado (equivale ao dropna(how='all') por ticker)
+        has_data = panel.notna().T.groupby(level=0, sort=False).any().T
+
+        panel = panel.ffill().bfill()
+        if panel.isnull().values.any():
+            columns_with_nulls = panel.columns[panel.isnull().any()].tolist()
+            self.logger.warning(f"Dados nulos ainda presentes após o preenchimento nas colunas: {columns_with_nulls}. Substituindo por zero.")
+            panel = panel.fillna(0)
+
+        # Retorno logarítmico contra a barra anterior do próprio ticker, ignorando linhas sem dado
+        y = panel.xs('y', axis=1, level=1)
+        previous_y = y.where(has_data).ffill().shift(1)
+        retornos = np.log(y / previous_y).fillna(0)
+
+        datasets = {}
+        for ticker in self._panel_tickers(panel, tickers):
+            mask = has_data[ticker].to_numpy()
+            if not mask.any():
+                self.logger.warning(f"Nenhum dado encontrado para {ticker} no período especificado.")
+                continue
+            data = panel[ticker].loc[mask].copy()
+            data['Retornos'] = retornos[ticker].to_numpy()[mask]
+            datasets[ticker] = DatasetMetadata.attach_to(self._panel_frame_to_columns(data))
+        return datasets
+
     def _calculate_period_in_days(self, period):
         """ Calcula o período em dias com base na string de período. """
         try:
@@ -48,73 +169,177 @@ class YahooFinanceFetcher(IDataFetcher):
             self.logger.error(f"Erro ao converter período '{period}' para dias. Verifique o formato (ex: '1y', '6mo', '30d').")
             return None
 
-    def _fetch_single_period_data(self, ticker, period, interval):
+    def fetch_raw(self, ticker, period=config.DEFAULT_PERIOD, interval=config.DEFAULT_INTERVAL, start=None):
         """
-        Baixa dados para um único período contínuo.
+        Baixa as barras brutas (coluna 'ds' + OHLCV), sem o preparo de _prepare_data.
+        Com `start`, baixa apenas as barras a partir dessa data (usado pelo cache incremental).
+        """
+        if start is not None:
+            # O Yahoo interpreta datas sem timezone no fuso da bolsa; recuar um dia garante que
+            # nenhuma barra posterior a `start` fique de fora (a sobreposição é deduplicada no cache).
+            start_date = (start - timedelta(days=1)).strftime("%Y-%m-%d")
+            self.logger.info(f"Baixando barras de {ticker} a partir de {start_date}...")
+            data = self._download(ticker, start=start_date, interval=interval)
+        elif interval == '1d' or period not in ['max']:
+            data = self._download(ticker, period=period, interval=interval)
+        else:
+            # Os chunks intradiários já chegam normalizados
+            return self._download_intraday_chunks(ticker, interval)
+
+        if data is None:
+            return None
+        return self._normalize_index(data)
+
+    def _download(self, ticker, **kwargs):
+        """
+        Executa um yf.download, retornando None se não houver dados ou em caso de erro.
         """
-        self.logger.info(f"Baixando dados de período único para {ticker}...")
         try:
-            data = yf.download(ticker, period=period, interval=interval)
+            data = yf.download(ticker, **kwargs)
             if data.empty:
                 self.logger.warning(f"Nenhum dado encontrado para {ticker} no período especificado.")
                 return None
-            return self._prepare_data(data)
+            return data
         except Exception as e:
             self.logger.error(f"Erro ao baixar os dados para {ticker}: {e}")
             return None
 
+    def _download_history(self, ticker, **kwargs):
+        """
+        Baixa um único ticker com yf.Ticker(...).history, que, ao contrário do yf.download (cujos resultados
+        ficam em um dicionário global do módulo, indexado pelo ticker), pode ser chamado em paralelo para o
+        mesmo ticker. Retorna as mesmas colunas do yf.download, um DataFrame vazio se a janela não tiver
+        dados ou None em caso de erro (ex: falha de rede), para que só janelas realmente vazias sejam registradas.
+        """
+        try:
+            data = yf.Ticker(ticker).history(auto_adjust=False, actions=False, **kwargs)
+            if data.empty:
+                return data
+            data.index.name = 'Datetime' if data.index.name is None else data.index.name
+            return data[[column for column in self.HISTORY_COLUMNS if column in data.columns]]
+        except Exception as e:
+            self.logger.error(f"Erro ao baixar os dados para {ticker}: {e}")
+            return None
+
+    def _fetch_single_period_data(self, ticker, period, interval):
+        """
+        Baixa dados para um único período contínuo.
+        """
+        self.logger.info(f"Baixando dados de período único para {ticker}...")
+        data = self._download(ticker, period=period, interval=interval)
+        if data is None:
+            return None
+        return self._prepare_data(data)
+
     def _fetch_intraday_data_concatenated(self, ticker, interval):
         """
         Baixa dados intradiários em partes (chunks) e os concatena, respeitando a data de IPO da ação e o limite de dias por requisição para o intervalo especificado.
         """
-        self.logger.info(f"Baixando dados intradiários para {ticker} em lotes...")
+        data = self._download_intraday_chunks(ticker, interval)
+        if data is None:
+            return None
+        return self._prepare_data(data)
+
+    def _first_trade_date(self, ticker):
+        """Data do IPO da ação segundo o Yahoo (UTC, sem timezone), ou 2013-01-01 se indisponível."""
+        default = datetime(2013, 1, 1)
+        try:
+            info = yf.Ticker(ticker).info
+        except Exception as e:
+            self.logger.warning(f"Não foi possível obter a data do IPO de {ticker}: {e}")
+            return default
+
+        first_trade = info.get('firstTradeDateEpochUtc', info.get('firstTradeDate'))
+        if isinstance(first_trade, (int, float)):
+            return datetime.utcfromtimestamp(first_trade)
+        if isinstance(first_trade, datetime):
+            return first_trade.replace(tzinfo=None)
+        return default
+
+    def _plan_intraday_chunks(self, start_date_limit, end_date, max_days_per_request, available_from=None):
+        """
+        Planeja as janelas [início, fim) de download. A grade é ancorada na data do IPO, e não em hoje,
+        para que as janelas já concluídas tenham sempre as mesmas datas e possam ser reaproveitadas do cache.
+        Janelas que terminam antes de `available_from` (limite de histórico do Yahoo para o intervalo) são omitidas.
+        """
+        step = timedelta(days=max_days_per_request)
+        windows = []
+        start_date = start_date_limit.date()
+        while start_date <= end_date:
+            window_end = min(start_date + step, end_date + timedelta(days=1))
+            if available_from is None or window_end > available_from:
+                windows.append((start_date, window_end))
+            start_date += step
+        return windows
+
+    def _fetch_intraday_chunk(self, ticker, interval, start_date, end_date, complete, available_from=None):
+        """
+        Baixa um chunk intradiário já normalizado. Chunks concluídos (anteriores a hoje) são gravados no
+        cache, de modo que um backfill interrompido retoma apenas os chunks que faltam; os concluídos sem
+        dados também são registrados, para não serem pedidos novamente.
+        """
+        suffix = f"{start_date:%Y%m%d}_{end_date:%Y%m%d}"
+        if complete:
+            info = self.chunk_cache.load_info(ticker, interval, suffix)
+            if info is not None and info.get('empty'):
+                return None
+            cached = self.chunk_cache.load(ticker, interval, suffix)
+            if cached is not None:
+                return cached
 
-        end_date = datetime.now()
+        # O Yahoo recusa pedidos que começam antes do limite de histórico do intervalo
+        request_start = max(start_date, available_from) if available_from is not None else start_date
+        self.logger.info(f"Baixando dados de {request_start:%Y-%m-%d} a {end_date:%Y-%m-%d}...")
+        temp_data = self._download_history(ticker, start=f"{request_start:%Y-%m-%d}", end=f"{end_date:%Y-%m-%d}", interval=interval)
+        if temp_data is None:
+            return None
+        if temp_data.empty:
+            self.logger.warning(f"Nenhum dado encontrado para {ticker} entre {request_start:%Y-%m-%d} e {end_date:%Y-%m-%d}")
+            if complete:
+                self.chunk_cache.save_info(ticker, interval, {'empty': True}, suffix)
+            return None
+
+        self.logger.info(f"Dados baixados com sucesso ({len(temp_data)} registros).")
+        chunk = self._normalize_index(temp_data)
+        if complete:
+            self.chunk_cache.save(ticker, interval, chunk, suffix)
+        return chunk
 
-        # Obtém informações da ação, incluindo a data do IPO
-        ticker_info = yf.Ticker(ticker)
-        start_date_limit = ticker_info.info.get('firstTradeDate', datetime(2013, 1, 1))
-        start_date_limit = start_date_limit.replace(tzinfo=None)
+    def _download_intraday_chunks(self, ticker, interval):
+        """
+        Baixa os chunks intradiários em paralelo e retorna os dados brutos (já normalizados) concatenados.
+        """
+        self.logger.info(f"Baixando dados intradiários para {ticker} em lotes...")
 
-        all_data = []
+        today = datetime.utcnow().date()
+        start_date_limit = self._first_trade_date(ticker)
         max_days_per_request = config.MAX_DAYS_PER_REQUEST.get(interval, 730)  # Obtém o limite de dias por requisição para o intervalo
+        history_days = config.INTRADAY_HISTORY_DAYS.get(interval)
+        # Um dia de folga: o limite do Yahoo é contado a partir do momento da requisição
+        available_from = today - timedelta(days=history_days - 1) if history_days else None
+        windows = self._plan_intraday_chunks(start_date_limit, today, max_days_per_request, available_from)
+        self.logger.info(f"{len(windows)} chunks planejados para {ticker} ({interval}).")
 
-        while end_date > start_date_limit:
-            start_date = end_date - timedelta(days=max_days_per_request)
-
-            self.logger.info(f"Baixando dados de {start_date.strftime('%Y-%m-%d')} a {end_date.strftime('%Y-%m-%d')}...")
-            try:
-                temp_data = yf.download(
-                    ticker,
-                    start=start_date.strftime("%Y-%m-%d"),
-                    end=end_date.strftime("%Y-%m-%d"),
-                    interval=interval,
-                )
-
-                if not temp_data.empty:
-                    self.logger.info(f"Dados baixados com sucesso ({len(temp_data)} registros).")
-                    all_data.append(temp_data)
-                else:
-                    self.logger.warning(f"Nenhum dado encontrado para {ticker} entre {start_date.strftime('%Y-%m-%d')} e {end_date.strftime('%Y-%m-%d')}")
-            except Exception as e:
-                self.logger.error(f"Erro ao baixar os dados para {ticker} entre {start_date.strftime('%Y-%m-%d')} e {end_date.strftime('%Y-%m-%d')}: {e}")
-
-            end_date = start_date - timedelta(days=1)
-
-        if all_data:
-            self.logger.info("Concatenando os dados baixados...")
-            all_data = pd.concat(all_data)
-            return self._prepare_data(all_data)
-        else:
+        with ThreadPoolExecutor(max_workers=config.FETCH_MAX_WORKERS) as executor:
+            chunks = list(executor.map(
+                lambda window: self._fetch_intraday_chunk(ticker, interval, window[0], window[1], window[1] <= today, available_from),
+                windows,
+            ))
+
+        all_data = [chunk for chunk in chunks if chunk is not None and not chunk.empty]
+        if not all_data:
             self.logger.warning(f"Nenhum dado intradiário encontrado para {ticker}.")
             return None
 
-    def _prepare_data(self, data):
+        self.logger.info("Concatenando os dados baixados...")
+        data = pd.concat(all_data, ignore_index=True)
+        data = data.sort_values('ds', kind='stable').drop_duplicates(subset='ds', keep='last')
+        return data.reset_index(drop=True)
+
+    def _normalize_index(self, data):
         """
-        Prepara os dados para uso.
+        Move o índice de datas do yfinance para a coluna 'ds' (UTC, sem timezone) e remove datas inválidas.
         """
-        self.logger.info("Preparando os dados...")
-
         data.reset_index(inplace=True)
         data.columns = ['ds' if str(col).lower() in ['date', 'datetime'] else col for col in data.columns]
         data['ds'] = pd.to_datetime(data['ds'], errors='coerce', utc=True).dt.tz_localize(None)
@@ -125,6 +350,18 @@ class YahooFinanceFetcher(IDataFetcher):
             self.logger.warning(f"Removendo {invalid_dates.sum()} linhas com datas inválidas.")
             data = data[~invalid_dates]
 
+        return data
+
+    def _prepare_data(self, data):
+        """
+        Prepara os dados para uso.
+        """
+        self.logger.info("Preparando os dados...")
+
+        # Barras vindas do cache já possuem a coluna 'ds' normalizada
+        if 'ds' not in data.columns:
+            data = self._normalize_index(data)
+
         data.rename(columns={"Open": "Open", "High": "High", "Low": "Low", "Close": "Close", "Adj Close": "y", "Volume": "Volume"}, inplace=True)
 
         # Remove dados completamente nulos
@@ -142,5 +379,6 @@ class YahooFinanceFetcher(IDataFetcher):
         data['Retornos'] = np.log(data['y'] / data['y'].shift(1))
         data['Retornos'] = data['Retornos'].fillna(0)
 
-        self.logger.info(f"Preparo dos dados concluído. Total de registros: {len(data)}")
-        return data
+        metadata = DatasetMetadata.from_frame(data)
+        self.logger.info(f"Preparo dos dados concluído: {metadata}")
+        return metadata.attach(data)
@@ -5,3 +5,11 @@ class IDataFetcher(ABC):
     @abstractmethod
     def fetch_data(self, ticker, period):
         pass
+
+    @abstractmethod
+    def fetch_raw(self, ticker, period, interval, start=None):
+        """
+        Retorna as barras brutas (coluna 'ds' + OHLCV), sem o preparo de `_prepare_data`.
+        Com `start`, retorna apenas as barras a partir dessa data. Usado pelo cache incremental.
+        """
+        pass
@@ -1,14 +1,20 @@
 import datetime as dt
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+import config
 import pandas as pd
 import yfinance as yf
+from src.utils.rate_limiter import TokenBucket
 
 
 class OptionsFetcher:
-    def __init__(self, ticker):
+    def __init__(self, ticker, rate_limiter=None, max_workers=config.FETCH_MAX_WORKERS):
         self.ticker = ticker
         self.logger = logging.getLogger(__name__)
+        # O limitador pode ser compartilhado entre vários OptionsFetcher para respeitar um limite global
+        self.rate_limiter = rate_limiter or TokenBucket.from_interval_ms(config.OPTIONS_REQUEST_INTERVAL_MS)
+        self.max_workers = max_workers
 
     def fetch_options_data(self):
         self.logger.info(f"Fetching options data for {self.ticker}...")
@@ -27,6 +33,35 @@ class OptionsFetcher:
             self.logger.error(f"Failed to get expiry dates for {self.ticker}: {e}")
             return []
 
+    def get_spot_price(self, ticker):
+        try:
+            self.rate_limiter.acquire()
+            history = ticker.history(period='5d')
+            return float(history['Close'].iloc[-1])
+        except Exception as e:
+            self.logger.error(f"Failed to get spot price for {self.ticker}: {e}")
+            return None
+
+    def fetch_all_options(self, ticker, expiry_dates):
+        """
+        Fetches the chains of all expiry dates concurrently (bounded by the rate limiter) and returns
+        a single calls+puts frame with an 'expiration' column, or None if no chain could be parsed.
+        """
+        def fetch(expiry_date):
+            self.rate_limiter.acquire()
+            options = self.parse_options_data(ticker, expiry_date)
+            if options is not None:
+                options['expiration'] = pd.Timestamp(expiry_date)
+            return options
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            chains = [chain for chain in executor.map(fetch, expiry_dates) if chain is not None and not chain.empty]
+
+        if not chains:
+            return None
+        self.logger.info(f"Fetched {len(chains)}/{len(expiry_dates)} option chains for {self.ticker}.")
+        return pd.concat(chains, ignore_index=True)
+
     def parse_options_data(self, ticker, expiry_date):
         try:
             options = ticker.option_chain(expiry_date)
@@ -0,0 +1,92 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from src.utils.file_manager import FileManager
+from src.utils.state_store import StateStore
+
+
+class CompactOHLCV:
+    """
+    Representação compacta de uma série OHLCV: colunas float32 contíguas e timestamps int64 (ns),
+    opcionalmente mapeadas de arquivos .npy via numpy.memmap.
+
+    Quando mapeado de disco, o objeto é serializado apenas pelo caminho, de modo que os workers do
+    Dask abrem o mesmo arquivo em vez de cada um receber uma cópia dos dados. Para isso, envie o
+    CompactOHLCV (e não o DataFrame) e chame `to_frame()` no worker. Os `attrs` do DataFrame (ex: o
+    DatasetMetadata) são gravados em JSON junto às colunas e restaurados por `to_frame()`.
+    """
+
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'y', 'Volume', 'Retornos']
+    TIMESTAMP_FILE = 'ds.npy'
+    ATTRS_KEY = 'attrs'
+
+    def __init__(self, timestamps, columns, path=None, attrs=None):
+        self.logger = logging.getLogger(__name__)
+        self.timestamps = timestamps
+        self.columns = columns
+        self.path = path
+        self.attrs = attrs or {}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __reduce__(self):
+        if self.path is not None:
+            return (CompactOHLCV.open, (self.path,))
+        return (CompactOHLCV, (self.timestamps, self.columns, None, self.attrs))
+
+    @classmethod
+    def from_frame(cls, data, columns=None):
+        """
+        Converte um DataFrame preparado (coluna 'ds' + OHLCV) para a representação compacta. Sem `columns`,
+        mantém todas as colunas numéricas (as de COLUMNS primeiro).
+        """
+        if columns is None:
+            numeric = [column for column in data.columns if column != 'ds' and pd.api.types.is_numeric_dtype(data[column])]
+            columns = [column for column in cls.COLUMNS if column in numeric]
+            columns += [column for column in numeric if column not in columns]
+        columns = [column for column in columns if column in data.columns]
+        timestamps = np.ascontiguousarray(data['ds'].to_numpy(dtype='datetime64[ns]').view(np.int64))
+        arrays = {column: np.ascontiguousarray(data[column].to_numpy(dtype=np.float32)) for column in columns}
+        return cls(timestamps, arrays, attrs=dict(data.attrs))
+
+    def save(self, path):
+        """Grava cada coluna em um arquivo .npy no diretório `path` e retorna a versão mapeada em memória."""
+        FileManager.ensure_directory_exists(path)
+        np.save(os.path.join(path, self.TIMESTAMP_FILE), self.timestamps)
+        for column, array in self.columns.items():
+            np.save(os.path.join(path, f"{column}.npy"), array)
+        StateStore(path).save(self.ATTRS_KEY, self.attrs)
+        self.logger.info(f"Dataset compacto gravado em {path} ({len(self)} registros, {self.nbytes / 1e6:.1f} MB).")
+        return CompactOHLCV.open(path)
+
+    @classmethod
+    def open(cls, path, mmap_mode='c'):
+        """
+        Abre um dataset gravado por `save` como numpy.memmap. O modo padrão 'c' (copy-on-write) compartilha
+        as páginas do arquivo entre processos e mantém privadas eventuais escritas feitas pelas análises.
+        """
+        timestamps = np.load(os.path.join(path, cls.TIMESTAMP_FILE), mmap_mode=mmap_mode)
+        columns = {}
+        for filename in sorted(os.listdir(path)):
+            column, extension = os.path.splitext(filename)
+            if extension == '.npy' and filename != cls.TIMESTAMP_FILE:
+                columns[column] = np.load(os.path.join(path, filename), mmap_mode=mmap_mode)
+        ordered = [column for column in cls.COLUMNS if column in columns]
+        ordered += [column for column in columns if column not in ordered]
+        attrs = StateStore(path).load(cls.ATTRS_KEY)
+        return cls(timestamps, {column: columns[column] for column in ordered}, path=path, attrs=attrs)
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + sum(array.nbytes for array in self.columns.values())
+
+    def to_frame(self):
+        """Retorna um DataFrame que referencia os arrays (e memmaps) sem copiá-los."""
+        data = {'ds': self.timestamps.view('datetime64[ns]')}
+        data.update(self.columns)
+        frame = pd.DataFrame(data, copy=False)
+        frame.attrs.update(self.attrs)
+        return frame
@@ -0,0 +1,176 @@
+import hashlib
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+
+class DatasetMetadata:
+    """
+    Descrição de um conjunto de barras calculada uma única vez no preparo dos dados e anexada ao DataFrame
+    (em `data.attrs['metadata']`, como dict serializável em JSON), para que as etapas seguintes não
+    precisem reinspecionar a série: frequência das barras, período coberto, calendário de pregões,
+    se é intradiário, número de linhas e hash do conteúdo (colunas 'ds' e 'y').
+
+    A frequência é a moda do histograma dos intervalos entre barras consecutivas, o que ignora os saltos
+    de noites, fins de semana e feriados (casos em que `pd.infer_freq` retorna None).
+    """
+
+    ATTRS_KEY = 'metadata'
+    HASH_COLUMNS = ('ds', 'y')
+
+    def __init__(self, frequency, start, end, row_count, content_hash, weekdays=None,
+                 session_start=None, session_end=None, bars_per_session=None, y_checksum=None):
+        self.frequency = frequency
+        self.start = start
+        self.end = end
+        self.row_count = row_count
+        self.content_hash = content_hash
+        self.y_checksum = y_checksum
+        self.weekdays = weekdays or []
+        self.session_start = session_start
+        self.session_end = session_end
+        self.bars_per_session = bars_per_session
+
+    def __repr__(self):
+        return (f"DatasetMetadata(frequency={self.frequency}, start={self.start}, end={self.end}, "
+                f"rows={self.row_count}, intraday={self.is_intraday})")
+
+    @property
+    def is_intraday(self):
+        return self.frequency is not None and self.frequency < pd.Timedelta(days=1)
+
+    @property
+    def span(self):
+        return self.end - self.start
+
+    @property
+    def total_days(self):
+        return self.span.days
+
+    @staticmethod
+    def _with_ds_column(data):
+        # Algumas análises movem 'ds' para o índice (set_index); o registro é o mesmo nos dois casos
+        if 'ds' not in data.columns and data.index.name == 'ds':
+            return data.reset_index()
+        return data
+
+    @classmethod
+    def content_hash_of(cls, data, columns=HASH_COLUMNS):
+        """Hash do conteúdo das colunas (independente do índice do DataFrame)."""
+        data = cls._with_ds_column(data)
+        columns = [column for column in columns if column in data.columns]
+        hashes = pd.util.hash_pandas_object(data[columns], index=False).to_numpy()
+        return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+    @staticmethod
+    def _y_checksum(data):
+        """Soma dos valores de 'y': verificação barata de que a série não foi alterada (ex: df.assign(y=...))."""
+        return float(np.nansum(data['y'].to_numpy(dtype=float))) if 'y' in data.columns else None
+
+    @staticmethod
+    def _modal_delta(timestamps):
+        deltas = np.diff(timestamps.astype(np.int64))
+        deltas = deltas[deltas > 0]
+        if len(deltas) == 0:
+            return None
+        values, counts = np.unique(deltas, return_counts=True)
+        return pd.Timedelta(int(values[np.argmax(counts)]), unit='ns')
+
+    @classmethod
+    def from_frame(cls, data):
+        data = cls._with_ds_column(data)
+        ds = pd.to_datetime(data['ds'])
+        frequency = cls._modal_delta(ds.to_numpy(dtype='datetime64[ns]'))
+        metadata = cls(
+            frequency=frequency,
+            start=ds.iloc[0] if len(ds) else None,
+            end=ds.iloc[-1] if len(ds) else None,
+            row_count=len(data),
+            content_hash=cls.content_hash_of(data),
+            weekdays=sorted(int(day) for day in ds.dt.weekday.unique()),
+            y_checksum=cls._y_checksum(data),
+        )
+        if metadata.is_intraday and len(ds):
+            times = ds.dt.time
+            metadata.session_start, metadata.session_end = times.min(), times.max()
+            metadata.bars_per_session = int(ds.dt.normalize().value_counts().median())
+        elif len(ds):
+            metadata.bars_per_session = 1
+        return metadata
+
+    def matches(self, data):
+        """
+        O registro continua válido se o DataFrame tem o mesmo número de linhas, as mesmas datas nas pontas e a
+        mesma soma de 'y'. É uma verificação barata, não exata: chaves de cache usam content_hash_of.
+        """
+        if 'ds' in data.columns:
+            ds = data['ds']
+        elif data.index.name == 'ds':
+            ds = data.index.to_series()
+        else:
+            return False
+        if len(data) != self.row_count or len(data) == 0:
+            return False
+        if pd.Timestamp(ds.iloc[0]) != self.start or pd.Timestamp(ds.iloc[-1]) != self.end:
+            return False
+        return self.y_checksum == self._y_checksum(data)
+
+    def to_dict(self):
+        return {
+            'frequency': self.frequency.isoformat() if self.frequency is not None else None,
+            'start': self.start.isoformat() if self.start is not None else None,
+            'end': self.end.isoformat() if self.end is not None else None,
+            'row_count': self.row_count,
+            'content_hash': self.content_hash,
+            'weekdays': self.weekdays,
+            'session_start': self.session_start.isoformat() if self.session_start is not None else None,
+            'session_end': self.session_end.isoformat() if self.session_end is not None else None,
+            'bars_per_session': self.bars_per_session,
+            'y_checksum': self.y_checksum,
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        def timestamp(value):
+            return pd.Timestamp(value) if value is not None else None
+
+        def time_of_day(value):
+            return time.fromisoformat(value) if value is not None else None
+
+        return cls(
+            frequency=pd.Timedelta(values['frequency']) if values['frequency'] is not None else None,
+            start=timestamp(values['start']),
+            end=timestamp(values['end']),
+            row_count=values['row_count'],
+            content_hash=values['content_hash'],
+            weekdays=values['weekdays'],
+            session_start=time_of_day(values['session_start']),
+            session_end=time_of_day(values['session_end']),
+            bars_per_session=values['bars_per_session'],
+            y_checksum=values.get('y_checksum'),
+        )
+
+    def attach(self, data):
+        data.attrs[self.ATTRS_KEY] = self.to_dict()
+        return data
+
+    @classmethod
+    def attach_to(cls, data):
+        """Calcula o registro de `data` e o anexa ao próprio DataFrame, que é retornado."""
+        return cls.from_frame(data).attach(data)
+
+    @classmethod
+    def of(cls, data):
+        """
+        Registro anexado a `data`, se ainda corresponder ao DataFrame (recortes e cópias herdam os attrs do
+        original); caso contrário, é recalculado e anexado.
+        """
+        values = data.attrs.get(cls.ATTRS_KEY)
+        if values is not None:
+            metadata = cls.from_dict(values)
+            if metadata.matches(data):
+                return metadata
+        metadata = cls.from_frame(data)
+        metadata.attach(data)
+        return metadata
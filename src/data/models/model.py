@@ -2,7 +2,8 @@ from mongoengine import Document, EmbeddedDocument
 from mongoengine.fields import (BooleanField, DateTimeField, DictField,
                                 EmbeddedDocumentField,
                                 EmbeddedDocumentListField, FloatField,
-                                ListField, ReferenceField, StringField)
+                                IntField, ListField, LongField,
+                                ReferenceField, StringField)
 
 
 class Asset(Document):
@@ -21,11 +22,38 @@ class TimeSeries(Document):
     low = FloatField(required=True)
     volume = FloatField(required=True)
 
+class TimeSeriesBucket(Document):
+    # Barras de um ativo/intervalo agrupadas por dia, mês ou ano em arrays colunares (ver TimeSeriesRepository)
+    asset = ReferenceField('Asset', required=True)
+    interval = StringField(required=True, choices=['1m', '5m', '15m', '30m', '1h', '90m', '1d'])
+    bucket_start = DateTimeField(required=True)
+    bucket_end = DateTimeField(required=True)
+    count = IntField(required=True)
+    timestamps = ListField(LongField())  # epoch em milissegundos (UTC)
+    open_price = ListField(FloatField())
+    close_price = ListField(FloatField())
+    high = ListField(FloatField())
+    low = ListField(FloatField())
+    volume = ListField(FloatField())
+
+    meta = {
+        'indexes': [
+            {'fields': ['asset', 'interval', 'bucket_start'], 'unique': True},
+        ]
+    }
+
 class ForecastInterval(EmbeddedDocument):
     start_date = DateTimeField(required=True)
     end_date = DateTimeField(required=True)
     interval = StringField(required=True, choices=['1m', '5m', '15m', '30m', '1h', '90m', '1d'])
 
+class ForecastData(EmbeddedDocument):
+    # Um ponto da previsão, nas colunas do forecast do Prophet
+    date = DateTimeField(required=True)
+    yhat = FloatField(required=True)
+    yhat_lower = FloatField()
+    yhat_upper = FloatField()
+
 class Forecast(Document):
     asset = ReferenceField('Asset', required=True)
     model = ReferenceField('Model', required=True)
@@ -33,7 +61,7 @@ class Forecast(Document):
     forecast_data = EmbeddedDocumentListField('ForecastData')
 
 class Model(Document):
-    model_type = StringField(required=True, choices=['Prophet', 'LSTM', 'ARIMA'])
+    model_type = StringField(required=True, choices=['Prophet', 'LSTM', 'ARIMA', 'ETS', 'Linear'])
     parameters = DictField()  # Para armazenar parâmetros de forma estruturada
     training_date = DateTimeField(required=True)
     performance_metrics = DictField()  # Armazenar métricas como dicionário
@@ -1,19 +1,10 @@
-import logging
-
-import pandas as pd
-from pandas.tseries.frequencies import to_offset
+from src.data.models.dataset_metadata import DatasetMetadata
 
 
 class DataGranularityChecker:
     @staticmethod
     def is_intraday(data):
+        # Usa a frequência registrada no preparo dos dados (moda dos intervalos, que tolera lacunas)
         if not data.empty and 'ds' in data and not data['ds'].isnull().all():
-            try:
-                inferred_freq = pd.infer_freq(data['ds'])
-                if not inferred_freq:
-                    return False
-                return to_offset(inferred_freq) < to_offset('D')
-            except ValueError as e:
-                logging.warning(f"Error inferring data frequency: {e}")
-                return False
+            return DatasetMetadata.of(data).is_intraday
         return False
@@ -1,29 +1,29 @@
 import logging
 
+import numpy as np
 import pandas as pd
-from src.optimization.data_granularity_checker import DataGranularityChecker
+from src.data.models.dataset_metadata import DatasetMetadata
 
 
 class DataPreparation:
     @staticmethod
     def calculate_adaptive_parameters(data, future_periods, is_intraday):
         """Calcula parâmetros adaptativos para cross_validation do Prophet."""
-        total_days = (data["ds"].max() - data["ds"].min()).days
-        inferred_freq = pd.infer_freq(data["ds"])
-
-        # Heurística para definir o período ideal
-        period_map = {
-            "T": pd.to_timedelta("1 days"),    # Minuto
-            "H": pd.to_timedelta("1 days"),    # Hora
-            "D": pd.to_timedelta("30 days"),   # Dia
-            "W": pd.to_timedelta("90 days"),   # Semana
-            "M": pd.to_timedelta("365 days"),  # Mês
-        }
+        metadata = DatasetMetadata.of(data)
+        total_days = metadata.total_days
+        frequency = metadata.frequency
+
+        # Heurística para definir o período ideal: (frequência máxima das barras, período)
+        period_map = [
+            (pd.to_timedelta("1 days"), pd.to_timedelta("30 days")),    # Dia
+            (pd.to_timedelta("7 days"), pd.to_timedelta("90 days")),    # Semana
+            (pd.to_timedelta("31 days"), pd.to_timedelta("365 days")),  # Mês
+        ]
 
         if is_intraday:
             period = pd.to_timedelta("1 days")  # Força o período para 1 dia para dados intraday
-        elif inferred_freq is not None and inferred_freq[0] in period_map:
-            period = period_map[inferred_freq[0]]
+        elif frequency is not None and frequency <= period_map[-1][0]:
+            period = next(period for max_frequency, period in period_map if frequency <= max_frequency)
         else:
             period = pd.to_timedelta(max(1, total_days // 20), unit='D')  # Estima o período com base no total de dias
 
@@ -39,3 +39,29 @@ class DataPreparation:
 
         logging.info(f"Parâmetros adaptativos calculados: initial={initial}, period={period}, horizon={horizon}")
         return initial, period, horizon
+
+    @staticmethod
+    def calculate_cutoffs(data, future_periods, is_intraday, max_cutoffs=48):
+        """
+        Cutoffs em ordem cronológica para cross_validation do Prophet (janelas de treino expansivas), um a
+        cada `period`, do fim do histórico mínimo de treino até o último ponto que ainda deixa um horizonte
+        completo. Compartilhados pela otimização e pela validação final. Retorna (initial, period, horizon, cutoffs).
+        """
+        initial, period, horizon = DataPreparation.calculate_adaptive_parameters(data, future_periods, is_intraday)
+        metadata = DatasetMetadata.of(data)
+        start_date, end_date = metadata.start, metadata.end - horizon
+        min_history = max(period * 3, pd.to_timedelta(30, unit='D'))
+
+        first_cutoff = start_date + min_history
+        if first_cutoff > end_date:
+            # Histórico curto: aceita menos treino para ter ao menos um cutoff
+            first_cutoff = start_date + period
+        cutoffs = list(pd.date_range(start=first_cutoff, end=end_date, freq=period))
+
+        if len(cutoffs) > max_cutoffs:
+            # Mantém o cutoff mais recente e espaça os demais uniformemente
+            positions = np.linspace(0, len(cutoffs) - 1, max_cutoffs).round().astype(int)
+            cutoffs = [cutoffs[i] for i in positions]
+
+        logging.info(f"{len(cutoffs)} cutoffs de validação cruzada entre {cutoffs[0] if cutoffs else None} e {cutoffs[-1] if cutoffs else None}")
+        return initial, period, horizon, cutoffs
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+METRICS = ['mse', 'rmse', 'mae', 'mape', 'mdape', 'smape', 'coverage']
+
+
+def _sorted_arrays(df):
+    """Arrays do resultado do cross_validation ordenados pelo horizonte (ds - cutoff), em ns."""
+    horizon = (pd.to_datetime(df['ds']) - pd.to_datetime(df['cutoff'])).to_numpy().astype('timedelta64[ns]')
+    # Mesma ordenação do sort_values do Prophet (inclusive entre empates, que afetam a mediana)
+    order = np.argsort(horizon, kind='quicksort')
+    arrays = {'horizon': horizon[order].astype(np.int64)}
+    for column in ('y', 'yhat', 'yhat_lower', 'yhat_upper'):
+        if column in df.columns:
+            arrays[column] = df[column].to_numpy(dtype=float)[order]
+    return arrays
+
+
+def _pointwise(metric, arrays):
+    y, yhat = arrays['y'], arrays['yhat']
+    if metric in ('mse', 'rmse'):
+        return (y - yhat) ** 2
+    if metric == 'mae':
+        return np.abs(y - yhat)
+    if metric in ('mape', 'mdape'):
+        return np.abs((y - yhat) / y)
+    if metric == 'smape':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sape = np.abs(yhat - y) / ((np.abs(y) + np.abs(yhat)) / 2)
+        return np.nan_to_num(sape, nan=0.0)
+    if metric == 'coverage':
+        return ((y >= arrays['yhat_lower']) & (y <= arrays['yhat_upper'])).astype(float)
+    raise ValueError(f"Métrica desconhecida: {metric}")
+
+
+def _horizon_groups(h):
+    """Horizontes distintos, posição inicial de cada grupo no array ordenado e tamanho dos grupos."""
+    hs, starts, counts = np.unique(h, return_index=True, return_counts=True)
+    return hs, starts, counts
+
+
+def rolling_mean_by_h(x, h, w):
+    """
+    Equivalente vetorizado de prophet.diagnostics.rolling_mean_by_h para `x` ordenado por `h`: para cada
+    horizonte, a média dos últimos `w` pontos até ele (todos os pontos do próprio horizonte e, do grupo mais
+    antigo incluído, apenas a fração necessária, ponderada pela média do grupo).
+    """
+    hs, starts, counts = _horizon_groups(h)
+    sums = np.add.reduceat(x, starts)
+    count_prefix = np.concatenate([[0], np.cumsum(counts)])
+    sum_prefix = np.concatenate([[0.0], np.cumsum(sums)])
+
+    # Para o grupo final k, o grupo inicial i é o mais recente que ainda completa w pontos
+    ends = np.arange(1, len(hs) + 1)
+    targets = count_prefix[ends] - w
+    valid = targets >= 0
+    first = np.searchsorted(count_prefix, targets[valid], side='right') - 1
+    ends = ends[valid]
+
+    excess = count_prefix[ends] - count_prefix[first] - w
+    values = (sum_prefix[ends] - sum_prefix[first] - excess * sums[first] / counts[first]) / w
+    return hs[valid], values
+
+
+def rolling_median_by_h(x, h, w):
+    """
+    Equivalente vetorizado de prophet.diagnostics.rolling_median_by_h: para cada horizonte, a mediana de
+    todos os seus pontos completada com os pontos imediatamente anteriores até somar `w`.
+    """
+    hs, starts, counts = _horizon_groups(h)
+    ends = starts + counts
+    lows = starts - np.maximum(w - counts, 0)
+
+    # Como no Prophet, a partir do primeiro horizonte (da direita para a esquerda) sem pontos suficientes, nenhum é calculado
+    invalid = np.flatnonzero(lows < 0)
+    first_valid = invalid[-1] + 1 if len(invalid) else 0
+
+    values = np.empty(len(hs) - first_valid)
+    exact = counts[first_valid:] <= w
+    if exact.any():
+        windows = np.lib.stride_tricks.sliding_window_view(x, w)
+        values[exact] = np.median(windows[ends[first_valid:][exact] - w], axis=1)
+    for k in np.flatnonzero(~exact) + first_valid:
+        values[k - first_valid] = np.median(x[starts[k]:ends[k]])
+    return hs[first_valid:], values
+
+
+def _window_size(n, rolling_window):
+    w = int(rolling_window * n)
+    if w >= 0:
+        w = max(w, 1)
+        w = min(w, n)
+    return w
+
+
+def _metric_by_h(metric, arrays, w):
+    x = _pointwise(metric, arrays)
+    if w < 0:
+        values = x
+        hs = arrays['horizon']
+    elif metric == 'mdape':
+        hs, values = rolling_median_by_h(x, arrays['horizon'], w)
+    else:
+        hs, values = rolling_mean_by_h(x, arrays['horizon'], w)
+    if metric == 'rmse':
+        values = np.sqrt(values)
+    return hs, values
+
+
+def performance_metrics(df, metrics=None, rolling_window=0.1):
+    """
+    Substituto NumPy de prophet.diagnostics.performance_metrics (sem a opção `monthly`), com os mesmos
+    valores a menos de arredondamento: uma única ordenação pelo horizonte e somas acumuladas por grupo,
+    sem groupby por métrica. Retorna um DataFrame com 'horizon' e uma coluna por métrica, ou None se `df` for vazio.
+    """
+    metrics = list(METRICS if metrics is None else metrics)
+    if len(df) == 0:
+        return None
+    arrays = _sorted_arrays(df)
+    if 'mape' in metrics and np.abs(arrays['y']).min() < 1e-8:
+        # Como no Prophet, MAPE é omitido quando há valores reais nulos
+        metrics.remove('mape')
+    if 'coverage' in metrics and 'yhat_lower' not in arrays:
+        metrics.remove('coverage')
+    if not metrics:
+        return None
+
+    w = _window_size(len(df), rolling_window)
+    result = {}
+    for metric in metrics:
+        hs, result[metric] = _metric_by_h(metric, arrays, w)
+    return pd.DataFrame({'horizon': pd.to_timedelta(hs, unit='ns'), **result})
+
+
+def mean_metric(df, metric='mape', rolling_window=0.1):
+    """
+    Modo escalar para a otimização: a média, sobre os horizontes, de uma única métrica por horizonte
+    (o mesmo que performance_metrics(df)[metric].mean(), sem montar o DataFrame).
+    """
+    arrays = _sorted_arrays(df)
+    if len(arrays['y']) == 0:
+        raise ValueError("Resultado de validação cruzada vazio.")
+    if metric == 'mape' and np.abs(arrays['y']).min() < 1e-8:
+        raise ValueError("MAPE indefinido: a série contém valores nulos.")
+    _, values = _metric_by_h(metric, arrays, _window_size(len(arrays['y']), rolling_window))
+    return float(np.mean(values))
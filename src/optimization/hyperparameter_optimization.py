@@ -1,17 +1,53 @@
+import hashlib
 import logging
+import os
 from abc import ABC, abstractmethod
 
 import config
-import dask.dataframe as dd
 import numpy as np
 import optuna
 import pandas as pd
-from dask.distributed import Client, TimeoutError
-from optuna.pruners import MedianPruner
+from dask.distributed import Client, TimeoutError, get_client, get_worker
+from optuna.pruners import HyperbandPruner, MedianPruner
+from optuna.storages import JournalFileStorage, JournalStorage
 from prophet import Prophet
-from prophet.diagnostics import cross_validation, performance_metrics
+from prophet.diagnostics import cross_validation
+from src.data.accesss.prophet_model_cache import ProphetModelCache
 from src.optimization.data_granularity_checker import DataGranularityChecker
 from src.optimization.data_preparation import DataPreparation
+from src.optimization.forecast_metrics import mean_metric
+from src.optimization.prophet_feature_cache import CachedFeatureProphet
+from src.utils.file_manager import FileManager
+
+
+def cross_validation_parallel():
+    """
+    Modo de paralelismo do cross_validation do Prophet: "dask" quando há um Client ativo, em série dentro
+    de um worker Dask (processo daemon, que não pode abrir outro pool) e "processes" sem cluster.
+    """
+    try:
+        get_worker()
+        return None
+    except ValueError:
+        pass
+    try:
+        get_client()
+        return "dask"
+    except ValueError:
+        return "processes"
+
+
+def _run_study_batch(storage_path, study_name, model_params, data, cutoff_rungs, horizon, is_intraday, cv_signature, n_trials):
+    # Executado nos workers Dask: retoma o estudo a partir do armazenamento compartilhado e adiciona trials
+    optimization = OptunaOptimization(model_params)
+    optimization.bind_feature_cache(data)
+    study = optuna.load_study(
+        study_name=study_name, storage=optimization._storage(storage_path), pruner=optimization._create_pruner(len(cutoff_rungs))
+    )
+    study.optimize(
+        lambda trial: optimization.objective(trial, data, cutoff_rungs, horizon, is_intraday, cv_signature), n_trials=n_trials
+    )
+    return n_trials
 
 
 class HyperparameterOptimization(ABC):
@@ -21,8 +57,74 @@ class HyperparameterOptimization(ABC):
 
 
 class OptunaOptimization(HyperparameterOptimization):
-    def __init__(self, model_params=None):
+    def __init__(self, model_params=None, ticker=None, client=None, storage_dir=config.OPTUNA_STORAGE_DIR, cv_dir=config.CV_RESULTS_DIR):
+        """
+        Com `ticker`, o estudo é persistido em `storage_dir` com um nome por ticker/intervalo: cada execução
+        acrescenta trials aos anteriores, começando pelos melhores parâmetros já encontrados. Com `client`,
+        os trials são distribuídos entre os workers Dask; sem ele, rodam em `config.N_JOBS` threads.
+        A validação cruzada de cada trial completo é gravada em `cv_dir`; a do melhor trial fica disponível em
+        `best_cross_validation` para ser reaproveitada pela análise final.
+        """
         self.model_params = model_params or {}
+        self.ticker = ticker
+        self.client = client
+        self.storage_dir = storage_dir
+        self.cv_dir = cv_dir
+        self.best_cross_validation = None
+
+    @staticmethod
+    def _storage(path):
+        return JournalStorage(JournalFileStorage(path))
+
+    def _create_pruner(self, n_steps):
+        """
+        'median' poda trials cujo MAPE médio parcial fica acima da mediana dos anteriores no mesmo rung;
+        'hyperband' usa o número de rungs avaliados como recurso (multi-fidelidade: os rungs seguem a ordem
+        cronológica, então os primeiros têm históricos de treino mais curtos e ajustes mais baratos).
+        """
+        if config.OPTUNA_PRUNER == 'hyperband':
+            return HyperbandPruner(min_resource=1, max_resource=n_steps, reduction_factor=3)
+        return MedianPruner()
+
+    def _study_name(self):
+        return f"prophet_{FileManager.normalize_ticker_name(self.ticker)}_{config.DEFAULT_INTERVAL}"
+
+    def _create_study(self, n_steps):
+        if self.ticker is None:
+            return optuna.create_study(direction='minimize', pruner=self._create_pruner(n_steps)), None
+
+        FileManager.ensure_directory_exists(self.storage_dir)
+        storage_path = os.path.join(self.storage_dir, f"{self._study_name()}.log")
+        study = optuna.create_study(
+            study_name=self._study_name(), storage=self._storage(storage_path), direction='minimize',
+            pruner=self._create_pruner(n_steps), load_if_exists=True
+        )
+        completed = study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+        if completed:
+            # Reavalia o melhor ponto anterior com os dados atuais antes de explorar novos; os trials de execuções
+            # anteriores foram avaliados sobre outros dados e não concorrem ao melhor trial (ver _best_trial)
+            logging.info(f"Resuming study {study.study_name} with {len(completed)} completed trials")
+            study.enqueue_trial(study.best_params, skip_if_exists=False)
+        return study, storage_path
+
+    def _run_trials(self, study, storage_path, data, cutoff_rungs, horizon, is_intraday, cv_signature, n_trials):
+        if self.client is None or storage_path is None:
+            study.optimize(
+                lambda trial: self.objective(trial, data, cutoff_rungs, horizon, is_intraday, cv_signature),
+                n_trials=n_trials, n_jobs=config.N_JOBS
+            )
+            return
+
+        n_workers = max(len(self.client.scheduler_info().get('workers', {})), 1)
+        batches = [n_trials // n_workers + (1 if i < n_trials % n_workers else 0) for i in range(n_workers)]
+        futures = [
+            self.client.submit(
+                _run_study_batch, storage_path, study.study_name, self.model_params, data, cutoff_rungs, horizon, is_intraday,
+                cv_signature, batch, pure=False
+            )
+            for batch in batches if batch
+        ]
+        self.client.gather(futures)
 
     def _adjust_hyperparameters(self, trial, is_intraday):
         """Defines the search space for Prophet model hyperparameters."""
@@ -37,73 +139,131 @@ class OptunaOptimization(HyperparameterOptimization):
 
     def _create_model(self, params, is_intraday):
         """Creates a Prophet model with the given hyperparameters."""
-        model = Prophet(**params)
+        model_class = CachedFeatureProphet if config.USE_PROPHET_FEATURE_CACHE else Prophet
+        model = model_class(**params)
         model.add_seasonality(name='monthly', period=30.5, fourier_order=7)
         model.add_seasonality(name='hourly' if is_intraday else 'yearly', period=24 if is_intraday else 365.25, fourier_order=8 if is_intraday else 10)
         model.add_country_holidays(country_name=config.COUNTRY_NAME)
         return model
 
-    def _evaluate_model(self, model, data, initial, period, horizon):
-        """Evaluates the model using cross-validation and returns the mean MAPE."""
+    def _evaluate_model(self, model, horizon, cutoffs):
+        """Runs cross-validation of the fitted model on the given cutoffs and returns the mean MAPE and df_cv."""
         try:
-            start_date = pd.to_datetime(data['ds'].min())
-            end_date = pd.to_datetime(data['ds'].max()) - horizon
-
-            # Verificação do número de pontos de dados
-            min_data_points = 3 * (horizon.days)
-            if len(data) < min_data_points:
-                logging.warning(f"Insufficient data points ({len(data)}) for cross-validation. Skipping model evaluation.")
-                return float('inf')
-
-            # Ajuste dinâmico da frequência
-            period_timedelta = period
-            max_cutoffs = (end_date - start_date) // period_timedelta
-            while max_cutoffs < 2:
-                period_timedelta *= 2
-                max_cutoffs = (end_date - start_date) // period_timedelta
-                logging.warning(f"Increasing period for cross-validation to {period_timedelta}.")
-
-            cutoffs = pd.date_range(start=start_date + period_timedelta, end=end_date, freq=period_timedelta).to_pydatetime().tolist()
-
-            if len(cutoffs) > 48:
-                cutoffs = cutoffs[::len(cutoffs) // 48]
-
-            df_cv = cross_validation(model, initial=initial, period=period, horizon=horizon, cutoffs=cutoffs, parallel="processes")
-            df_p = performance_metrics(df_cv)
-            return df_p['mape'].mean()
+            df_cv = cross_validation(model, horizon=horizon, cutoffs=list(cutoffs), parallel=cross_validation_parallel())
+            return mean_metric(df_cv, 'mape'), df_cv
         except (TimeoutError, Exception) as e:
             logging.error(f"Error evaluating the model: {e}")
-            return float('inf')
+            return float('inf'), None
+
+    @staticmethod
+    def bind_feature_cache(data):
+        """Associa o cache de features do Prophet deste processo aos dados (descarta as features de outro conjunto)."""
+        if config.USE_PROPHET_FEATURE_CACHE:
+            CachedFeatureProphet.feature_cache.bind(ProphetModelCache.data_key(data))
+
+    @staticmethod
+    def cv_signature(data, horizon, cutoffs):
+        """Identifica uma validação cruzada pelos dados, horizonte e cutoffs, para saber quando ela pode ser reaproveitada."""
+        description = f"{ProphetModelCache.data_key(data)}|{horizon}|{','.join(str(cutoff) for cutoff in cutoffs)}"
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def _save_cross_validation(self, trial, df_cv, cv_signature):
+        FileManager.ensure_directory_exists(self.cv_dir)
+        path = os.path.join(self.cv_dir, f"{cv_signature[:16]}_{trial.number}.parquet")
+        try:
+            df_cv.to_parquet(path, index=False)
+            trial.set_user_attr('cv_path', path)
+        except Exception as e:
+            logging.warning(f"Could not store cross-validation of trial {trial.number}: {e}")
+
+    @staticmethod
+    def _best_trial(study, cv_signature):
+        """Melhor trial completo avaliado com a validação cruzada atual (mesmos dados, horizonte e cutoffs)."""
+        completed = [
+            trial for trial in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+            if trial.user_attrs.get('cv_signature') == cv_signature and trial.value is not None
+        ]
+        return min(completed, key=lambda trial: trial.value) if completed else None
 
-    def objective(self, trial, data_splits, future_periods):
-        """Objective function for Optuna optimization."""
-        is_intraday = DataGranularityChecker.is_intraday(data_splits[0])
+    def _collect_best_cross_validation(self, study, best_trial, cv_signature):
+        """Carrega a validação cruzada do melhor trial (se foi feita sobre os dados atuais) e apaga as demais."""
+        for trial in study.get_trials(deepcopy=False):
+            path = trial.user_attrs.get('cv_path')
+            if trial.number != best_trial.number and path and os.path.isfile(path):
+                os.remove(path)
+
+        path = best_trial.user_attrs.get('cv_path')
+        if best_trial.user_attrs.get('cv_signature') != cv_signature or not path or not os.path.isfile(path):
+            return None
+        return {'params': best_trial.params, 'signature': cv_signature, 'df_cv': pd.read_parquet(path), 'mape': best_trial.value}
+
+    def objective(self, trial, data, cutoff_rungs, horizon, is_intraday, cv_signature=None):
+        """
+        Objective function for Optuna optimization. The model is fitted once on the full history and then
+        cross-validated rung by rung (groups of time-ordered cutoffs), reporting the running mean MAPE.
+        """
         hyperparameters = self._adjust_hyperparameters(trial, is_intraday)
-        results = []
+        if cv_signature:
+            trial.set_user_attr('cv_signature', cv_signature)
+        try:
+            # cross_validation usa o modelo ajustado apenas como molde e reajusta uma cópia por cutoff
+            model = self._create_model(hyperparameters, is_intraday)
+            model.fit(data)
+        except Exception as e:
+            logging.error(f"Error during objective evaluation: {e}")
+            return float('inf')
 
-        for i, data_split in enumerate(data_splits):
-            try:
-                model = self._create_model(hyperparameters, is_intraday)
-                model.fit(data_split)
-                initial, period, horizon = DataPreparation.calculate_adaptive_parameters(data_split, future_periods, is_intraday)
-                mape = self._evaluate_model(model, data_split, initial, period, horizon)
-                results.append(mape)
-            except Exception as e:
-                logging.error(f"Error during objective evaluation: {e}")
-                results.append(float('inf'))
+        results, frames = [], []
+        for i, cutoffs in enumerate(cutoff_rungs):
+            mape, df_cv = self._evaluate_model(model, horizon, cutoffs)
+            results.append(mape)
+            if df_cv is not None:
+                frames.append(df_cv)
+            logging.info(f"Trial {trial.number}: Completed {i + 1}/{len(cutoff_rungs)} cutoff rungs with MAPE={results[-1]:.4f}")
 
-            logging.info(f"Trial {trial.number}: Completed {i + 1}/{len(data_splits)} data splits with MAPE={results[-1]:.4f}")
+            # Reporta o MAPE médio parcial; trials claramente piores que os anteriores param aqui
+            trial.report(float(np.mean(results)), step=i)
+            if trial.should_prune():
+                logging.info(f"Trial {trial.number} pruned after {i + 1}/{len(cutoff_rungs)} cutoff rungs")
+                raise optuna.TrialPruned()
 
+        if cv_signature and len(frames) == len(cutoff_rungs):
+            self._save_cross_validation(trial, pd.concat(frames, ignore_index=True), cv_signature)
         return np.mean(results)
 
+    @staticmethod
+    def _cutoff_rungs(cutoffs, n_splits):
+        """Divide os cutoffs, em ordem cronológica, em até `n_splits` grupos contíguos."""
+        bounds = np.linspace(0, len(cutoffs), min(n_splits, len(cutoffs)) + 1).round().astype(int)
+        return [cutoffs[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
     def optimize(self, data, future_periods, n_splits=5):
-        """Optimizes Prophet model hyperparameters using Optuna, cross-validation, and Dask."""
+        """
+        Optimizes Prophet model hyperparameters using Optuna and time-ordered, expanding-window
+        cross-validation whose cutoffs are shared by every trial, grouped into `n_splits` rungs.
+        """
         if not isinstance(data, pd.DataFrame) or 'ds' not in data.columns or 'y' not in data.columns:
             raise ValueError("Data must be a pandas DataFrame with 'ds' and 'y' columns.")
-        logging.info("Starting hyperparameter optimization with %d-fold cross-validation...", n_splits)
-        ddata = dd.from_pandas(data, npartitions=config.N_JOBS)
-        data_splits = [split.compute() for split in ddata.random_split([1 / n_splits] * n_splits)]
-        study = optuna.create_study(direction='minimize', pruner=MedianPruner())
-        study.optimize(lambda trial: self.objective(trial, data_splits, future_periods), n_trials=config.N_TRIALS, n_jobs=1)
-        logging.info(f"Hyperparameter optimization complete. Best parameters: {study.best_trial.params}")
-        return study.best_params
+        is_intraday = DataGranularityChecker.is_intraday(data)
+        _, _, horizon, cutoffs = DataPreparation.calculate_cutoffs(data, future_periods, is_intraday)
+        if not cutoffs:
+            logging.warning("Insufficient data for cross-validation. Using default Prophet hyperparameters.")
+            return {}
+
+        cutoff_rungs = self._cutoff_rungs(cutoffs, n_splits)
+        self.bind_feature_cache(data)
+        cv_signature = self.cv_signature(data, horizon, cutoffs)
+        logging.info("Starting hyperparameter optimization with %d cutoffs in %d rungs...", len(cutoffs), len(cutoff_rungs))
+        study, storage_path = self._create_study(len(cutoff_rungs))
+        self._run_trials(study, storage_path, data, cutoff_rungs, horizon, is_intraday, cv_signature, config.N_TRIALS)
+        if storage_path is not None:
+            # Recarrega para incluir os trials executados nos workers
+            study = optuna.load_study(study_name=study.study_name, storage=self._storage(storage_path))
+        best_trial = self._best_trial(study, cv_signature)
+        if best_trial is None:
+            logging.warning("No trial completed on the current data. Using default Prophet hyperparameters.")
+            self.best_cross_validation = None
+            return {}
+        logging.info(f"Hyperparameter optimization complete. Best parameters: {best_trial.params}")
+        self.best_cross_validation = self._collect_best_cross_validation(study, best_trial, cv_signature)
+        return best_trial.params
@@ -0,0 +1,114 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import config
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+
+class ProphetFeatureCache:
+    """
+    Cache em memória (por processo) das matrizes de features do Prophet: termos de Fourier das
+    sazonalidades, tabela de feriados do país e dummies de feriados. As chaves incluem um hash das datas,
+    então o mesmo `ds` gera as mesmas features em todos os trials e cutoffs da otimização. Seguro para
+    uso entre threads (trials com n_jobs) e limitado a `max_bytes`, removendo as entradas menos usadas.
+    """
+
+    def __init__(self, max_bytes=config.PROPHET_FEATURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.dataset_key = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def dates_key(dates):
+        timestamps = np.ascontiguousarray(pd.Series(dates).to_numpy(dtype='datetime64[ns]').view(np.int64))
+        return hashlib.blake2b(timestamps.tobytes(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _size(value):
+        frame = value[0] if isinstance(value, tuple) else value
+        return int(frame.memory_usage(index=False).sum()) if isinstance(frame, pd.DataFrame) else 0
+
+    def bind(self, dataset_key):
+        """Associa o cache a um conjunto de dados; ao mudar o hash dos dados, as entradas anteriores são descartadas."""
+        with self.lock:
+            if dataset_key != self.dataset_key:
+                self.entries.clear()
+                self.nbytes = 0
+                self.dataset_key = dataset_key
+
+    def get_or_build(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+
+        # Construído fora do lock: duas threads podem calcular a mesma entrada, com o mesmo resultado
+        value = build()
+        size = self._size(value)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = (value, size)
+                self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.nbytes -= evicted_size
+        return value
+
+
+class CachedFeatureProphet(Prophet):
+    """
+    Prophet que obtém as features de sazonalidade e de feriados do ProphetFeatureCache compartilhado.
+    Como o cross_validation copia o modelo com `m.__class__`, as cópias ajustadas em cada cutoff também
+    usam o cache. Os resultados são idênticos aos do Prophet.
+    """
+
+    feature_cache = ProphetFeatureCache()
+
+    @classmethod
+    def make_seasonality_features(cls, dates, period, series_order, prefix):
+        key = ('seasonality', cls.feature_cache.dates_key(dates), period, series_order, prefix)
+        features = cls.feature_cache.get_or_build(
+            key, lambda: super(CachedFeatureProphet, cls).make_seasonality_features(dates, period, series_order, prefix)
+        )
+        # make_all_seasonality_features zera linhas das sazonalidades condicionais na própria matriz
+        return features.copy()
+
+    def construct_holiday_dataframe(self, dates):
+        years = tuple(sorted(pd.DatetimeIndex(dates).year.unique()))
+        holidays_key = None if self.holidays is None else hashlib.blake2b(
+            pd.util.hash_pandas_object(self.holidays, index=False).to_numpy().tobytes(), digest_size=16
+        ).hexdigest()
+        train_names = None if self.train_holiday_names is None else tuple(self.train_holiday_names)
+        key = ('holidays', self.country_holidays, years, holidays_key, train_names)
+        holidays = self.feature_cache.get_or_build(
+            key, lambda: super(CachedFeatureProphet, self).construct_holiday_dataframe(dates)
+        ).copy()
+        holidays.attrs['feature_cache_key'] = key
+        return holidays
+
+    def make_holiday_features(self, dates, holidays):
+        holidays_key = holidays.attrs.get('feature_cache_key')
+        if holidays_key is None or 'prior_scale' in holidays.columns:
+            return super().make_holiday_features(dates, holidays)
+
+        # As dummies não dependem do holidays_prior_scale (hiperparâmetro dos trials); só as prioris, refeitas abaixo
+        key = ('holiday_features', self.feature_cache.dates_key(dates), holidays_key)
+        features, holiday_names = self.feature_cache.get_or_build(
+            key, lambda: self._holiday_features_and_names(dates, holidays)
+        )
+        if self.train_holiday_names is None:
+            self.train_holiday_names = pd.Series(holiday_names)
+        prior_scale_list = [float(self.holidays_prior_scale)] * features.shape[1]
+        return features, prior_scale_list, list(holiday_names)
+
+    def _holiday_features_and_names(self, dates, holidays):
+        # Chama a implementação original sem alterar train_holiday_names deste modelo
+        train_holiday_names = self.train_holiday_names
+        features, _, holiday_names = super().make_holiday_features(dates, holidays)
+        self.train_holiday_names = train_holiday_names
+        return features, holiday_names
@@ -39,6 +39,7 @@ class Plotter:
             "candlestick_RSI": os.path.join(base_path, f"candlestick_RSI_{self.last_days}_days_{self.ticker}.png") if self.last_days else os.path.join(base_path, f"candlestick_RSI_{self.ticker}.png"),
             "volatility": os.path.join(base_path, f"volatility_{self.ticker}.png"),
             "metric": os.path.join(base_path, f"metric_{self.ticker}.png"),
+            "walk_forward": os.path.join(base_path, f"walk_forward_{self.ticker}.png"),
         }
         return filenames
 
@@ -127,22 +128,46 @@ class Plotter:
         plt.close(fig)
         return self.filenames["HiLo_Strategy"]
 
-    def plot_correlation(self, prices, title='Stock Correlation Matrix'):
+    def plot_walk_forward(self, series, ticker):
+        fig, (ax_equity, ax_drawdown) = plt.subplots(2, 1, figsize=(14, 8), sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+        buy_and_hold = series['Close'] / series['Close'].iloc[0]
+        ax_equity.plot(series.index, series['Equity'], label='Estratégia (fora da amostra)', color='blue')
+        ax_equity.plot(series.index, buy_and_hold, label='Buy and Hold', color='gray', linestyle='--')
+        ax_equity.set_title(f"Walk-Forward HiLo Activator - {ticker}")
+        ax_equity.set_ylabel('Patrimônio')
+        ax_equity.legend()
+
+        ax_drawdown.fill_between(series.index, series['Drawdown'] * 100, 0, color='red', alpha=0.4)
+        ax_drawdown.set_ylabel('Drawdown (%)')
+        ax_drawdown.set_xlabel('Date')
+
+        fig.savefig(os.path.join(self.image_path, self.filenames["walk_forward"]), dpi=300)
+        plt.close(fig)
+        return self.filenames["walk_forward"]
+
+    def plot_correlation(self, prices=None, title='Stock Correlation Matrix', correlation=None, filename=None):
         """
         Plota a matriz de correlação dos retornos dos ativos.
 
         :param prices: DataFrame com os preços de fechamento ajustados dos ativos.
         :param title: Título do gráfico.
+        :param correlation: Matriz de correlação já calculada (ex: por CorrelationAnalysis); dispensa `prices`.
+        :param filename: Caminho do arquivo gerado (por padrão, o da matriz de correlação do ticker).
         """
-        correlation = prices.pct_change().corr()
-
-        fig, ax = plt.subplots(figsize=(10, 8))
-        sns.heatmap(correlation, annot=True, ax=ax, cmap='coolwarm', fmt=".2f")
+        if correlation is None:
+            correlation = prices.pct_change().corr()
+
+        # Com muitos ativos os valores nas células ficam ilegíveis
+        annotate = len(correlation) <= 15
+        size = min(max(10, len(correlation) * 0.25), 40)
+        fig, ax = plt.subplots(figsize=(size, size * 0.8))
+        sns.heatmap(correlation, annot=annotate, ax=ax, cmap='coolwarm', fmt=".2f", vmin=-1, vmax=1)
         ax.set_title(title)
 
-        fig.savefig(os.path.join(self.image_path, self.filenames["correlation_matrix"]))
+        filename = filename or os.path.join(self.image_path, self.filenames["correlation_matrix"])
+        fig.savefig(filename)
         plt.close(fig)
-        return self.filenames["correlation_matrix"]
+        return filename
 
     def plot_with_indicators(self, data, last_days=60):
         ohlc_data = data[-last_days:].copy()
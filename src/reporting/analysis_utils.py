@@ -1,11 +1,15 @@
 import logging
 import os
 
+import config
 import pandas as pd
+from src.analysis.correlation_analysis import CorrelationAnalysis
 from src.analysis.indicator_calculator import IndicatorCalculator
+from src.analysis.linear_forecast import LinearForecastAnalysis
 from src.analysis.prophet_analysis import ProphetAnalysis
 from src.analysis.strategy_evaluator import StrategyEvaluator
 from src.analysis.volatility_analysis import VolatilityAnalysis
+from src.analysis.walk_forward import WalkForwardBacktester
 
 
 class AnalysisGenerator:
@@ -55,7 +59,23 @@ def generate_prophet_analysis(plotter, ticker, data, future_periods=15, client=N
         logging.error("Falha ao gerar análise do Prophet.")
         return None, None, []
 
-def generate_indicator_calculator(plotter, data, **kwargs):
+def generate_linear_forecast(plotter, ticker, data, future_periods=15, client=None, forecast=None):
+    logging.info(f"Generating {config.FORECAST_ENGINE} forecast")
+    if forecast is None:
+        forecast = LinearForecastAnalysis(
+            {ticker: data}, future_periods, engine=config.FORECAST_ENGINE, client=client
+        ).analyze().get(ticker)
+    if forecast is None:
+        logging.error("Falha ao gerar a previsão.")
+        return None, None, []
+
+    filenames = [plotter.plot_last_days_forecast(data, forecast['forecast'], future_periods, ticker, plotter.last_days)]
+    if forecast['df_cv'] is not None:
+        filenames.append(plotter.plot_cross_validation_metric(forecast['df_cv'], metric="rmse", title="RMSE Metric", ticker=ticker))
+    title = f'Previsão de Séries Temporais ({config.FORECAST_ENGINE.upper()})'
+    return title, title, filenames
+
+def generate_indicator_calculator(plotter, ticker, data, **kwargs):
     logging.info("Generating statistical analysis")
     if not isinstance(data, pd.DataFrame):
         logging.warning("'data' não é um DataFrame. Tentando converter...")
@@ -65,9 +85,13 @@ def generate_indicator_calculator(plotter, data, **kwargs):
             logging.error(f"Não foi possível converter 'data' para DataFrame: {e}")
             return None, None, []
 
-    data = IndicatorCalculator.calculate_RSI(data, period=14)
-    data = IndicatorCalculator.calculate_EMA(data, period=21)
-    data = IndicatorCalculator.calculate_HiLo(data, period=14)
+    if config.USE_INCREMENTAL_INDICATORS:
+        key = f"{ticker}_{config.DEFAULT_INTERVAL}"
+        data = IndicatorCalculator.calculate_incremental(data, key, rsi_period=14, ema_period=21, hilo_period=14)
+    else:
+        data = IndicatorCalculator.calculate_RSI(data, period=14)
+        data = IndicatorCalculator.calculate_EMA(data, period=21)
+        data = IndicatorCalculator.calculate_HiLo(data, period=14)
 
     description = "Analysis with RSI, EMA, and HiLo indicators."
     title = 'Análise Estatística'
@@ -91,7 +115,7 @@ def generate_strategy_evaluator(plotter, ticker, data, **kwargs):
 
     bounds = [(1, 100)]
     best_period, best_score = StrategyEvaluator.optimize_strategy(price_data, bounds)
-    hilo_long, hilo_short = StrategyEvaluator.hilo_activator(price_data['High'], price_data['Low'], int(best_period))
+    hilo_long, hilo_short = StrategyEvaluator.hilo_activator(price_data['High'], price_data['Low'], best_period)
 
     descriptions = f"Melhor período para HiLo Activator: {best_period} dias, Resultado da Estratégia: {best_score:.2f}"
     titles = 'Avaliação da Estratégia HiLo Activator'
@@ -99,18 +123,66 @@ def generate_strategy_evaluator(plotter, ticker, data, **kwargs):
 
     return titles, descriptions, filenames
 
-def generate_volatility_analysis(plotter, data, models=['GARCH', 'EGARCH', 'GJR-GARCH'], horizon=30):
+def generate_walk_forward(plotter, ticker, data, backtest=None):
+    logging.info("Generating walk-forward backtest")
+    if backtest is None:
+        backtest = WalkForwardBacktester(
+            data, train_size=config.WALK_FORWARD_TRAIN_BARS, test_size=config.WALK_FORWARD_TEST_BARS,
+            cost=config.TRANSACTION_COST, slippage=config.SLIPPAGE
+        ).analyze()
+    if backtest is None:
+        return None, None, []
+
+    summary = backtest['summary']
+    description = (
+        f"{summary['windows']} janelas de teste. Retorno fora da amostra: {summary['total_return']:.2%} "
+        f"(Buy and Hold: {summary['buy_and_hold']:.2%}), máximo drawdown: {summary['max_drawdown']:.2%}, "
+        f"Sharpe: {summary['sharpe']:.2f}, operações: {summary['trades']}."
+    )
+    title = 'Backtest Walk-Forward do HiLo Activator'
+    filenames = [plotter.plot_walk_forward(backtest['series'], ticker)]
+    return title, description, filenames
+
+def generate_volatility_analysis(plotter, ticker, data, models=['GARCH', 'EGARCH', 'GJR-GARCH'], horizon=30, client=None):
     logging.info("Generating volatility analysis")
-    volatility_analysis = VolatilityAnalysis(data['Retornos'])
-    future_volatility = volatility_analysis.analyze(models=models, horizon=horizon)
+    volatility_analysis = VolatilityAnalysis.from_frame(data, client=client, key=f"{ticker}_{config.DEFAULT_INTERVAL}")
+    analysis = volatility_analysis.analyze(models=models, horizon=horizon)
+    if analysis is None:
+        return None, None, []
 
     descriptions = []
     titles = []
     filenames = []
 
-    for model_name, vol in future_volatility.items():
-        descriptions.append(f"Modelo: {model_name}, Futura Volatilidade: {vol.iloc[-1].item():.2f}%")
+    criteria = analysis['criteria']
+    for model_name, vol in analysis['forecasts'].items():
+        descriptions.append(
+            f"Modelo: {model_name}, Futura Volatilidade: {vol.iloc[-1].item():.2f}%, "
+            f"AIC: {criteria.loc[model_name, 'aic']:.2f}, BIC: {criteria.loc[model_name, 'bic']:.2f}"
+        )
         titles.append(f'Análise de Volatilidade - {model_name}')
         filenames.append(plotter.plot_garch_volatility(vol, title=titles[-1]))
 
     return titles, descriptions, filenames
+
+def generate_correlation_analysis(plotter, datasets, window=60, halflife=30):
+    logging.info("Generating correlation analysis")
+    returns = CorrelationAnalysis.build_returns_panel(datasets)
+    analysis = CorrelationAnalysis(returns, window=window, halflife=halflife).analyze()
+    if analysis is None:
+        return None, None, []
+
+    last_date = analysis['timestamps'][-1]
+    average = analysis['average_correlation'].iloc[-1]
+    titles = [f'Correlação Móvel ({window} barras)', f'Correlação Exponencial (meia-vida de {halflife} barras)']
+    descriptions = [
+        f"Correlação média entre pares em {last_date}: {average['rolling']:.2f}",
+        f"Correlação média entre pares em {last_date}: {average['ewma']:.2f}",
+    ]
+    filenames = [
+        plotter.plot_correlation(correlation=analysis['latest']['rolling'], title=titles[0],
+                                 filename=os.path.join(plotter.image_path, f"correlation_rolling_{plotter.ticker}.png")),
+        plotter.plot_correlation(correlation=analysis['latest']['ewma'], title=titles[1],
+                                 filename=os.path.join(plotter.image_path, f"correlation_ewma_{plotter.ticker}.png")),
+    ]
+    return titles, descriptions, filenames
@@ -7,14 +7,16 @@ from src.reporting.pdf_report import PDFReportBuilder
 from src.utils.file_manager import FileManager
 
 from .analysis_utils import (AnalysisGenerator, generate_indicator_calculator,
+                             generate_linear_forecast,
                              generate_prophet_analysis,
                              generate_strategy_evaluator,
-                             generate_volatility_analysis)
+                             generate_volatility_analysis,
+                             generate_walk_forward)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class ReportGenerator:
-    def __init__(self, data, client, ticker, period=config.DEFAULT_PERIOD, last_days=config.DEFAULT_LAST_DAYS, future_periods=config.DEFAULT_FUTURE_PERIODS, report_path=config.REPORT_PATH):
+    def __init__(self, data, client, ticker, period=config.DEFAULT_PERIOD, last_days=config.DEFAULT_LAST_DAYS, future_periods=config.DEFAULT_FUTURE_PERIODS, report_path=config.REPORT_PATH, backtest=None, forecast=None):
         self.data = data
         self.ticker = FileManager.normalize_ticker_name(ticker)
         self.period = period
@@ -28,19 +30,30 @@ class ReportGenerator:
         FileManager.ensure_directory_exists(self.report_path)
         self.builder = PDFReportBuilder(report_file_path)
         self.client = client
+        self.backtest = backtest
+        self.forecast = forecast
 
     def generate_report(self):
         logging.info("Iniciando a geração do relatório")
-        analysis_functions = [
-            AnalysisGenerator(
+        if config.FORECAST_ENGINE == 'prophet':
+            forecast_generator = AnalysisGenerator(
                 generate_prophet_analysis,
                 ['plotter', 'ticker', 'data', 'future_periods', 'client'],
                 'Forecast de Séries Temporais',
                 "Forecast de Séries Temporais"
-            ),
+            )
+        else:
+            forecast_generator = AnalysisGenerator(
+                generate_linear_forecast,
+                ['plotter', 'ticker', 'data', 'future_periods', 'client', 'forecast'],
+                'Forecast de Séries Temporais',
+                "Forecast de Séries Temporais"
+            )
+        analysis_functions = [
+            forecast_generator,
             AnalysisGenerator(
                 generate_indicator_calculator,
-                ['plotter', 'data'],
+                ['plotter', 'ticker', 'data'],
                 'Análise Estatística',
                 "Análises com RSI, EMA, e HiLo indicators."
             ),
@@ -50,9 +63,15 @@ class ReportGenerator:
                 'Avaliação da Estratégia HiLo Activator',
                 "Avaliação da performance da estratégia HiLo Activator."
             ),
+            AnalysisGenerator(
+                generate_walk_forward,
+                ['plotter', 'ticker', 'data', 'backtest'],
+                'Backtest Walk-Forward',
+                "Backtest walk-forward do HiLo Activator com custos de transação."
+            ),
             AnalysisGenerator(
                 generate_volatility_analysis,
-                ['plotter', 'data'],
+                ['plotter', 'ticker', 'data', 'client'],
                 'Análise de Volatilidade',
                 "Análise da volatilidade dos retornos utilizando modelos GARCH."
             )
@@ -65,7 +84,9 @@ class ReportGenerator:
                 ticker=self.ticker,
                 data=self.data,
                 future_periods=self.future_periods,
-                client=self.client
+                client=self.client,
+                backtest=self.backtest,
+                forecast=self.forecast
             )
             if title and description and filenames:
                 titles.append(title)
@@ -0,0 +1,171 @@
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from src.analysis.online_indicators import (OnlineEMA, OnlineHiLoSignal,
+                                            OnlineRSI)
+
+
+class BarRingBuffer:
+    """
+    Buffer circular de tamanho fixo com as últimas barras (timestamp int64 em ns + OHLCV em float64).
+    """
+
+    FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.full((capacity, len(self.FIELDS)), np.nan)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def last_timestamp(self):
+        if self.count == 0:
+            return None
+        return pd.Timestamp(self.timestamps[(self.count - 1) % self.capacity])
+
+    def append(self, ds, bar):
+        slot = self.count % self.capacity
+        self.timestamps[slot] = pd.Timestamp(ds).value
+        self.values[slot] = [bar.get(field, np.nan) for field in self.FIELDS]
+        self.count += 1
+
+    def to_frame(self):
+        """Barras do buffer em ordem cronológica."""
+        order = (np.arange(len(self)) + max(self.count - self.capacity, 0)) % self.capacity
+        data = pd.DataFrame(self.values[order], columns=self.FIELDS)
+        data.insert(0, 'ds', pd.to_datetime(self.timestamps[order]))
+        return data
+
+
+class StreamingSignalEngine:
+    """
+    Atualiza RSI, EMA, HiLo e o sinal do HiLo Activator em O(1) por barra fechada. Após `warm_up` com o
+    mesmo histórico usado no modo batch, os valores emitidos coincidem com os de IndicatorCalculator e
+    StrategyEvaluator para as mesmas barras.
+    """
+
+    def __init__(self, rsi_period=14, ema_period=21, hilo_period=14, buffer_size=1000):
+        self.logger = logging.getLogger(__name__)
+        self.ema_period = ema_period
+        self.rsi = OnlineRSI(rsi_period)
+        self.ema = OnlineEMA(ema_period)
+        self.signal = OnlineHiLoSignal(hilo_period)
+        self.buffer = BarRingBuffer(buffer_size)
+
+    @property
+    def last_timestamp(self):
+        return self.buffer.last_timestamp
+
+    def warm_up(self, data):
+        """Processa um histórico (colunas 'ds' + OHLCV) sem emitir sinais; retorna o estado da última barra."""
+        state = None
+        for bar in data[['ds', *BarRingBuffer.FIELDS]].itertuples(index=False):
+            state = self.on_bar(bar._asdict())
+        self.logger.info(f"Motor de streaming aquecido com {len(data)} barras.")
+        return state
+
+    def on_bar(self, bar):
+        """Consome uma barra fechada (dict com 'ds' e OHLCV) e retorna os indicadores atualizados."""
+        high, low, close = bar['High'], bar['Low'], bar['Close']
+        self.buffer.append(bar['ds'], bar)
+        signal = self.signal.update(high, low, close)
+        hilo_high, hilo_low = self.signal.hilo.value
+        return {
+            'ds': pd.Timestamp(bar['ds']),
+            'Close': close,
+            'RSI': self.rsi.update(close),
+            f'EMA_{self.ema_period}': self.ema.update(close),
+            'HiLo_High': hilo_high,
+            'HiLo_Low': hilo_low,
+            'Signal': signal,
+        }
+
+
+class ReplayBarFeed:
+    """Feed local que entrega as barras de um DataFrame em lotes, para testes e simulações."""
+
+    def __init__(self, data, batch_size=1):
+        self.data = data.reset_index(drop=True)
+        self.batch_size = batch_size
+        self.position = 0
+
+    @property
+    def exhausted(self):
+        return self.position >= len(self.data)
+
+    def poll(self, since=None):
+        batch = self.data.iloc[self.position:self.position + self.batch_size]
+        self.position += len(batch)
+        if since is not None:
+            batch = batch[batch['ds'] > since]
+        return batch
+
+
+class CryptoBarFeed:
+    """Consulta o CryptoDataFetcher e retorna apenas as barras já fechadas posteriores a `since`."""
+
+    exhausted = False
+
+    def __init__(self, fetcher, ticker, interval):
+        self.fetcher = fetcher
+        self.ticker = ticker
+        self.interval = interval
+        self.interval_ms = fetcher._interval_to_milliseconds(interval)
+
+    def closed_bars(self, bars):
+        """Descarta a barra ainda em formação (a exchange devolve a barra corrente junto com as fechadas)."""
+        now = pd.Timestamp(datetime.utcnow())
+        return bars[bars['ds'] + pd.to_timedelta(self.interval_ms, unit='ms') <= now]
+
+    def poll(self, since=None):
+        bars = self.fetcher.fetch_raw(self.ticker, interval=self.interval, start=since)
+        if bars is None or bars.empty:
+            return bars
+        if since is not None:
+            bars = bars[bars['ds'] > since]
+        return self.closed_bars(bars)
+
+
+class BarStreamer:
+    """
+    Laço do modo streaming: consulta cada feed, alimenta o respectivo motor e repassa os resultados a
+    `on_update` (por padrão, registra os sinais não nulos no log).
+    """
+
+    def __init__(self, streams, poll_interval=60, on_update=None):
+        self.logger = logging.getLogger(__name__)
+        self.streams = streams  # {ticker: (feed, engine)}
+        self.poll_interval = poll_interval
+        self.on_update = on_update or self._log_signal
+
+    def _log_signal(self, ticker, update):
+        if update['Signal'] != 0:
+            side = 'compra' if update['Signal'] > 0 else 'venda'
+            self.logger.info(f"{ticker} {update['ds']}: sinal de {side} (Close={update['Close']:.2f}, RSI={update['RSI']:.1f})")
+
+    def poll_once(self):
+        processed = 0
+        for ticker, (feed, engine) in self.streams.items():
+            bars = feed.poll(since=engine.last_timestamp)
+            if bars is None or bars.empty:
+                continue
+            for bar in bars[['ds', *BarRingBuffer.FIELDS]].itertuples(index=False):
+                self.on_update(ticker, engine.on_bar(bar._asdict()))
+                processed += 1
+        return processed
+
+    def run(self, max_polls=None):
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            self.poll_once()
+            polls += 1
+            if all(feed.exhausted for feed, _ in self.streams.values()):
+                break
+            time.sleep(self.poll_interval)
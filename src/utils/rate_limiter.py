@@ -0,0 +1,33 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Limitador de taxa token-bucket, seguro para uso compartilhado entre threads.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate  # tokens por segundo
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_interval_ms(cls, interval_ms, capacity=1):
+        """Cria um limitador que libera uma requisição a cada `interval_ms` milissegundos (ex: exchange.rateLimit)."""
+        return cls(1000.0 / max(interval_ms, 1), capacity)
+
+    def acquire(self, tokens=1):
+        """Bloqueia até haver `tokens` disponíveis e os consome."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
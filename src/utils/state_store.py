@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+
+import numpy as np
+from src.utils.file_manager import FileManager
+
+
+class StateStore:
+    """
+    Armazena estados e parâmetros serializáveis (dicts com escalares, listas e arrays NumPy) em JSON,
+    um arquivo por chave.
+    """
+
+    def __init__(self, directory):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        FileManager.ensure_directory_exists(self.directory)
+
+    def path(self, key, extension='.json'):
+        return os.path.join(self.directory, f"{FileManager.normalize_ticker_name(key)}{extension}")
+
+    @staticmethod
+    def _to_serializable(value):
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+    def load(self, key):
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Estado ilegível em {path}, ignorando: {e}")
+            return None
+
+    def save(self, key, state):
+        path = self.path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(state, file, default=self._to_serializable)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            self.logger.error(f"Erro ao gravar estado em {path}: {e}")
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    def delete(self, key):
+        path = self.path(key)
+        if os.path.isfile(path):
+            os.remove(path)
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from src.analysis.correlation_analysis import EWMACovariance, RollingCovariance
+
+
+def _returns():
+    rng = np.random.default_rng(0)
+    returns = rng.standard_normal((200, 3))
+    returns[5:20, 1] = np.nan
+    return returns
+
+
+def test_ewma_matches_pandas_ewm():
+    returns = _returns()
+    ewma = EWMACovariance(returns.shape[1], halflife=30)
+    for row in returns:
+        ewma.update(row)
+    ewm = pd.DataFrame(returns).ewm(halflife=30)
+    np.testing.assert_allclose(ewma.covariance(), ewm.cov().loc[len(returns) - 1].to_numpy(), rtol=1e-10)
+    np.testing.assert_allclose(ewma.correlation(), ewm.corr().loc[len(returns) - 1].to_numpy(), rtol=1e-10)
+
+
+def test_rolling_matches_pandas_rolling():
+    returns = _returns()
+    rolling = RollingCovariance(returns.shape[1], window=60)
+    for row in returns:
+        rolling.update(row)
+    expected = pd.DataFrame(returns).rolling(60).cov().loc[len(returns) - 1].to_numpy()
+    np.testing.assert_allclose(rolling.covariance(), expected, rtol=1e-10)
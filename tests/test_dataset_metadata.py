@@ -0,0 +1,28 @@
+import pandas as pd
+from src.data.models.dataset_metadata import DatasetMetadata
+
+
+def _data():
+    data = pd.DataFrame({'ds': pd.date_range('2024-01-02', periods=10, freq='D'), 'y': range(10, 20)})
+    return DatasetMetadata.attach_to(data.astype({'y': float}))
+
+
+def test_attached_metadata_is_reused_for_the_same_frame():
+    data = _data()
+    assert DatasetMetadata.of(data).content_hash == DatasetMetadata.content_hash_of(data)
+    assert DatasetMetadata.from_dict(data.attrs[DatasetMetadata.ATTRS_KEY]).matches(data)
+
+
+def test_derived_frame_does_not_reuse_inherited_metadata():
+    data = _data()
+    derived = data.assign(y=data['y'] * 2)
+    assert derived.attrs[DatasetMetadata.ATTRS_KEY] == data.attrs[DatasetMetadata.ATTRS_KEY]
+    assert DatasetMetadata.of(derived).content_hash == DatasetMetadata.content_hash_of(derived)
+    assert DatasetMetadata.of(derived).content_hash != DatasetMetadata.of(data).content_hash
+
+
+def test_in_place_edit_invalidates_metadata():
+    data = _data()
+    original = DatasetMetadata.of(data).content_hash
+    data.loc[3, 'y'] = 0.0
+    assert DatasetMetadata.of(data).content_hash != original
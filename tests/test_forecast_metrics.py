@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.optimization.forecast_metrics import METRICS, mean_metric, performance_metrics
+
+diagnostics = pytest.importorskip('prophet.diagnostics')
+
+
+def _cv_frame(rng):
+    """Resultado sintético de cross_validation: vários cutoffs, horizontes repetidos e grupos de tamanhos diferentes."""
+    frequency = pd.Timedelta(hours=1) if rng.random() < 0.5 else pd.Timedelta(days=1)
+    n_cutoffs, horizon = rng.integers(2, 8), rng.integers(3, 20)
+    cutoffs = pd.Timestamp('2024-01-01') + frequency * np.sort(rng.choice(200, n_cutoffs, replace=False))
+    rows = []
+    for cutoff in cutoffs:
+        steps = np.sort(rng.choice(np.arange(1, horizon + 1), rng.integers(1, horizon + 1), replace=False))
+        rows.extend((cutoff + frequency * step, cutoff) for step in steps)
+    df = pd.DataFrame(rows, columns=['ds', 'cutoff'])
+    df['y'] = 100 + rng.standard_normal(len(df)).cumsum()
+    df['yhat'] = df['y'] + rng.standard_normal(len(df))
+    df['yhat_lower'] = df['yhat'] - rng.random(len(df)) * 2
+    df['yhat_upper'] = df['yhat'] + rng.random(len(df)) * 2
+    return df
+
+
+@pytest.mark.parametrize('seed', range(120))
+def test_matches_prophet_performance_metrics(seed):
+    rng = np.random.default_rng(seed)
+    df = _cv_frame(rng)
+    rolling_window = [0.0, 0.1, 0.25, 0.5, 1.0, -1][seed % 6]
+
+    expected = diagnostics.performance_metrics(df, rolling_window=rolling_window)
+    result = performance_metrics(df, rolling_window=rolling_window)
+
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_array_equal(result['horizon'].to_numpy(), expected['horizon'].to_numpy())
+    for metric in METRICS:
+        np.testing.assert_allclose(result[metric].to_numpy(), expected[metric].to_numpy(), rtol=1e-9, atol=1e-12, err_msg=metric)
+        if rolling_window >= 0:
+            assert mean_metric(df, metric, rolling_window) == pytest.approx(expected[metric].mean(), rel=1e-9, abs=1e-12)
+
+
+def test_mape_is_omitted_when_y_has_zeros():
+    df = _cv_frame(np.random.default_rng(0))
+    df.loc[0, 'y'] = 0.0
+    result = performance_metrics(df)
+    assert 'mape' not in result.columns
+    assert list(result.columns) == list(diagnostics.performance_metrics(df).columns)
+    with pytest.raises(ValueError):
+        mean_metric(df, 'mape')
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from src.analysis.indicator_calculator import IndicatorCalculator
+from src.utils.state_store import StateStore
+
+INDICATORS = ['RSI', 'EMA_21', 'HiLo_High', 'HiLo_Low']
+
+
+def _bars(periods, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(periods).cumsum()
+    return pd.DataFrame({
+        'ds': pd.date_range('2024-01-02', periods=periods, freq='h'),
+        'Open': close, 'High': close + rng.random(periods), 'Low': close - rng.random(periods), 'Close': close,
+    })
+
+
+def _batch(data):
+    data = IndicatorCalculator.calculate_RSI(data.copy())
+    data = IndicatorCalculator.calculate_EMA(data)
+    return IndicatorCalculator.calculate_HiLo(data)
+
+
+def _assert_matches_batch(result, data):
+    expected = _batch(data)
+    for column in INDICATORS:
+        np.testing.assert_allclose(result[column].to_numpy(), expected[column].to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_resumed_run_equals_batch(tmp_path):
+    bars = _bars(600)
+    store = StateStore(str(tmp_path))
+    IndicatorCalculator.calculate_incremental(bars.iloc[:500], 'key', store=store)
+    _assert_matches_batch(IndicatorCalculator.calculate_incremental(bars, 'key', store=store), bars)
+
+
+def test_resumed_run_on_slid_window_equals_batch(tmp_path):
+    bars = _bars(1200)
+    store = StateStore(str(tmp_path))
+    IndicatorCalculator.calculate_incremental(bars.iloc[:1000], 'key', store=store)
+    for start, end in ((50, 1050), (120, 1100), (300, 1200)):
+        window = bars.iloc[start:end].reset_index(drop=True)
+        _assert_matches_batch(IndicatorCalculator.calculate_incremental(window, 'key', store=store), window)
+
+
+def test_adjusted_history_is_recomputed(tmp_path):
+    bars = _bars(600)
+    store = StateStore(str(tmp_path))
+    IndicatorCalculator.calculate_incremental(bars.iloc[:500], 'key', store=store)
+    adjusted = bars.copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] *= 0.9
+    _assert_matches_batch(IndicatorCalculator.calculate_incremental(adjusted, 'key', store=store), adjusted)
+
+
+def test_panel_matches_per_ticker_methods_on_misaligned_calendars():
+    bars = _bars(400, seed=1)
+    datasets = {
+        'A': bars.iloc[::2].reset_index(drop=True),
+        'B': _bars(400, seed=2).iloc[50:].reset_index(drop=True),
+        'C': _bars(400, seed=3).drop(index=range(100, 160)).iloc[:300].reset_index(drop=True),
+    }
+    panels = IndicatorCalculator.build_panel(datasets)
+    results = IndicatorCalculator.calculate_panel(panels['Close'], panels['High'], panels['Low'])
+
+    for ticker, data in datasets.items():
+        expected = _batch(data).set_index('ds')
+        for column in INDICATORS:
+            panel = results[column][ticker].dropna().reindex(expected.index)
+            assert results[column][ticker].notna().sum() == expected[column].notna().sum()
+            np.testing.assert_allclose(panel.to_numpy(), expected[column].to_numpy(), rtol=1e-10, atol=1e-10, equal_nan=True)
+        # Fora do calendário do ticker o painel fica vazio
+        outside = ~results['EMA_21'].index.isin(data['ds'])
+        assert results['EMA_21'].loc[outside, ticker].isna().all()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from src.analysis.linear_forecast import LinearForecastAnalysis
+from src.data.models.dataset_metadata import DatasetMetadata
+
+
+def _series(start, periods, freq, seed):
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range(start, periods=periods, freq=freq)
+    y = 100 + 0.05 * np.arange(periods) + 2 * np.sin(np.arange(periods) / 7) + rng.standard_normal(periods)
+    return DatasetMetadata.attach_to(pd.DataFrame({'ds': ds, 'y': y}))
+
+
+def test_batched_solve_matches_per_series_lstsq():
+    rng = np.random.default_rng(0)
+    n_rows, n_series = 300, 5
+    t = np.linspace(0, 1, n_rows)
+    X = np.column_stack([np.ones(n_rows), t, np.sin(20 * t), np.cos(20 * t), np.sin(45 * t)])
+    values = X @ rng.standard_normal((X.shape[1], n_series)) + 0.1 * rng.standard_normal((n_rows, n_series))
+    values[:40, 1] = np.nan
+    values[rng.random((n_rows, n_series)) < 0.2] = np.nan
+    valid = ~np.isnan(values)
+    timestamps = np.arange(n_rows, dtype=np.int64)
+    limits = np.array([n_rows, n_rows, 250, n_rows, 200], dtype=np.int64)
+
+    analysis = LinearForecastAnalysis({}, future_periods=5, ridge=0.0, chunk_size=2)
+    betas, sigmas = analysis._solve(X, timestamps, values, valid, np.arange(n_series), limits)
+
+    for column in range(n_series):
+        rows = valid[:, column] & (timestamps <= limits[column])
+        expected, residuals, _, _ = np.linalg.lstsq(X[rows], values[rows, column], rcond=None)
+        np.testing.assert_allclose(betas[column], expected, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(sigmas[column], np.sqrt(residuals[0] / (rows.sum() - X.shape[1])), rtol=1e-8)
+
+
+def test_forecast_does_not_depend_on_batch():
+    daily = _series('2023-01-02', 200, 'B', seed=1)
+    companions = {
+        'DAILY': daily,
+        'LONG': _series('2019-01-02', 1200, 'B', seed=2),
+        'HOURLY': _series('2024-01-02 10:00', 600, 'h', seed=3),
+    }
+    alone = LinearForecastAnalysis({'DAILY': daily}, future_periods=10, cross_validate=False).analyze()['DAILY']
+    batched = LinearForecastAnalysis(companions, future_periods=10, cross_validate=False).analyze()['DAILY']
+    pd.testing.assert_frame_equal(alone['forecast'], batched['forecast'], rtol=1e-7)
+
+
+def test_same_configuration_series_share_a_batch_without_changing_forecasts():
+    first = _series('2023-01-02', 300, 'B', seed=4)
+    second = _series('2022-06-01', 400, 'B', seed=5)
+    alone = LinearForecastAnalysis({'A': first}, future_periods=5, cross_validate=False).analyze()['A']
+    batched = LinearForecastAnalysis({'A': first, 'B': second}, future_periods=5, cross_validate=False).analyze()['A']
+    pd.testing.assert_frame_equal(alone['forecast'], batched['forecast'], rtol=1e-6)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from src.analysis.options_analysis import BlackScholes, OptionsAnalysis
+
+VALUATION_DATE = pd.Timestamp('2024-03-01 12:00')
+
+
+def _chain(S, sigma, r, expirations, strikes):
+    rows = [(expiration, strike, option_type) for expiration in expirations for strike in strikes for option_type in ('C', 'P')]
+    chain = pd.DataFrame(rows, columns=['expiration', 'strike', 'optionType'])
+    T = (pd.to_datetime(chain['expiration']) - VALUATION_DATE).dt.total_seconds().to_numpy() / (365.0 * 24 * 3600)
+    T = np.maximum(T, OptionsAnalysis.MIN_TIME_TO_EXPIRY)
+    chain['lastPrice'] = BlackScholes.price(S, chain['strike'].to_numpy(), T, r, sigma, (chain['optionType'] == 'C').to_numpy())
+    return chain
+
+
+def test_price_matches_reference_values():
+    # Hull, Options, Futures and Other Derivatives: S=42, K=40, r=10%, sigma=20%, T=0.5
+    call, put = BlackScholes.price(42.0, 40.0, 0.5, 0.1, 0.2, np.array([True, False]))
+    assert round(call, 2) == 4.76
+    assert round(put, 2) == 0.81
+
+
+def test_greeks_match_closed_form():
+    S, r, q, sigma = 100.0, 0.05, 0.02, 0.25
+    K = np.array([80.0, 100.0, 120.0, 80.0, 100.0, 120.0])
+    T = np.array([0.25, 0.5, 1.0, 0.25, 0.5, 1.0])
+    is_call = np.array([True, True, True, False, False, False])
+    greeks = BlackScholes.greeks(S, K, T, r, sigma, is_call, q)
+
+    d1 = (np.log(S / K) + (r - q + sigma ** 2 / 2) * T) / (sigma * np.sqrt(T))
+    d2 = d1 - sigma * np.sqrt(T)
+    sign = np.where(is_call, 1.0, -1.0)
+    expected = {
+        'delta': sign * np.exp(-q * T) * norm.cdf(sign * d1),
+        'gamma': np.exp(-q * T) * norm.pdf(d1) / (S * sigma * np.sqrt(T)),
+        'vega': S * np.exp(-q * T) * norm.pdf(d1) * np.sqrt(T),
+        'theta': (-S * np.exp(-q * T) * norm.pdf(d1) * sigma / (2 * np.sqrt(T))
+                  - sign * r * K * np.exp(-r * T) * norm.cdf(sign * d2) + sign * q * S * np.exp(-q * T) * norm.cdf(sign * d1)),
+        'rho': sign * K * T * np.exp(-r * T) * norm.cdf(sign * d2),
+    }
+    for name, values in expected.items():
+        np.testing.assert_allclose(greeks[name], values, rtol=1e-10, err_msg=name)
+
+    # Derivadas numéricas do preço
+    h = 1e-4
+    price = lambda **kwargs: BlackScholes.price(**{'S': S, 'K': K, 'T': T, 'r': r, 'sigma': sigma, 'is_call': is_call, 'q': q, **kwargs})
+    np.testing.assert_allclose(greeks['delta'], (price(S=S + h) - price(S=S - h)) / (2 * h), rtol=1e-6)
+    np.testing.assert_allclose(greeks['vega'], (price(sigma=sigma + h) - price(sigma=sigma - h)) / (2 * h), rtol=1e-6)
+    np.testing.assert_allclose(greeks['rho'], (price(r=r + h) - price(r=r - h)) / (2 * h), rtol=1e-6)
+    np.testing.assert_allclose(greeks['theta'], -(price(T=T + h) - price(T=T - h)) / (2 * h), rtol=1e-5)
+
+
+def test_implied_volatility_recovers_sigma_on_synthetic_chain():
+    S, r, sigma = 50.0, 0.1075, 0.35
+    chain = _chain(S, sigma, r, ['2024-03-15', '2024-04-19', '2024-09-20', '2025-03-21'], np.arange(30.0, 72.0, 2.0))
+    analyzed = OptionsAnalysis(chain, S, risk_free_rate=r, valuation_date=VALUATION_DATE).analyze()
+
+    # Longe do dinheiro o preço quase não depende da volatilidade (vega ~ 0) e ela não é identificável
+    identifiable = analyzed['vega'] > 1e-3
+    assert identifiable.mean() > 0.8
+    assert analyzed.loc[identifiable, 'iv'].notna().all()
+    np.testing.assert_allclose(analyzed.loc[identifiable, 'iv'], sigma, rtol=1e-5)
+
+
+def test_expiry_day_contracts_have_finite_iv_and_expired_are_dropped():
+    S, r, sigma = 50.0, 0.1075, 0.35
+    chain = _chain(S, sigma, r, ['2024-03-01', '2024-03-15'], [48.0, 50.0, 52.0])
+    expired = chain.iloc[:2].assign(expiration='2024-02-23')
+    analyzed = OptionsAnalysis(pd.concat([expired, chain], ignore_index=True), S, risk_free_rate=r, valuation_date=VALUATION_DATE).analyze()
+
+    assert len(analyzed) == len(chain)
+    assert (analyzed['T'] > 0).all()
+    expiry_day = analyzed[analyzed['expiration'] == '2024-03-01']
+    at_the_money = expiry_day[expiry_day['strike'] == 50.0]
+    np.testing.assert_allclose(at_the_money['iv'], sigma, rtol=1e-6)
+    assert np.isfinite(analyzed['iv'].dropna()).all()
+    assert not np.isinf(analyzed[['iv', 'delta', 'gamma', 'vega', 'theta']].to_numpy()).any()
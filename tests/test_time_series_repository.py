@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bson import ObjectId
+from mongoengine import connect, disconnect
+from src.data.accesss.time_series_repository import TimeSeriesRepository
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def repository():
+    connect('investimentos_test', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+    yield TimeSeriesRepository()
+    disconnect()
+
+
+def _bars(start, periods, offset=0.0):
+    close = 100 + np.arange(periods, dtype=float) + offset
+    return pd.DataFrame({
+        'ds': pd.date_range(start, periods=periods, freq='h'),
+        'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': np.full(periods, 1000.0),
+    })
+
+
+def test_bulk_upsert_writes_one_bucket_per_period(repository):
+    asset = ObjectId()
+    bars = _bars('2024-01-30', 24 * 5)  # 30/01 a 03/02: buckets de janeiro e fevereiro
+    repository.upsert(asset, '1h', bars)
+
+    assert repository.collection.count_documents({'asset': asset, 'interval': '1h'}) == 2
+    pd.testing.assert_frame_equal(repository.read_range(asset, '1h'), bars, check_dtype=False)
+
+
+def test_overlapping_upsert_does_not_duplicate_bars(repository):
+    asset = ObjectId()
+    first = _bars('2024-01-30', 48)
+    repository.upsert(asset, '1h', first)
+    # Sobrepõe o fim do primeiro lote com preços revisados e avança para fevereiro
+    second = _bars('2024-01-31', 72, offset=0.25)
+    repository.upsert(asset, '1h', second)
+
+    stored = repository.read_range(asset, '1h')
+    assert stored['ds'].is_unique and stored['ds'].is_monotonic_increasing
+    expected = pd.concat([first[first['ds'] < second['ds'].min()], second], ignore_index=True)
+    pd.testing.assert_frame_equal(stored, expected, check_dtype=False)
+    for bucket in repository.collection.find({'asset': asset}):
+        assert bucket['count'] == len(bucket['timestamps']) == len(set(bucket['timestamps']))
+
+
+def test_upsert_into_the_middle_of_a_bucket_keeps_later_bars(repository):
+    asset = ObjectId()
+    bars = _bars('2024-01-10', 24 * 10)
+    repository.upsert(asset, '1h', bars)
+    repository.upsert(asset, '1h', bars.iloc[50:60].assign(Close=1.0))
+
+    stored = repository.read_range(asset, '1h')
+    assert len(stored) == len(bars)
+    assert (stored['Close'].iloc[50:60] == 1.0).all()
+    pd.testing.assert_frame_equal(stored.iloc[60:].reset_index(drop=True), bars.iloc[60:].reset_index(drop=True), check_dtype=False)
+
+
+def test_read_range_across_bucket_boundaries(repository):
+    asset = ObjectId()
+    bars = _bars('2024-01-15', 24 * 50)  # janeiro, fevereiro e março
+    repository.upsert(asset, '1h', bars)
+
+    start, end = pd.Timestamp('2024-01-31 20:00'), pd.Timestamp('2024-03-01 03:00')
+    expected = bars[(bars['ds'] >= start) & (bars['ds'] <= end)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(repository.read_range(asset, '1h', start, end), expected, check_dtype=False)
+    assert repository.read_range(ObjectId(), '1h', start, end).empty
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from src.analysis.volatility_analysis import VolatilityAnalysis, _fit_model
+
+
+def _retornos():
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2022-01-03', periods=500, freq='B')
+    return pd.Series(rng.standard_normal(500), index=index)
+
+
+def test_simulated_forecast_is_reproducible_with_seed():
+    retornos = _retornos()
+    runs = [
+        _fit_model('EGARCH', retornos, p=1, q=1, horizon=10, simulations=200, seed=1)
+        for _ in range(3)
+    ]
+    for model_name, result, variance, refitted, error in runs:
+        assert error is None
+    np.testing.assert_array_equal(runs[0][2].to_numpy(), runs[1][2].to_numpy())
+    np.testing.assert_array_equal(runs[0][2].to_numpy(), runs[2][2].to_numpy())
+
+
+def test_simulated_forecast_depends_on_seed():
+    retornos = _retornos()
+    first = _fit_model('EGARCH', retornos, p=1, q=1, horizon=10, simulations=200, seed=1)[2]
+    second = _fit_model('EGARCH', retornos, p=1, q=1, horizon=10, simulations=200, seed=2)[2]
+    assert not np.array_equal(first.to_numpy(), second.to_numpy())
+
+
+def test_from_frame_indexes_returns_by_ds_column():
+    data = pd.DataFrame({'ds': pd.date_range('2024-01-02', periods=3, freq='h'), 'Retornos': [0.1, -0.2, 0.3]})
+    retornos = VolatilityAnalysis.from_frame(data).retornos
+    assert isinstance(retornos.index, pd.DatetimeIndex)
+    assert list(retornos.index) == list(data['ds'])
+    pd.testing.assert_series_equal(VolatilityAnalysis.from_frame(data.set_index('ds')).retornos, retornos)